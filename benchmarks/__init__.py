@@ -0,0 +1,2 @@
+#!/usr/bin/python3
+"""Module for __init__."""
@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+"""Module for bench_memory.
+
+Compares the memory held by reloaded Places and Reviews as regular model
+instances and as their compact variants from models.compact. Tracing starts
+before the input dictionaries are built, so that the strings objects keep
+from them are counted, and stops once the dictionaries are freed.
+
+Usage: python3 -m benchmarks.bench_memory [count ...]
+"""
+
+import gc
+import sys
+import tracemalloc
+import typing
+import uuid
+
+from benchmarks.common import scratch_storage, sizes_from_argv
+from models.compact import compact_class
+from models.engine.deserializers import Deserializer
+from models.place import Place
+from models.review import Review
+
+
+def records(count: int) -> typing.List[typing.Dict[str, typing.Any]]:
+    """Return count dictionaries as read from a json file."""
+    cities: typing.List[str] = [str(uuid.uuid4()) for _ in range(100)]
+    users: typing.List[str] = [str(uuid.uuid4()) for _ in range(1000)]
+    dicts: typing.List[typing.Dict[str, typing.Any]] = []
+    for i in range(count):
+        obj_dict: typing.Dict[str, typing.Any] = {
+            "id": str(uuid.uuid4()),
+            "created_at": "2024-04-20T22:55:15.088887",
+            "updated_at": "2024-04-21T12:46:27.944296",
+            "user_id": users[i % len(users)],
+        }
+        if i % 2:
+            obj_dict.update(__class__="Review", text=f"Review {i}",
+                            place_id=dicts[i - 1]["id"])
+        else:
+            obj_dict.update(__class__="Place", name=f"Place {i}",
+                            city_id=cities[i % len(cities)],
+                            price_by_night=i % 500, max_guest=i % 8,
+                            latitude=i / count, longitude=-i / count)
+
+        dicts.append(obj_dict)
+
+    return dicts
+
+
+def measure(count: int, compact: bool) -> float:
+    """Return the bytes per object held by count instantiated records."""
+    classes: typing.Dict[str, type] = {"Place": Place, "Review": Review}
+    if compact:
+        classes = {name: compact_class(cls) for name, cls in classes.items()}
+
+    # Built the way FileStorage reloads them
+    build: typing.Dict[str, Deserializer] = {
+        name: Deserializer(cls) for name, cls in classes.items()}
+
+    gc.collect()
+    tracemalloc.start()
+    dicts: typing.List[typing.Dict[str, typing.Any]] = records(count)
+    objects: typing.List[typing.Any] = [
+        build[obj_dict["__class__"]](obj_dict) for obj_dict in dicts]
+    del dicts
+    gc.collect()
+    size: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size / count
+
+
+def run(count: int) -> typing.Dict[str, float]:
+    """Measure both representations with count objects."""
+    with scratch_storage():
+        return {"objects": count,
+                "regular_bytes_per_object": measure(count, False),
+                "compact_bytes_per_object": measure(count, True)}
+
+
+def main(argv: typing.List[str]) -> None:
+    """Print the memory per object for every requested object count."""
+    for count in sizes_from_argv(argv, (1000000,)):
+        result: typing.Dict[str, float] = run(count)
+        print(f"{count:>9} objects: regular "
+              f"{result['regular_bytes_per_object']:.0f} B/object, compact "
+              f"{result['compact_bytes_per_object']:.0f} B/object")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+"""Module for bench_nearby.
+
+Times finding the places within `RADIUS` kilometres of a point through the
+grid index of FileStorage.nearby against measuring the distance to every
+place. The places are spread over a square of `AREA` degrees, about the
+size of a large city, and the timings are the average of `QUERIES`
+queries around random points of it.
+
+Usage: python3 -m benchmarks.bench_nearby [count ...]
+"""
+
+import random
+import sys
+import time
+import typing
+
+from benchmarks.common import scratch_storage, sizes_from_argv
+from models.engine.file_storage import FileStorage
+from models.engine.indexes import distance
+from models.place import Place
+
+RADIUS: float = 5.0
+AREA: typing.Tuple[float, float, float, float] = (40.5, 41.0, -74.3, -73.7)
+QUERIES: int = 20
+
+
+def brute_force(places: typing.List[Place], latitude: float,
+                longitude: float) -> typing.List[Place]:
+    """Return the places within RADIUS of a point, nearest first."""
+    found: typing.List[typing.Tuple[float, Place]] = []
+    for place in places:
+        kilometres: float = distance(latitude, longitude, place.latitude,
+                                     place.longitude)
+        if kilometres <= RADIUS:
+            found.append((kilometres, place))
+
+    return [place for _, place in sorted(found, key=lambda item: item[0])]
+
+
+def indexed(storage: FileStorage, latitude: float,
+            longitude: float) -> typing.List[Place]:
+    """Return the places within RADIUS of a point through the index."""
+    return [typing.cast(Place, place) for place, _ in storage.nearby(
+        latitude, longitude, RADIUS)]
+
+
+def run(count: int) -> typing.Dict[str, float]:
+    """Time the queries among count places both ways."""
+    # Seeded for repeatable runs, not for security
+    rng: random.Random = random.Random(count)  # noqa: DUO102
+    south, north, west, east = AREA
+    with scratch_storage() as storage:
+        places: typing.List[Place] = []
+        for _ in range(count):
+            place: Place = Place()
+            place.latitude = rng.uniform(south, north)  # type: ignore
+            place.longitude = rng.uniform(west, east)  # type: ignore
+            places.append(place)
+
+        points: typing.List[typing.Tuple[float, float]] = [
+            (rng.uniform(south, north), rng.uniform(west, east))
+            for _ in range(QUERIES)]
+        result: typing.Dict[str, float] = {"objects": count, "found": 0}
+        for name, query in (("brute_force", lambda lat, lon: brute_force(
+                places, lat, lon)), ("indexed", lambda lat, lon: indexed(
+                    storage, lat, lon))):
+            start: float = time.perf_counter()
+            for latitude, longitude in points:
+                found: typing.List[Place] = query(latitude, longitude)
+
+            result[name] = (time.perf_counter() - start) / QUERIES
+            result["found"] = len(found)
+
+        if brute_force(places, *points[-1]) != indexed(storage, *points[-1]):
+            raise AssertionError("the index and brute force disagree")
+
+        return result
+
+
+def main(argv: typing.List[str]) -> None:
+    """Print the query timings for every requested place count."""
+    for count in sizes_from_argv(argv, (10000, 100000)):
+        result: typing.Dict[str, float] = run(count)
+        print(f"{count:>9} places: brute force {result['brute_force']:.4f}s,"
+              f" grid index {result['indexed']:.4f}s per query,"
+              f" {result['found']:,.0f} found")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
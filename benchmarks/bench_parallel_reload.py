@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+"""Module for bench_parallel_reload.
+
+Times FileStorage.reload parsing the json file with 1, 2, 4... worker
+processes, up to the number of cores, to show how reload scales.
+
+Usage: python3 -m benchmarks.bench_parallel_reload [count ...]
+"""
+
+import os
+import sys
+import typing
+
+from benchmarks.common import best_of, populate, scratch_storage
+from benchmarks.common import sizes_from_argv
+from models.engine.file_storage import FileStorage
+
+
+def worker_counts() -> typing.List[int]:
+    """Return the powers of two up to the number of cores, and the latter."""
+    cores: int = os.cpu_count() or 1
+    counts: typing.List[int] = [1]
+    while counts[-1] * 2 < cores:
+        counts.append(counts[-1] * 2)
+
+    return counts + [cores] if cores > 1 else counts
+
+
+def run(count: int) -> typing.Dict[int, float]:
+    """Time reloading a store of count objects with every worker count."""
+    with scratch_storage() as storage:
+        with storage.batch():
+            populate(count)
+
+        storage.save()
+        path: str = storage._FileStorage__file_path  # type: ignore
+        return {workers: best_of(FileStorage(path, workers=workers).reload)
+                for workers in worker_counts()}
+
+
+def main(argv: typing.List[str]) -> None:
+    """Print the reload timings for every requested object count."""
+    for count in sizes_from_argv(argv, (100000, 1000000)):
+        timings: typing.Dict[int, float] = run(count)
+        print(f"{count:>9} objects: " + ", ".join(
+            f"{workers} workers {seconds:.3f}s "
+            f"({timings[1] / seconds:.2f}x)"
+            for workers, seconds in timings.items()))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
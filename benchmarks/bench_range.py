@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+"""Module for bench_range.
+
+Times finding the `LIMIT` cheapest places of a city and counting the
+places in a price range through the sorted index of FileStorage.query
+against scanning every place. The places are spread over `CITIES` cities with
+prices up to `MAX_PRICE`, and the timings are the average of `QUERIES`
+queries.
+
+Usage: python3 -m benchmarks.bench_range [count ...]
+"""
+
+import functools
+import random
+import sys
+import time
+import typing
+
+from benchmarks.common import scratch_storage, sizes_from_argv
+from models.city import City
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+CITIES: int = 20
+LIMIT: int = 10
+MAX_PRICE: int = 1000
+QUERIES: int = 20
+
+
+def cheapest(places: typing.List[Place], city_id: str,
+             _: int) -> typing.List[str]:
+    """Return the ids of the LIMIT cheapest places of a city."""
+    return [place.id for place in sorted(
+        (place for place in places if place.city_id == city_id),
+        key=lambda place: (place.price_by_night, place.id))[:LIMIT]]
+
+
+def cheapest_indexed(storage: FileStorage, city_id: str,
+                     _: int) -> typing.List[str]:
+    """Return what cheapest returns through the sorted index."""
+    return [place.id for place in storage.query(
+        Place, [f"city_id={city_id}"], "price_by_night", LIMIT)]
+
+
+def priced(places: typing.List[Place], _: str, price: int) -> int:
+    """Return the number of places priced from price to price + 10."""
+    return sum(price <= place.price_by_night <= price + 10
+               for place in places)
+
+
+def priced_indexed(storage: FileStorage, _: str, price: int) -> int:
+    """Return what priced returns through the sorted index."""
+    return sum(1 for _ in storage.query(
+        Place, [f"price_by_night>={price}", f"price_by_night<={price + 10}"]))
+
+
+def run(count: int) -> typing.Dict[str, float]:
+    """Time both queries among count places both ways."""
+    # Seeded for repeatable runs, not for security
+    rng: random.Random = random.Random(count)  # noqa: DUO102
+    with scratch_storage() as storage:
+        cities: typing.List[City] = [City() for _ in range(CITIES)]
+        places: typing.List[Place] = []
+        for _ in range(count):
+            place: Place = Place()
+            place.city_id = rng.choice(cities).id  # type: ignore
+            place.price_by_night = rng.randrange(MAX_PRICE)  # type: ignore
+            places.append(place)
+
+        queries: typing.List[typing.Tuple[str, int]] = [
+            (rng.choice(cities).id, rng.randrange(MAX_PRICE))
+            for _ in range(QUERIES)]
+        result: typing.Dict[str, float] = {"objects": count}
+        for name, scan, indexed in (
+                ("cheapest", cheapest, cheapest_indexed),
+                ("priced", priced, priced_indexed)):
+            if scan(places, *queries[0]) != indexed(storage, *queries[0]):
+                raise AssertionError("the index and the scan disagree")
+
+            for way, query in (("scan", functools.partial(scan, places)),
+                               ("indexed", functools.partial(indexed,
+                                                             storage))):
+                start: float = time.perf_counter()
+                for city_id, price in queries:
+                    query(city_id, price)
+
+                result[f"{name}_{way}"] = (
+                    time.perf_counter() - start) / QUERIES
+
+        return result
+
+
+def main(argv: typing.List[str]) -> None:
+    """Print the query timings for every requested place count."""
+    for count in sizes_from_argv(argv, (10000, 100000)):
+        result: typing.Dict[str, float] = run(count)
+        print(f"{count:>9} places: cheapest of a city"
+              f" {result['cheapest_scan']:.4f}s scanning,"
+              f" {result['cheapest_indexed']:.4f}s indexed; price range"
+              f" {result['priced_scan']:.4f}s scanning,"
+              f" {result['priced_indexed']:.4f}s indexed")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
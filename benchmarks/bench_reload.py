@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+"""Module for bench_reload.
+
+Compares the reload throughput of FileStorage, which builds objects with
+the per-class deserializers of models.engine.deserializers, against the
+previous implementation that called the class with every dictionary.
+
+Usage: python3 -m benchmarks.bench_reload [count ...]
+"""
+
+import json
+import sys
+import typing
+
+from benchmarks.common import best_of, populate, scratch_storage
+from benchmarks.common import sizes_from_argv
+import models.engine.file_storage
+from models.engine.file_storage import FileStorage
+
+
+def class_reload(storage: FileStorage) -> None:
+    """Reload the way FileStorage did before the deserializer cache."""
+    with open(storage._FileStorage__file_path,  # type: ignore
+              "r", encoding="utf-8") as file:
+        loaded_objs: typing.Dict[str, dict] = json.load(file)
+
+    objects: typing.Dict[str, typing.Any] = {}
+    for key, obj_dict in loaded_objs.items():
+        cls: type = vars(models.engine.file_storage)[obj_dict["__class__"]]
+        objects[key] = cls(**obj_dict)
+
+
+def run(count: int) -> typing.Dict[str, float]:
+    """Time reloading a store of count objects both ways."""
+    with scratch_storage() as storage:
+        with storage.batch():
+            populate(count)
+
+        storage.save()
+
+        return {"objects": count,
+                "class_reload": best_of(lambda: class_reload(storage)),
+                "deserializer_reload": best_of(storage.reload)}
+
+
+def main(argv: typing.List[str]) -> None:
+    """Print the reload throughput for every requested object count."""
+    for count in sizes_from_argv(argv, (1000, 100000)):
+        result: typing.Dict[str, float] = run(count)
+        print(f"{count:>9} objects: class "
+              f"{count / result['class_reload']:,.0f} objects/s, "
+              f"deserializer "
+              f"{count / result['deserializer_reload']:,.0f} objects/s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+"""Module for bench_save.
+
+Compares FileStorage.save with a single dirty object against the previous
+implementation that encoded every object on every save.
+
+Usage: python3 -m benchmarks.bench_save [count ...]
+"""
+
+import json
+import sys
+import typing
+
+from benchmarks.common import best_of, populate, scratch_storage
+from benchmarks.common import sizes_from_argv
+from models.engine.file_storage import FileStorage
+
+
+def full_save(storage: FileStorage) -> None:
+    """Save the way FileStorage did before dirty tracking."""
+    json_dict: typing.Dict[str, typing.Dict[str, str]] = {}
+    for key, obj in storage.all().items():
+        json_dict[key] = obj.to_dict()
+
+    with open(storage._FileStorage__file_path,  # type: ignore
+              "w", encoding="utf-8") as file:
+        json.dump(json_dict, file, indent="    ")
+
+
+def run(count: int) -> typing.Dict[str, float]:
+    """Time a save with one dirty object among count objects."""
+    with scratch_storage() as storage:
+        objects = populate(count)
+        storage.save()
+
+        def one_dirty() -> None:
+            objects[0].name = "changed"  # type: ignore
+            storage.save()
+
+        return {"objects": count,
+                "full_save": best_of(lambda: full_save(storage)),
+                "incremental_save": best_of(one_dirty)}
+
+
+def main(argv: typing.List[str]) -> None:
+    """Print the save timings for every requested object count."""
+    for count in sizes_from_argv(argv, (1000, 100000)):
+        result: typing.Dict[str, float] = run(count)
+        print(f"{count:>9} objects: full save {result['full_save']:.4f}s, "
+              f"1 dirty {result['incremental_save']:.4f}s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
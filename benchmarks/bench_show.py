@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+"""Module for bench_show.
+
+Times looking up a single object in a freshly reloaded lazy FileStorage,
+the work done by the console's show command, with and without the offset
+index.
+
+Usage: python3 -m benchmarks.bench_show [count ...]
+"""
+
+import sys
+import typing
+
+from benchmarks.common import best_of, populate, scratch_storage
+from benchmarks.common import sizes_from_argv
+from models.engine.file_storage import FileStorage
+
+
+def show(path: str, obj: typing.Any, indexed: bool) -> None:
+    """Reload a lazy storage and look up obj in it."""
+    storage: FileStorage = FileStorage(path, lazy=True, offset_index=indexed)
+    storage.reload()
+    storage.get(type(obj), obj.id)
+    storage._FileStorage__objects.clear()  # type: ignore
+
+
+def run(count: int) -> typing.Dict[str, float]:
+    """Time a lookup among count objects with and without the index."""
+    with scratch_storage(offset_index=True) as storage:
+        with storage.batch():
+            objects: typing.List[typing.Any] = populate(count)
+
+        storage.save()
+        path: str = storage._FileStorage__file_path  # type: ignore
+        obj: typing.Any = objects[count // 2]
+        return {"objects": count,
+                "parsed": best_of(lambda: show(path, obj, False)),
+                "indexed": best_of(lambda: show(path, obj, True))}
+
+
+def main(argv: typing.List[str]) -> None:
+    """Print the lookup timings for every requested object count."""
+    for count in sizes_from_argv(argv, (1000, 100000)):
+        result: typing.Dict[str, float] = run(count)
+        print(f"{count:>9} objects: parsing {result['parsed']:.4f}s, "
+              f"offset index {result['indexed']:.4f}s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
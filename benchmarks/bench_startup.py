@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+"""Module for bench_startup.
+
+Times starting console.py and running a single create against stores of
+increasing size, with the default eager reload and with lazy reload. The
+create saves the store, which lazy reload leaves unparsed: in journal mode
+the save appends to the log, otherwise it splices the unparsed json file.
+
+Usage: python3 -m benchmarks.bench_startup [count ...]
+"""
+
+import functools
+import os
+import subprocess
+import sys
+import typing
+
+from benchmarks.common import best_of, populate, scratch_storage
+from benchmarks.common import sizes_from_argv
+
+CONSOLE: str = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "console.py")
+
+
+MODES: typing.Dict[str, typing.Dict[str, str]] = {
+    "eager": {},
+    "lazy": {"HBNB_STORAGE_LAZY": "1"},
+    "lazy journal": {"HBNB_STORAGE_LAZY": "1", "HBNB_STORAGE_JOURNAL": "1"},
+}
+
+
+def start_console(directory: str, mode: typing.Dict[str, str]) -> None:
+    """Run console.py in directory with a create command and wait for it."""
+    env: typing.Dict[str, str] = dict(os.environ, **mode)
+    subprocess.run([sys.executable, CONSOLE], input="create User\n",
+                   cwd=directory, env=env, check=True,
+                   stdout=subprocess.DEVNULL, text=True)
+
+
+def run(count: int) -> typing.Dict[str, float]:
+    """Time console start up in every mode against count objects."""
+    with scratch_storage() as storage:
+        populate(count)
+        storage.save()
+        directory: str = os.path.dirname(storage.log_path)
+        os.rename(os.path.join(directory, "objects.json"),
+                  os.path.join(directory, "saved_objects.json"))
+        return {name: best_of(functools.partial(start_console, directory,
+                                                mode))
+                for name, mode in MODES.items()}
+
+
+def main(argv: typing.List[str]) -> None:
+    """Print the start up timings for every requested object count."""
+    for count in sizes_from_argv(argv, (0, 10000, 100000)):
+        result: typing.Dict[str, float] = run(count)
+        print(f"{count:>9} objects: " + ", ".join(
+            f"{name} {seconds:.3f}s" for name, seconds in result.items()))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
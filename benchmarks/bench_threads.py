@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+"""Module for bench_threads.
+
+Stresses a thread-safe FileStorage with threads mixing lookups with
+updates that save the store, and reports the operations per second for
+1, 2, 4 and 8 threads. Every thread runs the same mix: mostly get and
+count, one update and save out of every `WRITE_EVERY` operations. The run
+fails if any thread raises.
+
+Usage: python3 -m benchmarks.bench_threads [count ...]
+"""
+
+import random
+import sys
+import threading
+import time
+import typing
+
+from benchmarks.common import MODEL_CLASSES, populate, scratch_storage
+from benchmarks.common import sizes_from_argv
+from models.base_model import BaseModel
+from models.engine.file_storage import FileStorage
+
+# Operations run by every thread
+OPERATIONS: int = 2000
+# One operation out of this many updates an object and saves
+WRITE_EVERY: int = 20
+THREADS: typing.Tuple[int, ...] = (1, 2, 4, 8)
+
+
+def worker(storage: FileStorage, objects: typing.List[BaseModel],
+           seed: int) -> None:
+    """Run the operation mix against storage."""
+    # Seeded for repeatable runs, not for security
+    rng: random.Random = random.Random(seed)  # noqa: DUO102
+    for index in range(OPERATIONS):
+        obj: BaseModel = rng.choice(objects)
+        if index % WRITE_EVERY == 0:
+            obj.name = f"object {index}"  # type: ignore
+            obj.save()
+        elif index % 2:
+            storage.get(type(obj), obj.id)
+        else:
+            storage.count(rng.choice(MODEL_CLASSES))
+
+
+def stress(storage: FileStorage, objects: typing.List[BaseModel],
+           threads: int) -> float:
+    """Return the seconds taken by threads workers running at once."""
+    errors: typing.List[Exception] = []
+
+    def run(seed: int) -> None:
+        try:
+            worker(storage, objects, seed)
+        except Exception as error:
+            errors.append(error)
+
+    pool: typing.List[threading.Thread] = [
+        threading.Thread(target=run, args=(seed,)) for seed in range(threads)]
+    start: float = time.perf_counter()
+    for thread in pool:
+        thread.start()
+
+    for thread in pool:
+        thread.join()
+
+    elapsed: float = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+
+    return elapsed
+
+
+def run(count: int) -> typing.Dict[str, float]:
+    """Time the operation mix on a store of count objects."""
+    with scratch_storage(threadsafe=True, journal=True) as storage:
+        with storage.batch():
+            objects: typing.List[BaseModel] = populate(count)
+
+        storage.save()
+        result: typing.Dict[str, float] = {"objects": count}
+        for threads in THREADS:
+            result[f"threads_{threads}"] = (
+                threads * OPERATIONS / stress(storage, objects, threads))
+
+        return result
+
+
+def main(argv: typing.List[str]) -> None:
+    """Print the throughput for every requested object count."""
+    for count in sizes_from_argv(argv, (1000, 10000)):
+        result: typing.Dict[str, float] = run(count)
+        print(f"{count:>9} objects: " + ", ".join(
+            f"threads={threads} {result[f'threads_{threads}']:,.0f} ops/s"
+            for threads in THREADS))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
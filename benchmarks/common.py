@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+"""Module for common benchmark helpers."""
+
+import contextlib
+import os
+import tempfile
+import time
+import typing
+
+import models
+from models.amenity import Amenity
+from models.base_model import BaseModel
+from models.city import City
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+MODEL_CLASSES: typing.Tuple[type, ...] = (
+    User, Place, State, City, Amenity, Review)
+
+
+@contextlib.contextmanager
+def scratch_storage(**kwargs) -> typing.Iterator[FileStorage]:
+    """Install a FileStorage writing to a temporary directory.
+
+    Args:
+        kwargs: keyword arguments passed on to FileStorage.
+
+    Yields:
+        the storage engine, installed as models.storage for the duration.
+    """
+    previous = models.storage
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage: FileStorage = FileStorage(
+            file_path=os.path.join(tmp_dir, "objects.json"), **kwargs)
+        models.storage = storage
+        try:
+            yield storage
+        finally:
+            models.storage = previous
+            storage.all().clear()
+
+
+def populate(count: int) -> typing.List[BaseModel]:
+    """Create count objects spread over all the model classes."""
+    objects: typing.List[BaseModel] = []
+    for i in range(count):
+        obj: BaseModel = MODEL_CLASSES[i % len(MODEL_CLASSES)]()
+        obj.name = f"object {i}"  # type: ignore
+        objects.append(obj)
+
+    return objects
+
+
+def best_of(func: typing.Callable[[], typing.Any], repeat: int = 3,
+            cleanup: typing.Optional[typing.Callable[[], typing.Any]] = None
+            ) -> float:
+    """Return the fastest wall time in seconds of repeat calls to func.
+
+    Args:
+        func: the function to time.
+        repeat: number of calls to take the best of.
+        cleanup: called untimed after every call to func, if given.
+    """
+    timings: typing.List[float] = []
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+        if cleanup is not None:
+            cleanup()
+
+    return min(timings)
+
+
+def sizes_from_argv(argv: typing.List[str],
+                    default: typing.Sequence[int]) -> typing.List[int]:
+    """Return the object counts passed on the command line or default."""
+    return [int(arg) for arg in argv] if argv else list(default)
@@ -0,0 +1,215 @@
+#!/usr/bin/python3
+"""Module for suite.
+
+Times the hot paths of the models, the storage engine and the console
+against stores of increasing size and prints the results as json so that
+runs can be kept and compared between releases.
+
+Usage: python3 -m benchmarks.suite [-o FILE] [--baseline FILE]
+       [--tolerance RATIO] [--repeat N] [count ...]
+
+Every result holds the name of the benchmark, the number of stored
+objects, the number of operations timed and the best wall time in seconds
+over the repeats. With --baseline each result is compared with the result
+of the same benchmark and size in an earlier output file, and the exit
+status is 1 if any of them got slower by more than the tolerance ratio.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+import typing
+
+from benchmarks.common import best_of, populate, scratch_storage
+from console import HBNBCommand
+from models.base_model import BaseModel
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.user import User
+
+# Number of objects created, converted or looked up by the per-object
+# benchmarks, independently of the store size
+OPERATIONS: int = 1000
+# Number of console commands that save, as every save writes the store
+SAVING_COMMANDS: int = 5
+
+
+def bench_models(storage: FileStorage, objects: typing.List[BaseModel],
+                 repeat: int) -> typing.Dict[str, typing.Tuple[int, float]]:
+    """Time creating instances, assigning attributes, to_dict and rebuilding.
+
+    Assignments set a foreign key, so that its index has to follow.
+    """
+    sample: typing.List[BaseModel] = objects[:OPERATIONS]
+    dicts: typing.List[dict] = [obj.to_dict() for obj in sample]
+    created: typing.List[BaseModel] = []
+
+    def create() -> None:
+        created.extend(Place() for _ in range(OPERATIONS))
+
+    def remove() -> None:
+        for obj in created:
+            storage.delete(obj)
+
+        created.clear()
+
+    def assign() -> None:
+        for obj in sample:
+            obj.city_id = "elsewhere"  # type: ignore
+
+    return {
+        "model_create": (OPERATIONS, best_of(create, repeat, remove)),
+        "model_setattr": (len(sample), best_of(assign, repeat)),
+        "model_to_dict": (len(sample), best_of(
+            lambda: [obj.to_dict() for obj in sample], repeat)),
+        "model_from_dict": (len(dicts), best_of(
+            lambda: [type(obj)(**obj_dict) for obj, obj_dict
+                     in zip(sample, dicts, strict=True)], repeat)),
+    }
+
+
+def bench_storage(storage: FileStorage, objects: typing.List[BaseModel],
+                  repeat: int) -> typing.Dict[str, typing.Tuple[int, float]]:
+    """Time full and incremental saves and reloading the store."""
+    def full_save() -> None:
+        for obj in objects:
+            storage.touch(obj)
+
+        storage.save()
+
+    def one_dirty() -> None:
+        objects[0].name = "changed"  # type: ignore
+        storage.save()
+
+    return {
+        "storage_save": (1, best_of(full_save, repeat)),
+        "storage_save_one_dirty": (1, best_of(one_dirty, repeat)),
+        "storage_reload": (1, best_of(storage.reload, repeat)),
+    }
+
+
+def bench_console(storage: FileStorage, objects: typing.List[BaseModel],
+                  repeat: int) -> typing.Dict[str, typing.Tuple[int, float]]:
+    """Time create, show, all and update commands."""
+    console: HBNBCommand = HBNBCommand()
+    user: BaseModel = next(obj for obj in objects if isinstance(obj, User))
+    sample: typing.List[BaseModel] = objects[:OPERATIONS]
+
+    def run(lines: typing.List[str]) -> typing.Callable[[], None]:
+        def commands() -> None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for line in lines:
+                    console.onecmd(line)
+
+        return commands
+
+    shows: typing.List[str] = [
+        f"show {type(obj).__name__} {obj.id}" for obj in sample]
+    updates: typing.List[str] = [
+        f"update User {user.id} first_name Betty{i}"
+        for i in range(SAVING_COMMANDS)]
+    result: typing.Dict[str, typing.Tuple[int, float]] = {
+        "console_show": (len(shows), best_of(run(shows), repeat)),
+        "console_all_class": (1, best_of(run(["all User"]), repeat)),
+        "console_update": (len(updates), best_of(run(updates), repeat)),
+    }
+
+    before: typing.Set[str] = set(storage.all())
+    result["console_create"] = (SAVING_COMMANDS, best_of(
+        run(["create User"] * SAVING_COMMANDS), repeat))
+    for key in set(storage.all()) - before:
+        storage.delete(storage.all()[key])
+
+    return result
+
+
+def run(count: int, repeat: int) -> typing.List[typing.Dict[str, typing.Any]]:
+    """Run every benchmark against a store of count objects."""
+    results: typing.List[typing.Dict[str, typing.Any]] = []
+    with scratch_storage() as storage:
+        with storage.batch():
+            objects: typing.List[BaseModel] = populate(max(count, 6))
+
+        for bench in (bench_models, bench_storage, bench_console):
+            for name, (operations, seconds) in bench(
+                    storage, objects, repeat).items():
+                results.append({"benchmark": name, "objects": count,
+                                "operations": operations,
+                                "seconds": seconds})
+
+    return results
+
+
+def compare(results: typing.List[typing.Dict[str, typing.Any]],
+            baseline: typing.List[typing.Dict[str, typing.Any]],
+            tolerance: float) -> bool:
+    """Print how results compare with a baseline.
+
+    Returns:
+        True if no benchmark is slower than the baseline by more than the
+        tolerance ratio.
+    """
+    previous: typing.Dict[typing.Tuple[str, int], float] = {
+        (result["benchmark"], result["objects"]): result["seconds"]
+        for result in baseline}
+    passed: bool = True
+    for result in results:
+        key: typing.Tuple[str, int] = (result["benchmark"], result["objects"])
+        if not previous.get(key):
+            continue
+
+        ratio: float = result["seconds"] / previous[key]
+        regressed: bool = ratio > tolerance
+        passed = passed and not regressed
+        print(f"{key[0]:>24} {key[1]:>9} objects: {ratio:.2f}x"
+              f"{'  REGRESSION' if regressed else ''}", file=sys.stderr)
+
+    return passed
+
+
+def main(argv: typing.List[str]) -> int:
+    """Run the suite and print or write the results as json."""
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog="python3 -m benchmarks.suite",
+        description=__doc__.splitlines()[2])
+    parser.add_argument("counts", nargs="*", type=int,
+                        default=[1000, 100000, 1000000],
+                        help="store sizes, e.g. 1000 100000 1000000")
+    parser.add_argument("-o", "--output", help="write the json to a file")
+    parser.add_argument("--baseline", help="json output of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="slowdown ratio reported as a regression")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of timings to take the best of")
+    args: argparse.Namespace = parser.parse_args(argv)
+
+    report: typing.Dict[str, typing.Any] = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": [result for count in args.counts
+                    for result in run(count, args.repeat)],
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent="    ")
+    else:
+        json.dump(report, sys.stdout, indent="    ")
+        print()
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline: typing.Dict[str, typing.Any] = json.load(file)
+
+        if not compare(report["results"], baseline["results"], args.tolerance):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,13 +1,20 @@
 #!/usr/bin/python3
 """Module for console."""
 
+import argparse
 import cmd
+import itertools
+import json
 import models
+import shlex
+import sys
+import time
 import typing
 
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
+from models.engine import query
 from models.place import Place
 from models.review import Review
 from models.state import State
@@ -67,12 +74,12 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        ins_key: str = ".".join(args[:2])
-        if ins_key not in models.storage.all():
+        instance: typing.Optional[BaseModel] = models.storage.get(*args[:2])
+        if instance is None:
             print("** no instance found **")
             return
 
-        print(models.storage.all()[ins_key])
+        print(instance)
 
     def do_destroy(self, line: str) -> None:
         """Delete the specified instance.
@@ -96,37 +103,96 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        ins_key: str = ".".join(args[:2])
-        try:
-            models.storage.all().pop(ins_key)
-            models.storage.save()
-        except KeyError:
+        instance: typing.Optional[BaseModel] = models.storage.get(*args[:2])
+        if instance is None:
             print("** no instance found **")
+            return
+
+        models.storage.delete(instance)
+        models.storage.save()
 
     def do_all(self, line: str) -> None:
         """Print a list of all objects or just of the specified class.
 
-        Usage: all [ClassName]
+        Objects are printed as they are read, so the first ones show up
+        before the rest of the store is loaded.
+
+        Usage: all [ClassName] [limit=<n>] [offset=<n>] [<condition> ...]
+                   [order_by=[-]<attribute>] [explain]
 
         Arguments:
             [ClassName]: optional class name of the instances to be printed.
+            [limit=<n>]: optional maximum number of instances to print.
+            [offset=<n>]: optional number of instances to skip first.
+            [<condition>]: optional filters written as <attribute><operator>
+            <value> with one of the operators =, !=, <, <=, > or >=, e.g.
+            price_by_night<100 or city_id=<id>. Values containing spaces
+            should be quoted. Only instances satisfying every condition
+            are printed.
+            [order_by=[-]<attribute>]: optional attribute to print the
+            instances in ascending order of, or in descending order when
+            prefixed with -, e.g. order_by=-price_by_night.
+            [explain]: print how the instances would be looked up instead
+            of printing them.
         """  # noqa: D417
-        classname: str = line.split(maxsplit=1)[0] if line else ""
+        try:
+            args: typing.List[str] = shlex.split(line)
+        except ValueError:
+            print(f"** invalid argument {line} **")
+            return
+
+        explain: bool = "explain" in args
+        args = [arg for arg in args if arg != "explain"]
+        classname: str = (args.pop(0) if args and not any(
+            operator in args[0] for operator in "=<>!") else "")
 
         if classname and classname not in self.__available_classes:
             print("** class doesn't exist **")
             return
 
-        instances_list: typing.List[str] = []
-        all_instances: typing.Dict[str, BaseModel] = models.storage.all()
-        for key in all_instances:
-            if classname:
-                if key.startswith(classname):
-                    instances_list.append(str(all_instances[key]))
-            else:
-                instances_list.append(str(all_instances[key]))
-        else:
-            print(instances_list)
+        options: typing.Dict[str, typing.Optional[int]] = {
+            "limit": None, "offset": 0}
+        order_by: typing.Optional[str] = None
+        conditions: typing.List[query.Condition] = []
+        for arg in args:
+            name, _, value = arg.partition("=")
+            if name in options and value.isdigit():
+                options[name] = int(value)
+                continue
+
+            if name == "order_by" and value.lstrip("-").isidentifier():
+                order_by = value
+                continue
+
+            try:
+                if name in options or name == "order_by":
+                    raise ValueError(arg)
+
+                conditions.append(query.parse(arg))
+            except ValueError:
+                print(f"** invalid argument {arg} **")
+                return
+
+        offset: int = options["offset"] or 0
+        limit: typing.Optional[int] = options["limit"]
+        if limit is not None:
+            limit += offset
+
+        if explain:
+            print(models.storage.explain(classname or None, conditions,
+                                         order_by, limit))
+            return
+
+        instances: typing.Iterator[BaseModel] = itertools.islice(
+            models.storage.query(classname or None, conditions, order_by,
+                                 limit), offset, None)
+        separator: str = ""
+        print("[", end="")
+        for obj in instances:
+            print(separator, repr(str(obj)), sep="", end="")
+            separator = ", "
+
+        print("]")
 
     def do_update(self, line: str) -> None:
         """Update an existing instance's attribute.
@@ -152,8 +218,8 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        ins_key: str = ".".join(args[:2])
-        if ins_key not in models.storage.all():
+        instance: typing.Optional[BaseModel] = models.storage.get(*args[:2])
+        if instance is None:
             print("** no instance found **")
             return
 
@@ -167,14 +233,249 @@ class HBNBCommand(cmd.Cmd):
             return
 
         value: str = args[3]
-        instance: BaseModel = models.storage.all()[ins_key]
-        if hasattr(instance, attr_name):
-            attr_type: type = type(getattr(instance, attr_name))
-            setattr(instance, attr_name, attr_type(value))
-        else:
-            setattr(instance, attr_name, value)
+        with models.storage.batch():
+            if hasattr(instance, attr_name):
+                attr_type: type = type(getattr(instance, attr_name))
+                setattr(instance, attr_name, attr_type(value))
+            else:
+                setattr(instance, attr_name, value)
+
+            instance.save()
+
+    def do_nearby(self, line: str) -> None:
+        """Print the places within a radius of a point, nearest first.
+
+        Usage: nearby <latitude> <longitude> <radius> [limit=<n>]
+
+        Arguments:
+            <latitude>: mandatory latitude of the point in degrees.
+            <longitude>: mandatory longitude of the point in degrees.
+            <radius>: mandatory maximum distance in kilometres.
+            [limit=<n>]: optional maximum number of places to print.
+        """  # noqa: D417
+        args: typing.List[str] = line.split()
+        coordinates: typing.List[float] = []
+        limit: typing.Optional[int] = None
+        for arg in args:
+            name, _, value = arg.partition("=")
+            try:
+                if name == "limit" and value.isdigit():
+                    limit = int(value)
+                elif len(coordinates) < 3:
+                    coordinates.append(float(arg))
+                else:
+                    raise ValueError(arg)
+            except ValueError:
+                print(f"** invalid argument {arg} **")
+                return
+
+        if len(coordinates) < 3:
+            missing: str = ("latitude", "longitude", "radius")[
+                len(coordinates)]
+            print(f"** {missing} missing **")
+            return
+
+        places: typing.List[typing.Tuple[BaseModel, float]] = \
+            models.storage.nearby(*coordinates, limit=limit)
+        print([str(obj) for obj, _ in places])
+
+    def do_search(self, line: str) -> None:
+        """Print the instances whose text holds every given word, best first.
+
+        Reviews are searched by their text and places by their name and
+        description, ignoring case.
+
+        Usage: search [ClassName] <words> [limit=<n>]
+
+        Arguments:
+            [ClassName]: optional class name of the instances to be printed.
+            <words>: mandatory words to look for.
+            [limit=<n>]: optional maximum number of instances to print.
+        """  # noqa: D417
+        args: typing.List[str] = line.split()
+        classname: str = (args.pop(0) if args
+                          and args[0] in self.__available_classes else "")
+        limit: typing.Optional[int] = None
+        words: typing.List[str] = []
+        for arg in args:
+            name, _, value = arg.partition("=")
+            if name != "limit":
+                words.append(arg)
+            elif value.isdigit():
+                limit = int(value)
+            else:
+                print(f"** invalid argument {arg} **")
+                return
 
-        instance.save()
+        if not words:
+            print("** search text missing **")
+            return
+
+        instances: typing.List[BaseModel] = models.storage.search(
+            " ".join(words), classname or None, limit)
+        print([str(obj) for obj in instances])
+
+    def do_export(self, line: str) -> None:
+        """Write all instances, or those of a class, to a file.
+
+        Every line of the file is the dictionary of an instance in json.
+        Instances are written as they are read from the store, so the
+        store is never held in memory at once.
+
+        Usage: export <file> [ClassName]
+
+        Arguments:
+            <file>: mandatory path of the file to write. Paths containing
+            spaces should be quoted.
+            [ClassName]: optional class name of the instances to write.
+        """  # noqa: D417
+        try:
+            args: typing.List[str] = shlex.split(line)
+        except ValueError:
+            print(f"** invalid argument {line} **")
+            return
+
+        if not args:
+            print("** file name missing **")
+            return
+
+        classname: str = args[1] if len(args) > 1 else ""
+        if classname and classname not in self.__available_classes:
+            print("** class doesn't exist **")
+            return
+
+        written: int = 0
+        try:
+            with open(args[0], "w", encoding="utf-8") as file:
+                for obj in models.storage.iterate(classname or None):
+                    file.write(json.dumps(obj.to_dict()) + "\n")
+                    written += 1
+        except OSError:
+            print(f"** can't write file {args[0]} **")
+            return
+
+        print(written)
+
+    def do_import(self, line: str) -> None:
+        """Create or replace the instances written to a file by export.
+
+        Records are read and turned into instances one line at a time and
+        the store is saved once at the end. Nothing is imported if any
+        record is invalid.
+
+        Usage: import <file>
+
+        Arguments:
+            <file>: mandatory path of the file to read. Paths containing
+            spaces should be quoted.
+        """  # noqa: D417
+        try:
+            args: typing.List[str] = shlex.split(line)
+        except ValueError:
+            print(f"** invalid argument {line} **")
+            return
+
+        if not args:
+            print("** file name missing **")
+            return
+
+        try:
+            with open(args[0], encoding="utf-8") as file, \
+                    models.storage.batch():
+                imported: int = 0
+                for obj in self.__instances(file):
+                    models.storage.new(obj)
+                    imported += 1
+
+                models.storage.save()
+        except OSError:
+            print(f"** can't read file {args[0]} **")
+            return
+        except ValueError as error:
+            print(f"** {error} **")
+            return
+
+        print(imported)
+
+    def __instances(self, lines: typing.Iterable[str]
+                    ) -> typing.Iterator[BaseModel]:
+        """Yield the instances of json records, one per non-empty line.
+
+        Raises:
+            ValueError: naming the line of a record that is not valid json,
+            is not of an available class or misses its id or dates.
+        """
+        for number, text in enumerate(lines, 1):
+            if not text.strip():
+                continue
+
+            try:
+                record: typing.Any = json.loads(text)
+                cls: type = self.__available_classes[record["__class__"]]
+                if not record["id"] or not isinstance(record["id"], str):
+                    raise ValueError(record["id"])
+
+                yield cls(**record)
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"invalid record at line {number}") from None
+
+    def do_commit(self, line: str) -> None:
+        """Save the store.
+
+        In batch mode the changes of the commands since the last commit
+        are saved together, otherwise every command saves on its own.
+
+        Usage: commit
+        """
+        models.storage.save()
+
+    def run_batch(self, lines: typing.Iterable[str],
+                  timings: bool = False) -> None:
+        """Run the commands of a script, saving the store once per commit.
+
+        Commands only change the objects in memory and the store is saved
+        at every commit line and at the end of the script. Empty lines and
+        lines starting with # are skipped and quit ends the script early.
+        An error raised by a command undoes the changes since the last
+        commit.
+
+        Args:
+            lines: the commands, one per line.
+            timings: if True, print how long every command and every
+                commit took to stderr.
+        """
+        commands: typing.Iterator[str] = iter(lines)
+        done: bool = False
+        while not done:
+            with models.storage.batch():
+                done = True
+                for line in commands:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+
+                    if line == "commit":
+                        done = False
+                        break
+
+                    started: float = time.perf_counter()
+                    stop: bool = self.onecmd(self.precmd(line))
+                    if timings:
+                        self.__report(line, started)
+
+                    if stop:
+                        break
+
+                started = time.perf_counter()
+
+            if timings:
+                self.__report("commit", started)
+
+    @staticmethod
+    def __report(line: str, started: float) -> None:
+        """Print the time elapsed since started running line to stderr."""
+        elapsed: float = time.perf_counter() - started
+        print(f"{elapsed * 1000:10.3f} ms  {line}", file=sys.stderr)
 
     def emptyline(self) -> bool:
         """Ignore empty lines."""
@@ -193,5 +494,41 @@ class HBNBCommand(cmd.Cmd):
         return True
 
 
+def main(argv: typing.List[str]) -> None:
+    """Run the console interactively, or the commands of a batch script.
+
+    Args:
+        argv: the command line arguments, without the program name.
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Command interpreter of the HBNB objects.")
+    parser.add_argument(
+        "--batch", nargs="?", const="-", metavar="SCRIPT",
+        help="run the commands of SCRIPT, or of stdin without it, saving"
+        " the store once at the end and at every commit line")
+    parser.add_argument(
+        "--timings", action="store_true",
+        help="in batch mode, print how long every command took to stderr")
+    args: argparse.Namespace = parser.parse_args(argv)
+    console: HBNBCommand = HBNBCommand()
+    try:
+        if args.batch is None:
+            console.cmdloop()
+        elif args.batch == "-":
+            console.run_batch(sys.stdin, args.timings)
+        else:
+            try:
+                with open(args.batch, encoding="utf-8") as script:
+                    console.run_batch(script, args.timings)
+            except OSError as error:
+                if error.filename != args.batch:
+                    raise
+
+                parser.error(f"can't read {args.batch}: {error.strerror}")
+    finally:
+        # Writes what saves leave out, e.g. the full-text index
+        models.storage.close()
+
+
 if __name__ == "__main__":
-    HBNBCommand().cmdloop()
+    main(sys.argv[1:])
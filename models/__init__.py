@@ -1,8 +1,42 @@
 #!/usr/bin/python3
-"""Module for __init__."""
+"""Module for __init__.
+
+The storage engine is chosen with the HBNB_TYPE_STORAGE environment
+variable: "db" selects the sqlite3 backed DBStorage, anything else the json
+backed FileStorage, configured through the HBNB_STORAGE_* variables.
+"""
+
+import os
+import typing
 
 from models.engine.file_storage import FileStorage
 
 
-storage: FileStorage = FileStorage()
+def _env_flag(name: str) -> bool:
+    """Return True if the environment variable name is set to a yes."""
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+
+storage: typing.Any
+if os.getenv("HBNB_TYPE_STORAGE") == "db":
+    from models.engine.db_storage import DBStorage
+
+    storage = DBStorage(os.getenv("HBNB_DB_PATH"))
+else:
+    storage = FileStorage(
+        journal=_env_flag("HBNB_STORAGE_JOURNAL"),
+        compact_threshold=int(
+            os.getenv("HBNB_STORAGE_COMPACT_THRESHOLD", "1000")),
+        lazy=_env_flag("HBNB_STORAGE_LAZY"),
+        write_behind_ms=int(os.getenv("HBNB_STORAGE_WRITE_BEHIND_MS", "0")),
+        write_behind_mutations=int(
+            os.getenv("HBNB_STORAGE_WRITE_BEHIND_MUTATIONS", "100")),
+        compact_models=_env_flag("HBNB_STORAGE_COMPACT_MODELS"),
+        shards=int(os.getenv("HBNB_STORAGE_SHARDS", "0")),
+        workers=int(os.getenv("HBNB_STORAGE_RELOAD_WORKERS", "0")),
+        offset_index=_env_flag("HBNB_STORAGE_OFFSET_INDEX"),
+        max_objects=int(os.getenv("HBNB_STORAGE_MAX_OBJECTS", "0")),
+        shared=_env_flag("HBNB_STORAGE_SHARED"),
+        threadsafe=_env_flag("HBNB_STORAGE_THREADSAFE"))
+
 storage.reload()
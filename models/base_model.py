@@ -7,8 +7,23 @@ import typing
 import uuid
 
 
-class BaseModel:
-    """Base model class."""
+class Model:
+    """Behaviour shared by BaseModel and the compact model classes.
+
+    Instances record the storage engine holding them in _storage, set by
+    the engine when it stores them, so that attribute assignments mark
+    them dirty in that engine rather than in models.storage. Model has no
+    instance dictionary: BaseModel adds one, while the compact classes of
+    models.compact keep their attributes in slots.
+    """
+
+    __slots__ = ("_storage", "__weakref__")
+
+    def __new__(cls, *args, **kwargs) -> "Model":
+        """Create an instance not held by any storage engine yet."""
+        obj: "Model" = super().__new__(cls)
+        object.__setattr__(obj, "_storage", None)
+        return obj
 
     def __init__(self, *args, **kwargs) -> None:
         """Initialise some attributes."""
@@ -28,15 +43,28 @@ class BaseModel:
                 if key in dir_set:
                     setattr(self, key, val)
 
-    def __str__(self) -> str:
-        """Print details about the instance."""
-        return f"[{self.__class__.__name__}] ({self.id}) {self.__dict__}"
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        """Set an attribute, marking the instance dirty in its storage."""
+        if self._storage is not None:
+            self._storage.touch(self)
+
+        super().__setattr__(name, value)
 
     def save(self) -> None:
         """Update updated_at to current datetime."""
         self.updated_at = datetime.now()
         models.storage.save()
 
+
+class BaseModel(Model):
+    """Base model class."""
+
+    __slots__ = ("__dict__",)
+
+    def __str__(self) -> str:
+        """Print details about the instance."""
+        return f"[{self.__class__.__name__}] ({self.id}) {self.__dict__}"
+
     def to_dict(self) -> typing.Dict[str, str]:
         """Return the __dict__ attribute of an instance."""
         ins_dict: dict = dict(**self.__dict__)
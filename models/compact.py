@@ -0,0 +1,182 @@
+#!/usr/bin/python3
+"""Module for compact.
+
+Compact variants of the model classes for large datasets. A compact class
+has the name of its model class and keeps the id, the timestamps and the
+attributes declared on the model class in slots, and interns the values of
+foreign keys so that objects pointing at the same parent share one string.
+Attributes that are not declared on the class are kept in a dictionary that
+is only created when such an attribute is set.
+
+Compact classes derive from models.base_model.Model rather than from their
+model class, so that their instances have no instance dictionary at all;
+they report the model class as their __class__, which keeps isinstance
+working. Instances keep working with to_dict, __str__ and the console's
+update command, the only visible difference being that their attributes
+are listed in declaration order rather than assignment order.
+"""
+
+from contextlib import suppress
+import sys
+import typing
+
+from models.base_model import BaseModel, Model
+from models.engine.indexes import FOREIGN_KEYS
+
+_compact_classes: typing.Dict[type, type] = {}
+
+
+def attributes(obj: BaseModel) -> typing.Dict[str, typing.Any]:
+    """Return the attributes set on an instance, compact or not."""
+    fields: typing.Tuple[str, ...] = getattr(type(obj), "_fields", ())
+    if not fields:
+        return dict(obj.__dict__)
+
+    attrs: typing.Dict[str, typing.Any] = {}
+    for name in fields:
+        # try is several times cheaper than suppress on this hot path
+        try:  # noqa: SIM105
+            attrs[name] = object.__getattribute__(obj, name)
+        except AttributeError:
+            pass
+
+    attrs.update(obj._extra or {})  # type: ignore
+    return attrs
+
+
+def assigned(obj: BaseModel, name: str) -> typing.Any:
+    """Return an attribute set on an instance, or None if it is not set.
+
+    Unlike getattr, this does not fall back to the class default.
+    """
+    fields: typing.Tuple[str, ...] = getattr(type(obj), "_fields", ())
+    if not fields:
+        return obj.__dict__.get(name)
+
+    if name in fields:
+        try:
+            return object.__getattribute__(obj, name)
+        except AttributeError:
+            return None
+
+    return (obj._extra or {}).get(name)  # type: ignore
+
+
+def restore(obj: BaseModel, attrs: typing.Dict[str, typing.Any]) -> None:
+    """Replace the attributes of an instance without notifying storage."""
+    fields: typing.Tuple[str, ...] = getattr(type(obj), "_fields", ())
+    if not fields:
+        obj.__dict__.clear()
+        obj.__dict__.update(attrs)
+        return
+
+    for name in fields:
+        if name in attrs:
+            object.__setattr__(obj, name, attrs[name])
+        else:
+            with suppress(AttributeError):
+                object.__delattr__(obj, name)
+
+    object.__setattr__(obj, "_extra", {name: value for name, value
+                                       in attrs.items()
+                                       if name not in fields} or None)
+
+
+def compact_class(cls: type) -> type:
+    """Return the compact variant of a model class, creating it once."""
+    if cls not in _compact_classes:
+        _compact_classes[cls] = _make_compact_class(cls)
+
+    return _compact_classes[cls]
+
+
+def _make_compact_class(cls: type) -> type:
+    """Build the slotted class standing in for a model class."""
+    fields: typing.List[str] = ["id", "created_at", "updated_at"]
+    methods: typing.Dict[str, typing.Any] = {}
+    for klass in reversed(cls.__mro__):
+        if not issubclass(klass, BaseModel):
+            continue
+
+        for name, value in vars(klass).items():
+            if name.startswith("_") or name in fields:
+                continue
+
+            if callable(value) or isinstance(value, (property, classmethod,
+                                                     staticmethod)):
+                if klass is not BaseModel:
+                    methods[name] = value
+            else:
+                fields.append(name)
+
+    field_set: typing.FrozenSet[str] = frozenset(fields)
+    interned: typing.FrozenSet[str] = frozenset(
+        FOREIGN_KEYS.get(cls.__name__, ()))
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:  # noqa: N807
+        """Set an attribute, marking the instance dirty in its storage."""
+        if self._storage is not None:
+            self._storage.touch(self)
+
+        if name in field_set:
+            if name in interned and type(value) is str:
+                value = sys.intern(value)
+
+            object.__setattr__(self, name, value)
+            return
+
+        extra: typing.Optional[dict] = self._extra
+        if extra is None:
+            extra = {}
+            object.__setattr__(self, "_extra", extra)
+
+        extra[name] = value
+
+    def __getattr__(self, name: str) -> typing.Any:
+        """Look up undeclared attributes and class defaults."""
+        if name == "_extra":
+            return None
+
+        if name.startswith("__"):
+            # Not the class's own __dict__ and the like
+            raise AttributeError(
+                f"{cls.__name__!r} object has no attribute {name!r}")
+
+        extra: typing.Optional[dict] = self._extra
+        if extra is not None and name in extra:
+            return extra[name]
+
+        return getattr(cls, name)
+
+    def __dir__(self) -> typing.List[str]:
+        """List the attributes of the model class and the slots."""
+        return [*object.__dir__(self), *fields]
+
+    def __str__(self) -> str:  # noqa: N807
+        """Print details about the instance."""
+        return f"[{cls.__name__}] ({self.id}) {attributes(self)}"
+
+    def to_dict(self) -> typing.Dict[str, str]:
+        """Return the attributes of the instance as a dictionary."""
+        ins_dict: dict = attributes(self)
+        ins_dict["__class__"] = cls.__name__
+        ins_dict["created_at"] = self.created_at.isoformat()
+        ins_dict["updated_at"] = self.updated_at.isoformat()
+
+        return ins_dict
+
+    namespace: typing.Dict[str, typing.Any] = {
+        **methods,
+        "__slots__": (*fields, "_extra"),
+        "__module__": cls.__module__,
+        "__qualname__": cls.__qualname__,
+        "__doc__": f"Compact variant of {cls.__name__}.",
+        "_fields": tuple(fields),
+        "__setattr__": __setattr__,
+        "__getattr__": __getattr__,
+        "__dir__": __dir__,
+        "__str__": __str__,
+        "to_dict": to_dict,
+        "__class__": property(lambda self: cls),
+    }
+    return type(cls.__name__, (Model,), namespace)
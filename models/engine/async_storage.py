@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+"""Module for async_storage."""
+
+import asyncio
+import typing
+
+from models.base_model import BaseModel
+
+
+class AsyncStorageMixin:
+    """Coroutines running the methods of a storage engine in an executor.
+
+    asave, areload, aget and aall run save, reload, get and all in the
+    default executor of the running loop. Concurrent calls to asave are
+    coalesced: while a save runs, every new call waits for the one save
+    started after it.
+
+    Engines using it implement save, reload, get and all, and _offloadable.
+    """
+
+    def __init__(self) -> None:
+        """Initialise the state of the coalesced saves."""
+        self.__next_save: typing.Optional[asyncio.Future] = None
+        self.__running_save: typing.Optional[asyncio.Future] = None
+        self.__save_tasks: typing.Set[asyncio.Task] = set()
+
+    def _offloadable(self) -> bool:
+        """Prepare the engine for use from the executor.
+
+        Returns:
+            False if calls have to run in place instead, e.g. inside a
+            batch block holding a lock the executor would wait for.
+        """
+        raise NotImplementedError
+
+    async def asave(self) -> None:
+        """Save without blocking the event loop.
+
+        Calls made while a save is running are coalesced into one save,
+        started when the running one finishes, that they all wait for.
+        """
+        if not self._offloadable():
+            self.save()  # type: ignore
+            return
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        waiter: typing.Optional[asyncio.Future] = self.__next_save
+        if waiter is None or waiter.get_loop() is not loop:
+            waiter = self.__next_save = loop.create_future()
+            task: asyncio.Task = loop.create_task(self.__save_after(waiter))
+            self.__save_tasks.add(task)
+            task.add_done_callback(self.__save_tasks.discard)
+
+        # A cancelled caller must not cancel the save others wait for
+        await asyncio.shield(waiter)
+
+    async def areload(self) -> None:
+        """Reload in the default executor of the running loop."""
+        await self.__offload(self.reload)  # type: ignore
+
+    async def aget(self, cls: typing.Union[type, str],
+                   obj_id: str) -> typing.Optional[BaseModel]:
+        """Look up an object like get without blocking the event loop."""
+        return await self.__offload(self.get, cls, obj_id)  # type: ignore
+
+    async def aall(self, cls: typing.Union[type, str, None] = None
+                   ) -> typing.Dict[str, BaseModel]:
+        """Return the objects like all without blocking the event loop."""
+        return await self.__offload(self.all, cls)  # type: ignore
+
+    async def __save_after(self, waiter: asyncio.Future) -> None:
+        """Run the save waiter stands for once the running one is done."""
+        running: typing.Optional[asyncio.Future] = self.__running_save
+        if running is not None and running.get_loop() is waiter.get_loop():
+            await asyncio.wait([running])
+
+        if self.__next_save is waiter:
+            self.__next_save = None
+
+        self.__running_save = waiter
+        try:
+            await self.__offload(self.save)  # type: ignore
+        except asyncio.CancelledError:
+            waiter.cancel()
+            raise
+        except Exception as error:
+            waiter.set_exception(error)
+        else:
+            waiter.set_result(None)
+
+    async def __offload(self, func: typing.Callable[..., typing.Any],
+                        *args: typing.Any) -> typing.Any:
+        """Call func in the default executor, or in place if it must."""
+        if not self._offloadable():
+            return func(*args)
+
+        return await asyncio.get_running_loop().run_in_executor(
+            None, func, *args)
@@ -0,0 +1,163 @@
+#!/usr/bin/python3
+"""Module for catalog."""
+
+import typing
+
+from models.engine.indexes import AttributeIndex, FOREIGN_KEYS, GridIndex
+from models.engine.indexes import LOCATION_FIELDS, RANGE_FIELDS, SortedIndex
+from models.engine.query import Condition, Plan, range_of
+
+
+class Catalog:
+    """Indexes of the keys of a FileStorage, and the planner using them.
+
+    Keys are indexed by class name, by the foreign keys listed in
+    FOREIGN_KEYS, by the numbers listed in RANGE_FIELDS and by the
+    coordinates listed in LOCATION_FIELDS.
+    """
+
+    def __init__(self) -> None:
+        """Initialise empty indexes."""
+        self.__by_class: typing.Dict[str, typing.Dict[str, None]] = dict()
+        self.__by_relation: typing.Dict[typing.Tuple[str, str],
+                                        AttributeIndex] = {
+            (classname, field): AttributeIndex()
+            for classname, fields in FOREIGN_KEYS.items()
+            for field in fields}
+        self.__by_range: typing.Dict[typing.Tuple[str, str],
+                                     SortedIndex] = {
+            (classname, field): SortedIndex()
+            for classname, fields in RANGE_FIELDS.items()
+            for field in fields}
+        self.__locations: GridIndex = GridIndex()
+
+    def classnames(self) -> typing.List[str]:
+        """Return the names of the classes with keys, in indexing order."""
+        return list(self.__by_class)
+
+    def bucket(self, classname: str) -> typing.Dict[str, None]:
+        """Return the keys indexed for a class, as a live dictionary."""
+        return self.__by_class.setdefault(classname, {})
+
+    def prune(self, classname: str, keys: typing.List[str]) -> None:
+        """Replace the keys indexed for a class with keys."""
+        self.__by_class[classname] = dict.fromkeys(keys)
+
+    def relation(self, classname: str,
+                 field: str) -> typing.Optional[AttributeIndex]:
+        """Return the reverse index of a foreign key, if it has one."""
+        return self.__by_relation.get((classname, field))
+
+    def within(self, latitude: float, longitude: float, radius: float
+               ) -> typing.List[typing.Tuple[str, float]]:
+        """Return the located keys around a point, see GridIndex.within."""
+        return self.__locations.within(latitude, longitude, radius)
+
+    def add(self, key: str, value_of: typing.Callable[[str], typing.Any],
+            assigned_of: typing.Callable[[str], typing.Any]) -> None:
+        """Add key to the indexes given getters for its attributes.
+
+        Args:
+            key: key of the object.
+            value_of: getter of an attribute, falling back to the class
+                default.
+            assigned_of: getter of an attribute set on the object itself,
+                None otherwise. Only places with coordinates of their own
+                are located.
+        """
+        classname: str = key.partition(".")[0]
+        self.bucket(classname)[key] = None
+        for field in FOREIGN_KEYS.get(classname, ()):
+            self.__by_relation[classname, field].add(key, value_of(field))
+
+        for field in RANGE_FIELDS.get(classname, ()):
+            self.__by_range[classname, field].add(key, value_of(field))
+
+        if classname in LOCATION_FIELDS:
+            self.__locations.add(key, *map(assigned_of,
+                                           LOCATION_FIELDS[classname]))
+
+    def discard(self, key: str) -> None:
+        """Remove key from the indexes."""
+        classname: str = key.partition(".")[0]
+        self.__by_class.get(classname, {}).pop(key, None)
+        for field in FOREIGN_KEYS.get(classname, ()):
+            self.__by_relation[classname, field].discard(key)
+
+        for field in RANGE_FIELDS.get(classname, ()):
+            self.__by_range[classname, field].discard(key)
+
+        self.__locations.discard(key)
+
+    def plan(self, classname: str, conditions: typing.List[Condition],
+             order_by: typing.Optional[str],
+             limit: typing.Optional[int],
+             class_keys: typing.Callable[[], typing.List[str]]
+             ) -> typing.Tuple[Plan, typing.Iterable[str], bool]:
+        """Return the plan of a query on a class and its candidate keys.
+
+        Also returns whether the objects still have to be sorted. Every
+        access path costs the number of candidates it yields, and any index
+        is preferred to the class index on a tie. An ordered scan of the
+        index of the field ordered by with a limit is expected to stop
+        after limit times the candidates it yields per candidate of the
+        cheapest other path.
+
+        Args:
+            classname: name of the class queried.
+            conditions: the conditions of the query.
+            order_by: optional attribute to order by, "-" for descending.
+            limit: optional maximum number of objects wanted.
+            class_keys: returns the stored keys of the class, only called
+                if no index is used.
+        """
+        keys: typing.Optional[typing.Iterable[str]] = None
+        cost: int = len(self.__by_class.get(classname, {}))
+        plan: Plan = Plan(f"class index {classname}", conditions, cost)
+        for condition in conditions:
+            index: typing.Optional[AttributeIndex] = self.relation(
+                classname, condition.field)
+            if index is None or condition.op != "=":
+                continue
+
+            found: typing.List[str] = index.keys(condition.value)
+            if keys is None or len(found) < cost:
+                cost, keys = len(found), found
+                plan = Plan(f"foreign key index {classname}.{condition.field}",
+                            [other for other in conditions
+                             if other is not condition], cost)
+
+        for field in RANGE_FIELDS.get(classname, ()):
+            bounds, used = range_of(conditions, field)
+            candidates: int = self.__by_range[classname, field].count(*bounds)
+            if used and (keys is None or candidates < cost):
+                cost = candidates
+                keys = self.__by_range[classname, field].scan(*bounds)
+                plan = Plan(f"range index {classname}.{field}",
+                            [other for other in conditions
+                             if other not in used], cost)
+
+        field = (order_by or "").lstrip("-")
+        if order_by and field in RANGE_FIELDS.get(classname, ()):
+            bounds, used = range_of(conditions, field)
+            candidates = self.__by_range[classname, field].count(*bounds)
+            if limit is not None:
+                candidates = min(candidates,
+                                 -(-limit * candidates // max(cost, 1)))
+
+            if candidates <= cost:
+                return Plan(f"range index {classname}.{field}",
+                            [other for other in conditions
+                             if other not in used],
+                            candidates, f"{order_by} (index)"), \
+                    self.__by_range[classname, field].scan(
+                        *bounds, descending=order_by.startswith("-")), False
+
+        if keys is None:
+            keys = class_keys()
+            plan = plan._replace(candidates=len(keys))
+
+        if order_by:
+            plan = plan._replace(order=f"{order_by} (sort)")
+
+        return plan, keys, bool(order_by)
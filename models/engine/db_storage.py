@@ -0,0 +1,691 @@
+#!/usr/bin/python3
+"""Module for db_storage."""
+
+import contextlib
+import heapq
+import itertools
+import json
+import math
+import sqlite3
+import typing
+
+from models.amenity import Amenity
+from models.base_model import BaseModel
+from models.city import City
+from models.compact import assigned
+from models.engine.deserializers import Deserializer
+from models.engine.indexes import distance, EARTH_RADIUS, FOREIGN_KEYS
+from models.engine.indexes import LOCATION_FIELDS, RANGE_FIELDS
+from models.engine.indexes import TEXT_FIELDS, terms
+from models.engine.query import Condition, Plan, conditions_of, matches_all
+from models.engine.query import ordered, range_of, sort_key
+from models.engine.undo import UndoLog
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+
+def _quoted(name: str) -> str:
+    """Return a name quoted as an sql identifier or an fts5 string."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DBStorage:
+    """Class for DBStorage.
+
+    Storage engine with the same interface as FileStorage backed by an
+    sqlite3 database holding one table per model class. Every table has the
+    id as primary key, the timestamps, an indexed column for each foreign
+    key of the class and the json of the whole instance. The attributes
+    listed in TEXT_FIELDS are also kept in an fts5 table for search and
+    the latitude of places gets an expression index for nearby.
+
+    Objects are only loaded when looked up and kept in an identity map so
+    that every lookup of a key returns the same instance. save writes the
+    objects created, changed or deleted since the last save in a single
+    transaction. Inside a batch block the saves are coalesced into one and
+    an error restores the objects changed inside the block.
+    """
+
+    __db_path: str = "saved_objects.db"
+    __classes: typing.Dict[str, type] = {
+        "BaseModel": BaseModel, "User": User, "Place": Place,
+        "State": State, "City": City, "Amenity": Amenity, "Review": Review
+    }
+
+    __deserializers: typing.Dict[str, Deserializer] = {
+        classname: Deserializer(cls) for classname, cls in __classes.items()}
+
+    def __init__(self, db_path: typing.Optional[str] = None) -> None:
+        """Open the database, creating the tables if needed.
+
+        Args:
+            db_path: path of the database file, defaults to
+                saved_objects.db.
+        """
+        if db_path:
+            self.__db_path = db_path
+
+        self.__connection: sqlite3.Connection = sqlite3.connect(
+            self.__db_path)
+        self.__objects: typing.Dict[str, BaseModel] = dict()
+        self.__dirty: typing.Dict[str, None] = dict()
+        self.__inserted: typing.Dict[str, None] = dict()
+        self.__deleted: typing.Set[str] = set()
+        self.__undo: typing.Optional[UndoLog] = None
+        with self.__connection:
+            for classname in self.__classes:
+                self.__create_table(classname)
+
+            self.__create_text_table()
+
+    def all(self, cls: typing.Union[type, str, None] = None
+            ) -> typing.Dict[str, BaseModel]:
+        """Return a dictionary of all objects or of the objects of a class.
+
+        Args:
+            cls: optional class, or class name, to restrict the result to.
+        """
+        classnames: typing.Iterable[str] = self.__classes
+        if cls is not None:
+            classnames = [cls if isinstance(cls, str) else cls.__name__]
+
+        objects: typing.Dict[str, BaseModel] = {}
+        for classname in classnames:
+            if classname not in self.__classes:
+                continue
+
+            rows: sqlite3.Cursor = self.__connection.execute(
+                f"SELECT id, data FROM {_quoted(classname)} ORDER BY rowid")
+            objects.update(self.__load_rows(classname, rows))
+            for key in self.__inserted:
+                if key.partition(".")[0] == classname:
+                    objects[key] = self.__objects[key]
+
+        return objects
+
+    def iterate(self, cls: typing.Union[type, str, None] = None
+                ) -> typing.Iterator[BaseModel]:
+        """Yield the objects all would return, one at a time.
+
+        Rows are read from the database as they are reached, so stopping
+        early leaves the remaining rows unread.
+
+        Args:
+            cls: optional class, or class name, to restrict the result to.
+        """
+        classnames: typing.Iterable[str] = self.__classes
+        if cls is not None:
+            classnames = [cls if isinstance(cls, str) else cls.__name__]
+
+        for classname in classnames:
+            if classname not in self.__classes:
+                continue
+
+            rows: sqlite3.Cursor = self.__connection.execute(
+                f"SELECT id, data FROM {_quoted(classname)} ORDER BY rowid")
+            for _, obj in self.__iter_rows(classname, rows):
+                yield obj
+
+            for key in list(self.__inserted):
+                if (key.partition(".")[0] == classname
+                        and key in self.__objects):
+                    yield self.__objects[key]
+
+    def count(self, cls: typing.Union[type, str, None] = None) -> int:
+        """Return the number of objects, or of objects of a class."""
+        if cls is None:
+            return sum(self.count(classname) for classname in self.__classes)
+
+        classname: str = cls if isinstance(cls, str) else cls.__name__
+        if classname not in self.__classes:
+            return 0
+
+        stored: int = self.__connection.execute(
+            f"SELECT COUNT(*) FROM {_quoted(classname)}").fetchone()[0]
+        for key in self.__inserted:
+            stored += key.partition(".")[0] == classname
+
+        for key in self.__deleted:
+            stored -= key.partition(".")[0] == classname
+
+        return stored
+
+    def get(self, cls: typing.Union[type, str],
+            obj_id: str) -> typing.Optional[BaseModel]:
+        """Return the object of a class with the given id, if stored."""
+        classname: str = cls if isinstance(cls, str) else cls.__name__
+        key: str = f"{classname}.{obj_id}"
+        if key in self.__objects:
+            return self.__objects[key]
+
+        if key in self.__deleted or classname not in self.__classes:
+            return None
+
+        rows: sqlite3.Cursor = self.__connection.execute(
+            f"SELECT id, data FROM {_quoted(classname)} WHERE id = ?",
+            (obj_id,))
+        return self.__load_rows(classname, rows).get(key)
+
+    def related(self, cls: typing.Union[type, str], field: str,
+                value: str) -> typing.Dict[str, BaseModel]:
+        """Return the objects of a class whose foreign key equals value.
+
+        Args:
+            cls: class, or class name, of the objects to look up.
+            field: name of the foreign key attribute, e.g. "city_id".
+            value: id of the referenced object.
+        """
+        classname: str = cls if isinstance(cls, str) else cls.__name__
+        if field not in FOREIGN_KEYS.get(classname, ()):
+            return {key: obj for key, obj in self.all(classname).items()
+                    if getattr(obj, field, None) == value}
+
+        rows: sqlite3.Cursor = self.__connection.execute(
+            f"SELECT id, data FROM {_quoted(classname)}"
+            f" WHERE {_quoted(field)} = ? ORDER BY rowid", (value,))
+        objects: typing.Dict[str, BaseModel] = self.__load_rows(
+            classname, rows)
+        for key in self.__dirty:
+            obj: typing.Optional[BaseModel] = self.__objects.get(key)
+            if key.partition(".")[0] == classname and obj is not None:
+                objects[key] = obj
+
+        return {key: obj for key, obj in objects.items()
+                if getattr(obj, field, None) == value}
+
+    def query(self, cls: typing.Union[type, str, None] = None,
+              conditions: typing.Iterable[typing.Union[str, Condition]] = (),
+              order_by: typing.Optional[str] = None,
+              limit: typing.Optional[int] = None
+              ) -> typing.Iterator[BaseModel]:
+        """Yield the objects satisfying every condition, one at a time.
+
+        An equality condition on a foreign key selects the rows through the
+        column index like related, range conditions on a field of
+        RANGE_FIELDS through its expression index, otherwise the table of
+        cls, or every table, is scanned. The other conditions are checked
+        on the objects, and so are all of them on the objects changed
+        since the last save.
+
+        Ordering by a field of RANGE_FIELDS reads the rows in order from
+        its index unless a foreign key selects them, so that taking the
+        first objects leaves the other rows unread.
+
+        Args:
+            cls: optional class, or class name, to restrict the result to.
+            conditions: conditions such as "price_by_night<100", see
+                models.engine.query.
+            order_by: optional attribute to order the objects by, prefixed
+                with "-" for descending order.
+            limit: optional maximum number of objects to yield.
+
+        Raises:
+            ValueError: if a condition is not valid.
+        """
+        filters: typing.List[Condition] = conditions_of(conditions)
+        objects: typing.Iterable[BaseModel]
+        sort: bool = order_by is not None
+        if cls is None:
+            objects = (obj for obj in self.iterate()
+                       if matches_all(obj, filters))
+        else:
+            classname: str = cls if isinstance(cls, str) else cls.__name__
+            plan, where, parameters = self.__select(classname, filters,
+                                                    order_by)
+            sort = plan.order.endswith("(sort)")
+            objects = self.__selected(classname, filters, plan, where,
+                                      parameters, order_by)
+
+        if sort and order_by:
+            return iter(ordered(objects, order_by, limit))
+
+        return itertools.islice(objects, limit)
+
+    def explain(self, cls: typing.Union[type, str, None] = None,
+                conditions: typing.Iterable[typing.Union[str, Condition]] = (),
+                order_by: typing.Optional[str] = None,
+                limit: typing.Optional[int] = None) -> Plan:
+        """Return how query would run without loading any object.
+
+        Candidates are counted in the database, not counting unsaved
+        changes. An ordered scan of an index with a limit is expected to
+        stop after limit candidates.
+
+        Raises:
+            ValueError: if a condition is not valid.
+        """
+        filters: typing.List[Condition] = conditions_of(conditions)
+        if cls is None:
+            return Plan("scan", filters, self.count(),
+                        f"{order_by} (sort)" if order_by else "")
+
+        classname: str = cls if isinstance(cls, str) else cls.__name__
+        plan, where, parameters = self.__select(classname, filters, order_by)
+        if plan.access.startswith("class index"):
+            return plan._replace(candidates=self.count(classname))
+
+        candidates: int = self.__connection.execute(
+            f"SELECT COUNT(*) FROM {_quoted(classname)} WHERE {where}",
+            parameters).fetchone()[0]
+        if plan.order.endswith("(index)") and limit is not None:
+            candidates = min(candidates, limit)
+
+        return plan._replace(candidates=candidates)
+
+    def nearby(self, latitude: float, longitude: float, radius: float,
+               limit: typing.Optional[int] = None
+               ) -> typing.List[typing.Tuple[BaseModel, float]]:
+        """Return the places at most radius kilometres away from a point.
+
+        The rows are narrowed down to the band of latitudes the circle
+        spans through the latitude index, then measured one by one.
+
+        Args:
+            latitude: latitude of the point in degrees.
+            longitude: longitude of the point in degrees.
+            radius: the maximum distance in kilometres.
+            limit: optional maximum number of places to return.
+
+        Returns:
+            the places and their distances in kilometres, nearest first.
+        """
+        band: float = math.degrees(radius / EARTH_RADIUS)
+        found: typing.Dict[str, typing.Tuple[BaseModel, float]] = {}
+        for classname, (lat_field, lon_field) in LOCATION_FIELDS.items():
+            rows: sqlite3.Cursor = self.__connection.execute(
+                f"SELECT id, data FROM {_quoted(classname)} WHERE"
+                f" {self.__json_value(classname, lat_field)} BETWEEN ? AND ?",
+                (latitude - band, latitude + band))
+            candidates: typing.Dict[str, BaseModel] = self.__load_rows(
+                classname, rows)
+            for key in self.__dirty:
+                if key.partition(".")[0] == classname:
+                    candidates[key] = self.__objects[key]
+
+            for key, obj in candidates.items():
+                with contextlib.suppress(TypeError, ValueError):
+                    kilometres: float = distance(
+                        latitude, longitude, float(assigned(obj, lat_field)),
+                        float(assigned(obj, lon_field)))
+                    if kilometres <= radius:
+                        found[key] = (obj, kilometres)
+
+        return sorted(found.values(), key=lambda item: item[1])[:limit]
+
+    def search(self, text: str, cls: typing.Union[type, str, None] = None,
+               limit: typing.Optional[int] = None) -> typing.List[BaseModel]:
+        """Return the objects whose texts hold every word of text.
+
+        Saved objects are ranked by the bm25 function of sqlite, best
+        first, and followed by the matching objects changed since the last
+        save.
+
+        Args:
+            text: the words to look for, in any case.
+            cls: optional class, or class name, to restrict the result to.
+            limit: optional maximum number of objects to return.
+        """
+        words: typing.List[str] = list(dict.fromkeys(terms(text)))
+        prefix: str = "" if cls is None else (
+            f"{cls if isinstance(cls, str) else cls.__name__}.")
+        if not words:
+            return []
+
+        rows: sqlite3.Cursor = self.__connection.execute(
+            "SELECT key FROM text_index WHERE text_index MATCH ?"
+            " ORDER BY rank", (" ".join(_quoted(word) for word in words),))
+        keys: typing.List[str] = [
+            key for (key,) in rows if key.startswith(prefix)
+            and key not in self.__dirty and key not in self.__deleted]
+        for key in self.__dirty:
+            fields: typing.Tuple[str, ...] = TEXT_FIELDS.get(
+                key.partition(".")[0], ())
+            if fields and key.startswith(prefix) and set(terms(" ".join(
+                    str(getattr(self.__objects[key], field, ""))
+                    for field in fields))).issuperset(words):
+                keys.append(key)
+
+        objects: typing.List[BaseModel] = []
+        for key in keys:
+            if limit is not None and len(objects) >= limit:
+                break
+
+            obj: typing.Optional[BaseModel] = self.get(*key.split(".", 1))
+            if obj is not None:
+                objects.append(obj)
+
+        return objects
+
+    def new(self, obj) -> None:
+        """Add a new object to the database on the next save.
+
+        Raises:
+            KeyError: if the class of obj has no table.
+        """
+        if obj.__class__.__name__ not in self.__classes:
+            raise KeyError(f"{obj.__class__.__name__} is not a model class")
+
+        obj_key: str = ".".join([obj.__class__.__name__, obj.id])
+        # A saved row that was not loaded yet is replaced, not inserted
+        self.get(obj.__class__.__name__, obj.id)
+        loaded: bool = obj_key in self.__objects
+        if self.__undo is not None:
+            if loaded:
+                self.__undo.changed(obj_key, self.__objects[obj_key])
+            else:
+                self.__undo.created(obj_key)
+
+        if obj_key in self.__deleted:
+            self.__deleted.discard(obj_key)
+        elif not loaded:
+            self.__inserted[obj_key] = None
+
+        object.__setattr__(obj, "_storage", self)
+        self.__objects[obj_key] = obj
+        self.__dirty[obj_key] = None
+
+    def touch(self, obj) -> None:
+        """Mark a loaded object as changed since the last save."""
+        obj_key: str = f"{obj.__class__.__name__}.{getattr(obj, 'id', '')}"
+        if obj_key in self.__objects:
+            if self.__undo is not None:
+                self.__undo.changed(obj_key, obj)
+
+            self.__dirty[obj_key] = None
+
+    def delete(self, obj=None) -> None:
+        """Remove an object from the database on the next save."""
+        if obj is None:
+            return
+
+        obj_key: str = ".".join([obj.__class__.__name__, obj.id])
+        if obj_key not in self.__objects:
+            return
+
+        if self.__undo is not None:
+            self.__undo.changed(obj_key, self.__objects[obj_key])
+
+        del self.__objects[obj_key]
+        self.__dirty.pop(obj_key, None)
+        if obj_key in self.__inserted:
+            del self.__inserted[obj_key]
+        else:
+            self.__deleted.add(obj_key)
+
+    @contextlib.contextmanager
+    def batch(self) -> typing.Iterator["DBStorage"]:
+        """Coalesce the saves of a block into one, undoing it on errors.
+
+        Nested batches leave saving to the outermost one but undo their
+        own changes on errors, so that callers catching the error keep the
+        rest of the enclosing batch.
+
+        Yields:
+            the storage engine.
+        """
+        parent: typing.Optional[UndoLog] = self.__undo
+        undo: UndoLog = UndoLog(parent)
+        self.__undo = undo
+        try:
+            yield self
+        except BaseException:
+            self.__undo = parent
+            undo.undo(self.__restore, self.__discard)
+            raise
+
+        self.__undo = parent
+        if parent is not None:
+            parent.save_requested |= undo.save_requested
+            return
+
+        if undo.save_requested:
+            self.save()
+
+    def save(self) -> None:
+        """Write every pending change to the database in one transaction."""
+        if self.__undo is not None:
+            self.__undo.save_requested = True
+            return
+
+        with self.__connection:
+            for key in self.__deleted:
+                classname, _, obj_id = key.partition(".")
+                self.__connection.execute(
+                    f"DELETE FROM {_quoted(classname)} WHERE id = ?",
+                    (obj_id,))
+                self.__connection.execute(
+                    "DELETE FROM text_index WHERE key = ?", (key,))
+
+            for key in self.__dirty:
+                self.__write(self.__objects[key])
+
+        self.__dirty.clear()
+        self.__inserted.clear()
+        self.__deleted.clear()
+
+    def reload(self) -> None:
+        """Forget loaded objects so that they are read again when needed.
+
+        Objects with unsaved changes are kept.
+        """
+        self.__objects = {key: obj for key, obj in self.__objects.items()
+                          if key in self.__dirty}
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.__connection.close()
+
+    def __restore(self, key: str, obj: BaseModel) -> None:
+        """Put an object back after undoing a batch."""
+        if key not in self.__objects:
+            if key in self.__deleted:
+                self.__deleted.discard(key)
+            else:
+                self.__inserted[key] = None
+
+        object.__setattr__(obj, "_storage", self)
+        self.__objects[key] = obj
+        self.__dirty[key] = None
+
+    def __discard(self, key: str) -> None:
+        """Drop an object created inside an undone batch."""
+        if key in self.__objects:
+            self.delete(self.__objects[key])
+
+    def __select(self, classname: str, conditions: typing.List[Condition],
+                 order_by: typing.Optional[str]
+                 ) -> typing.Tuple[Plan, str, typing.List[typing.Any]]:
+        """Return the plan of a query on a class and the sql selecting it.
+
+        The plan has no candidate count, and the sql is a condition with its
+        parameters selecting the rows of the class. The first equality
+        condition on a foreign key is used, otherwise the first field of
+        RANGE_FIELDS with range conditions.
+        """
+        field: str = (order_by or "").lstrip("-")
+        order: str = f"{order_by} (sort)" if order_by else ""
+        if field in RANGE_FIELDS.get(classname, ()):
+            order = f"{order_by} (index)"
+
+        for condition in conditions:
+            if (condition.op == "="
+                    and condition.field in FOREIGN_KEYS.get(classname, ())):
+                return Plan(
+                    f"foreign key index {classname}.{condition.field}",
+                    [other for other in conditions if other is not condition],
+                    0, order and f"{order_by} (sort)"), \
+                    f"{_quoted(condition.field)} = ?", [condition.value]
+
+        for ranged in RANGE_FIELDS.get(classname, ()):
+            bounds, used = range_of(conditions, ranged)
+            if not used:
+                continue
+
+            column: str = self.__json_value(classname, ranged)
+            where: typing.List[str] = []
+            parameters: typing.List[typing.Any] = []
+            if bounds.low is None or bounds.high is None:
+                # Sqlite sorts text after every number
+                where.append(f"typeof({column}) IN ('integer', 'real')")
+
+            if bounds.low is not None:
+                where.append(f"{column} >{'=' * bounds.low_inclusive} ?")
+                parameters.append(bounds.low)
+
+            if bounds.high is not None:
+                where.append(f"{column} <{'=' * bounds.high_inclusive} ?")
+                parameters.append(bounds.high)
+
+            if order and ranged != field:
+                order = f"{order_by} (sort)"
+
+            return Plan(f"range index {classname}.{ranged}",
+                        [other for other in conditions if other not in used],
+                        0, order), " AND ".join(where), parameters
+
+        if order.endswith("(index)"):
+            return Plan(f"range index {classname}.{field}", conditions, 0,
+                        order), "1", []
+
+        return Plan(f"class index {classname}", conditions, 0, order), \
+            "1", []
+
+    def __selected(self, classname: str, conditions: typing.List[Condition],
+                   plan: Plan, where: str, parameters: typing.List[typing.Any],
+                   order_by: typing.Optional[str]
+                   ) -> typing.Iterator[BaseModel]:
+        """Yield the objects of the rows a plan selects.
+
+        Only objects satisfying the conditions are yielded, merging in the
+        objects changed since the last save. Rows selected through a range
+        index are read in its order, like FileStorage scans it.
+        """
+        scan: typing.Optional[str] = None
+        if plan.order.endswith("(index)"):
+            scan = order_by
+        elif not plan.order and plan.access.startswith("range index"):
+            scan = plan.access.rpartition(".")[2]
+
+        order: str = "rowid"
+        if scan:
+            direction: str = " DESC" if scan.startswith("-") else ""
+            order = (f"{self.__json_value(classname, scan.lstrip('-'))}"
+                     f"{direction}, id{direction}")
+
+        rows: sqlite3.Cursor = self.__connection.execute(
+            f"SELECT id, data FROM {_quoted(classname)} WHERE {where}"
+            f" ORDER BY {order}", parameters)
+        saved: typing.Iterator[BaseModel] = (
+            obj for key, obj in self.__iter_rows(classname, rows)
+            if key not in self.__dirty and matches_all(obj, plan.filters))
+        changed: typing.List[BaseModel] = [
+            self.__objects[key] for key in list(self.__dirty)
+            if key.partition(".")[0] == classname and key in self.__objects
+            and matches_all(self.__objects[key], conditions)]
+        if scan:
+            return heapq.merge(saved, ordered(changed, scan),
+                               key=sort_key(scan),
+                               reverse=scan.startswith("-"))
+
+        return itertools.chain(saved, changed)
+
+    def __create_table(self, classname: str) -> None:
+        """Create the table of a class and its foreign key indexes."""
+        columns: str = "".join(f", {_quoted(field)} TEXT"
+                               for field in FOREIGN_KEYS.get(classname, ()))
+        self.__connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {_quoted(classname)} ("
+            "id TEXT PRIMARY KEY, created_at TEXT, updated_at TEXT"
+            f"{columns}, data TEXT NOT NULL)")
+        for field in FOREIGN_KEYS.get(classname, ()):
+            self.__connection.execute(
+                "CREATE INDEX IF NOT EXISTS"
+                f" {_quoted(classname + '_' + field)}"
+                f" ON {_quoted(classname)} ({_quoted(field)})")
+
+        for field in (*LOCATION_FIELDS.get(classname, ())[:1],
+                      *RANGE_FIELDS.get(classname, ())):
+            self.__connection.execute(
+                "CREATE INDEX IF NOT EXISTS"
+                f" {_quoted(classname + '_' + field)} ON {_quoted(classname)}"
+                f" ({self.__json_value(classname, field)})")
+
+    def __json_value(self, classname: str, field: str) -> str:
+        """Return the sql expression of a number attribute of class rows.
+
+        Attributes still at their class default are not in the json.
+        """
+        default: typing.Any = getattr(self.__classes[classname], field)
+        return f"COALESCE(json_extract(data, '$.{field}'), {default!r})"
+
+    def __create_text_table(self) -> None:
+        """Create the full-text table, indexing the stored objects if new."""
+        if self.__connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'text_index'"
+                ).fetchone() is not None:
+            return
+
+        self.__connection.execute(
+            "CREATE VIRTUAL TABLE text_index USING fts5(key UNINDEXED, body)")
+        for classname in TEXT_FIELDS:
+            rows: sqlite3.Cursor = self.__connection.execute(
+                f"SELECT id, data FROM {_quoted(classname)}")
+            for obj_id, data in rows.fetchall():
+                obj_dict: dict = json.loads(data)
+                self.__connection.execute(
+                    "INSERT INTO text_index (key, body) VALUES (?, ?)",
+                    (f"{classname}.{obj_id}", " ".join(
+                        str(obj_dict.get(field, ""))
+                        for field in TEXT_FIELDS[classname])))
+
+    def __write(self, obj: BaseModel) -> None:
+        """Insert the row of an object or update it in place."""
+        classname: str = obj.__class__.__name__
+        obj_dict: typing.Dict[str, typing.Any] = obj.to_dict()
+        fields: typing.Tuple[str, ...] = FOREIGN_KEYS.get(classname, ())
+        columns: str = "".join(f", {_quoted(field)}" for field in fields)
+        placeholders: str = ", ?" * len(fields)
+        updates: str = "".join(
+            f", {_quoted(field)} = excluded.{_quoted(field)}"
+            for field in fields)
+        self.__connection.execute(
+            f"INSERT INTO {_quoted(classname)} (id, created_at, updated_at"
+            f"{columns}, data) VALUES (?, ?, ?{placeholders}, ?)"
+            " ON CONFLICT (id) DO UPDATE SET created_at = excluded.created_at,"
+            f" updated_at = excluded.updated_at{updates},"
+            " data = excluded.data",
+            (obj.id, obj_dict["created_at"], obj_dict["updated_at"],
+             *(getattr(obj, field, None) for field in fields),
+             json.dumps(obj_dict)))
+        if classname in TEXT_FIELDS:
+            key: str = f"{classname}.{obj.id}"
+            self.__connection.execute(
+                "DELETE FROM text_index WHERE key = ?", (key,))
+            self.__connection.execute(
+                "INSERT INTO text_index (key, body) VALUES (?, ?)",
+                (key, " ".join(str(getattr(obj, field, ""))
+                               for field in TEXT_FIELDS[classname])))
+
+    def __load_rows(self, classname: str, rows: typing.Iterable[tuple]
+                    ) -> typing.Dict[str, BaseModel]:
+        """Return the objects of rows, reusing already loaded instances."""
+        return dict(self.__iter_rows(classname, rows))
+
+    def __iter_rows(self, classname: str, rows: typing.Iterable[tuple]
+                    ) -> typing.Iterator[typing.Tuple[str, BaseModel]]:
+        """Yield the key and object of rows, reusing loaded instances."""
+        for obj_id, data in rows:
+            key: str = f"{classname}.{obj_id}"
+            if key in self.__deleted:
+                continue
+
+            if key not in self.__objects:
+                obj_dict: dict = json.loads(data)
+                obj: BaseModel = self.__deserializers[
+                    obj_dict["__class__"]](obj_dict)
+                object.__setattr__(obj, "_storage", self)
+                self.__objects[key] = obj
+
+            yield key, self.__objects[key]
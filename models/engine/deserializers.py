@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+"""Module for deserializers."""
+
+from datetime import datetime
+import sys
+import typing
+
+from models.base_model import BaseModel
+from models.compact import compact_class, restore
+from models.engine.indexes import FOREIGN_KEYS
+
+
+class Deserializer:
+    """Constructor of the instances of a model class from dictionaries.
+
+    Builds the same instance as cls(**obj_dict), with its attributes in the
+    same order, but the set of attribute names the class accepts is worked
+    out once per class instead of once per object, and the attributes are
+    set without going through __setattr__, so storage is not notified of
+    objects it is loading. Foreign key values are interned so that objects
+    pointing at the same parent share one string.
+
+    Dictionaries holding names that are not plain attributes of the class,
+    and classes with their own __init__, are handed over to the class.
+    attributes and instantiate split the work so that the attributes can
+    be worked out in another process, see models.engine.parallel.
+    """
+
+    def __init__(self, cls: type) -> None:
+        """Work out the attributes accepted by a model class.
+
+        Args:
+            cls: the model class, or its compact variant, to instantiate.
+        """
+        known: typing.Set[str] = {"id", "created_at", "updated_at", *dir(cls)}
+        known.discard("__class__")
+        self.__cls: type = cls
+        self.__fields: typing.FrozenSet[str] = frozenset(
+            name for name in known if not name.startswith("_"))
+        self.__special: typing.FrozenSet[str] = frozenset(
+            known - self.__fields)
+        self.__interned: typing.Tuple[str, ...] = FOREIGN_KEYS.get(
+            cls.__name__, ())
+        self.__slotted: bool = hasattr(cls, "_fields")
+        self.__fast: bool = (cls.__init__ is BaseModel.__init__
+                             and (self.__slotted or cls.__setattr__
+                                  is BaseModel.__setattr__))
+
+    def __call__(self, obj_dict: typing.Dict[str, typing.Any]) -> BaseModel:
+        """Return a new instance with the attributes of obj_dict."""
+        attrs: typing.Optional[typing.Dict[str, typing.Any]] = (
+            self.attributes(obj_dict))
+        if attrs is None:
+            return self.__cls(**obj_dict)
+
+        return self.instantiate(attrs)
+
+    def attributes(self, obj_dict: typing.Dict[str, typing.Any]
+                   ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        """Return the attributes of the instance built from obj_dict.
+
+        Returns:
+            the attributes to hand to instantiate, or None if obj_dict has
+            to be handed over to the class instead.
+        """
+        if not self.__fast or not self.__special.isdisjoint(obj_dict):
+            return None
+
+        attrs: typing.Dict[str, typing.Any] = {
+            "id": "", "created_at": None, "updated_at": None}
+        fields: typing.FrozenSet[str] = self.__fields
+        for name, value in obj_dict.items():
+            if name in fields:
+                attrs[name] = value
+
+        attrs["created_at"] = obj_dict["created_at"]
+        attrs["updated_at"] = obj_dict["updated_at"]
+        return attrs
+
+    def instantiate(self, attrs: typing.Dict[str, typing.Any]) -> BaseModel:
+        """Return a new instance holding attrs, as returned by attributes."""
+        attrs["created_at"] = datetime.fromisoformat(attrs["created_at"])
+        attrs["updated_at"] = datetime.fromisoformat(attrs["updated_at"])
+        for name in self.__interned:
+            if type(attrs.get(name)) is str:
+                attrs[name] = sys.intern(attrs[name])
+
+        obj: BaseModel = self.__cls.__new__(self.__cls)
+        if self.__slotted:
+            restore(obj, attrs)
+        else:
+            object.__setattr__(obj, "__dict__", attrs)
+
+        return obj
+
+
+# Keys, class names and attributes of records, see Deserializers.preload
+Preloaded = typing.Tuple[typing.List[str], typing.List[str],
+                         typing.List[typing.Optional[dict]],
+                         typing.Dict[str, dict]]
+
+
+class Deserializers:
+    """The Deserializer of every model class, by class name."""
+
+    def __init__(self, classes: typing.Dict[str, type],
+                 compact: bool = False) -> None:
+        """Initialise the registry.
+
+        Args:
+            classes: the model classes by name.
+            compact: if True, build the compact variants of the classes
+                from models.compact.
+        """
+        self.__classes: typing.Dict[str, type] = classes
+        self.__compact: bool = compact
+        self.__deserializers: typing.Dict[str, Deserializer] = dict()
+
+    def __getitem__(self, classname: str) -> Deserializer:
+        """Return the Deserializer of the class named classname."""
+        deserializer: typing.Optional[Deserializer] = (
+            self.__deserializers.get(classname))
+        if deserializer is None:
+            cls: type = self.__classes[classname]
+            if self.__compact:
+                cls = compact_class(cls)
+
+            deserializer = self.__deserializers[classname] = Deserializer(cls)
+
+        return deserializer
+
+    def build(self, obj_dict: typing.Dict[str, typing.Any]) -> BaseModel:
+        """Instantiate an object from its dictionary representation."""
+        return self[obj_dict["__class__"]](obj_dict)
+
+    def preload(self, records: typing.Dict[str, dict]) -> Preloaded:
+        """Do the part of build that can run in a worker process.
+
+        The records are returned as lists rather than a dictionary per
+        record, which are quicker to send back to the parent process.
+
+        Returns:
+            the keys, class names and attributes of the records, with
+            None for the attributes of the records that have to be handed
+            over to their class, and those records by key.
+        """
+        classnames: typing.List[str] = []
+        attributes: typing.List[typing.Optional[dict]] = []
+        called: typing.Dict[str, dict] = {}
+        for key, obj_dict in records.items():
+            classname: str = obj_dict["__class__"]
+            attrs: typing.Optional[dict] = self[classname].attributes(
+                obj_dict)
+            if attrs is None:
+                called[key] = obj_dict
+
+            classnames.append(classname)
+            attributes.append(attrs)
+
+        return list(records), classnames, attributes, called
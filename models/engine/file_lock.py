@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+"""Module for file_lock.
+
+Advisory locking of a store shared by several processes. Every process
+opens the same lock file next to the json file and takes a shared flock
+to read the store or an exclusive one to write it. The lock file also
+holds a generation counter, incremented by every write, telling a process
+whether anybody else wrote to the store since it last read it.
+"""
+
+from contextlib import contextmanager
+import threading
+import typing
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+
+class StoreLock:
+    """Reentrant flock on a lock file holding a generation counter.
+
+    Nested holds in one process reuse the outer lock, so code reading the
+    store may take the lock while the caller already holds it to write.
+    Threads of a process take turns holding it.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialise the lock of the lock file at path.
+
+        Raises:
+            OSError: if file locking is not supported on this platform.
+        """
+        if fcntl is None:
+            raise OSError("file locking needs the fcntl module")
+
+        self.__path: str = path
+        self.__file: typing.Optional[typing.BinaryIO] = None
+        self.__depth: int = 0
+        self.__thread_lock: threading.RLock = threading.RLock()
+
+    @property
+    def path(self) -> str:
+        """Path of the lock file."""
+        return self.__path
+
+    @contextmanager
+    def hold(self, exclusive: bool = False) -> typing.Iterator[None]:
+        """Hold the lock for the duration of a block.
+
+        Args:
+            exclusive: if True, lock out every other process, otherwise
+                only processes writing to the store.
+        """
+        with self.__thread_lock:
+            if self.__depth == 0:
+                self.__file = open(self.__path, "a+b")  # noqa: SIM115
+                try:
+                    fcntl.flock(self.__file.fileno(), fcntl.LOCK_EX
+                                if exclusive else fcntl.LOCK_SH)
+                except BaseException:
+                    self.__file.close()
+                    self.__file = None
+                    raise
+
+            self.__depth += 1
+            try:
+                yield
+            finally:
+                self.__depth -= 1
+                if self.__depth == 0 and self.__file is not None:
+                    # Closing the file releases the lock
+                    self.__file.close()
+                    self.__file = None
+
+    def generation(self) -> int:
+        """Return the number of writes to the store, with the lock held."""
+        if self.__file is None:
+            raise RuntimeError(f"{self.__path} is not locked")
+
+        self.__file.seek(0)
+        try:
+            return int(self.__file.read() or b"0")
+        except ValueError:
+            return 0
+
+    def advance(self) -> int:
+        """Count a write to the store, with the lock held exclusively.
+
+        Returns:
+            the new generation.
+        """
+        generation: int = self.generation() + 1
+        self.__file.truncate(0)  # type: ignore
+        self.__file.write(str(generation).encode())  # type: ignore
+        self.__file.flush()  # type: ignore
+        return generation
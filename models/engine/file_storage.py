@@ -1,52 +1,1363 @@
 #!/usr/bin/python3
 """Module for file_storage."""
 
-from contextlib import suppress
+import atexit
+from contextlib import contextmanager, nullcontext
+import itertools
 import json
 import os
+import threading
 import typing
 
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
+from models.compact import assigned, attributes, restore
+from models.engine.async_storage import AsyncStorageMixin
+from models.engine.catalog import Catalog
+from models.engine.deserializers import Deserializers, Preloaded
+from models.engine.file_lock import StoreLock
+from models.engine.flusher import WriteBehindFlusher
+from models.engine.indexes import AttributeIndex, LOCATION_FIELDS
+from models.engine.indexes import TEXT_FIELDS, TextIndex
+from models.engine.journal import Journal
+from models.engine.layout import dump, encode, Layout, Shard
+from models.engine import offset_index as offsets
+from models.engine.parallel import parse, parse_files, split
+from models.engine.query import Condition, Plan, conditions_of, matches_all
+from models.engine.query import ordered
+from models.engine.rwlock import ReadWriteLock
+from models.engine import text_file
+from models.engine.undo import UndoLog
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
 
+# Keys and fragments of the json files to write, by path
+Snapshot = typing.Dict[str, typing.Tuple[typing.List[str], typing.List[str]]]
 
-class FileStorage:
-    """Class for FileStorage."""
+
+class FileStorage(AsyncStorageMixin):
+    """Class for FileStorage.
+
+    save only encodes the objects changed since the last save, which
+    report attribute assignments through touch. Values mutated in place
+    must be followed by obj.save() or storage.touch(obj). The keys are
+    indexed for related, query, nearby and search, see Catalog, and a batch
+    block coalesces its saves and undoes its changes on errors.
+
+    The modes set by the arguments of __init__ combine as follows:
+
+    - journal: save appends the changes to a log, see models.engine.journal,
+      folded back into the json files past `compact_threshold` records.
+    - lazy: the files are parsed on the first lookup and objects are only
+      built when looked up.
+    - write_behind_ms: a background thread writes what save encodes.
+    - shards: the objects of every class are stored in their own files,
+      see models.engine.layout.
+    - workers: reload parses in a pool of processes, see
+      models.engine.parallel.
+    - offset_index: get reads single objects through an index of the
+      files, see models.engine.offset_index.
+    - max_objects: at most that many objects stay instantiated, the rest
+      are read back from disk when looked up. Implies lazy journal mode
+      with the offset index.
+    - shared: processes take turns through a lock file and merge what the
+      others saved before rewriting files, see models.engine.file_lock.
+    - threadsafe: a reader/writer lock guards the objects, see
+      models.engine.rwlock. The coroutines of AsyncStorageMixin turn it on.
+    """
 
     __file_path: str = "saved_objects.json"
-    __objects: typing.Dict[str, BaseModel] = dict()
+    __min_chunk_bytes: int = 1 << 20
+    __classes: typing.Dict[str, type] = {
+        "BaseModel": BaseModel, "User": User, "Place": Place,
+        "State": State, "City": City, "Amenity": Amenity, "Review": Review
+    }
+
+    def __init__(self, file_path: typing.Optional[str] = None,
+                 journal: bool = False, compact_threshold: int = 1000,
+                 lazy: bool = False, write_behind_ms: int = 0,
+                 write_behind_mutations: int = 100,
+                 compact_models: bool = False, shards: int = 0,
+                 workers: int = 0, offset_index: bool = False,
+                 max_objects: int = 0, shared: bool = False,
+                 threadsafe: bool = False) -> None:
+        """Initialise the storage engine.
+
+        Args:
+            file_path: path of the json file, defaults to saved_objects.json.
+            journal: if True, append changes to a log on save.
+            compact_threshold: number of log records after which the log is
+                folded back into the json files.
+            lazy: if True, defer parsing the json files until needed.
+            write_behind_ms: if positive, write to disk in a background
+                thread at most once per this many milliseconds.
+            write_behind_mutations: number of changed objects that makes
+                the background thread write without waiting.
+            compact_models: if True, reload objects as instances of the
+                compact classes of models.compact.
+            shards: if positive, store every class in this many files.
+            workers: if greater than 1, parse with this many processes.
+            offset_index: if True, index the position of the records.
+            max_objects: if positive, keep at most this many objects
+                instantiated.
+            shared: if True, share the store with other processes.
+            threadsafe: if True, share the storage with other threads.
+
+        Raises:
+            ValueError: if two of write_behind_ms, max_objects and shared
+                are set.
+        """
+        super().__init__()
+        modes: typing.List[str] = [
+            name for name, value in (("write_behind_ms", write_behind_ms),
+                                     ("max_objects", max_objects),
+                                     ("shared", shared)) if value > 0]
+        if len(modes) > 1:
+            raise ValueError(f"{' and '.join(modes)} cannot be combined")
+
+        if file_path:
+            self.__file_path = file_path
+
+        self.__objects: typing.Dict[str, BaseModel] = dict()
+        self.__max_objects: int = max(max_objects, 0)
+        if self.__max_objects:
+            journal = lazy = offset_index = True
+
+        self.__lock: typing.Optional[StoreLock] = None
+        self.__generation: typing.Optional[int] = None
+        if shared:
+            self.__lock = StoreLock(self.__file_path + ".lock")
+
+        self.__journal: bool = journal
+        self.__log: Journal = Journal(self.__file_path + ".log",
+                                      track=bool(self.__max_objects))
+        self.__layout: Layout = Layout(self.__file_path, shards,
+                                       self.__classes)
+        self.__lazy: bool = lazy
+        self.__workers: int = workers
+        self.__offset_index: bool = offset_index
+        self.__deserializers: Deserializers = Deserializers(
+            self.__classes, compact_models)
+        self.__detached: typing.Set[str] = set()
+        self.__unloaded: typing.Dict[str, None] = dict()
+        self.__stale: typing.Set[Shard] = set()
+        self.__raw: typing.Dict[str, dict] = dict()
+        self.__cold: typing.Dict[str, None] = dict()
+        self.__stats: typing.Dict[str, int] = {
+            "hits": 0, "misses": 0, "evictions": 0}
+        self.__undo: typing.Optional[UndoLog] = None
+        self.__pending_snapshot: Snapshot = dict()
+        self.__pending_records: typing.List[typing.Tuple[str, str]] = []
+        self.__pending_text: typing.Optional[str] = None
+        self.__pending_lock: threading.Lock = threading.Lock()
+        self.__write_lock: threading.Lock = threading.Lock()
+        self.__save_lock: threading.Lock = threading.Lock()
+        self.__rwlock: typing.Optional[ReadWriteLock] = (
+            ReadWriteLock() if threadsafe else None)
+        self.__flusher: typing.Optional[WriteBehindFlusher] = None
+        if write_behind_ms > 0:
+            self.__flusher = WriteBehindFlusher(
+                self.flush, write_behind_ms / 1000, write_behind_mutations)
+            atexit.register(self.close)
+
+        self.__compact_threshold: int = compact_threshold
+        self.__dirty: typing.Set[str] = set()
+        self.__fragments: typing.Dict[str, str] = dict()
+        self.__catalog: Catalog = Catalog()
+        self.__unindexed: typing.Dict[str, None] = dict()
+        self.__text: typing.Optional[TextIndex] = None
+        self.__text_pending: typing.Dict[str, None] = dict()
+        self.__text_saved: bool = False
+
+    @property
+    def log_path(self) -> str:
+        """Path of the journal log file."""
+        return self.__log.path
+
+    @property
+    def retired_log_path(self) -> str:
+        """Path of the journal log while json files replace it."""
+        return self.__log.retired_path
+
+    @property
+    def text_path(self) -> str:
+        """Path of the saved full-text index."""
+        return self.__file_path + ".fts"
+
+    @property
+    def layout_path(self) -> str:
+        """Path of the file recording the number of shards."""
+        return self.__layout.layout_path
+
+    @property
+    def migration_path(self) -> str:
+        """Path of the copy of the objects while they change shards."""
+        return self.__layout.migration_path
+
+    def all(self, cls: typing.Union[type, str, None] = None
+            ) -> typing.Dict[str, BaseModel]:
+        """Return a dictionary of all objects or of the objects of a class.
+
+        In thread-safe mode the dictionary is always a copy.
+
+        Args:
+            cls: optional class, or class name, to restrict the result to.
+        """
+        with self.__read_locked():
+            self.__load(cls)
+            if cls is None and self.__max_objects:
+                return {key: self.__fetch(key) for key in self.__keys()}
+
+            if cls is None:
+                for key in list(self.__raw):
+                    self.__materialize(key)
+
+                if self.__rwlock is not None:
+                    return dict(self.__objects)
+
+                return self.__objects
+
+            return {key: self.__fetch(key)
+                    for key in self.__class_keys(cls)}
+
+    def iterate(self, cls: typing.Union[type, str, None] = None
+                ) -> typing.Iterator[BaseModel]:
+        """Yield the objects all would return, one at a time.
+
+        Objects are only instantiated as they are reached. The lock of
+        thread-safe mode is not held in between.
+
+        Args:
+            cls: optional class, or class name, to restrict the result to.
+        """
+        with self.__read_locked():
+            self.__load(cls)
+            keys: typing.List[str] = self.__candidates(cls)
+
+        yield from self.__reach(keys, [])
+
+    def count(self, cls: typing.Union[type, str, None] = None) -> int:
+        """Return the number of objects, or of objects of a class."""
+        with self.__read_locked():
+            self.__load(cls)
+            if cls is None:
+                return (len(self.__objects) + len(self.__raw)
+                        + len(self.__cold))
 
-    def all(self) -> typing.Dict[str, BaseModel]:
-        """Return a dictionary of all objects."""
-        return self.__objects
+            return len(self.__class_keys(cls))
+
+    def get(self, cls: typing.Union[type, str],
+            obj_id: str) -> typing.Optional[BaseModel]:
+        """Return the object of a class with the given id, if stored."""
+        classname: str = cls if isinstance(cls, str) else cls.__name__
+        key: str = f"{classname}.{obj_id}"
+        with self.__read_locked():
+            with self.__hold():
+                if (not self.__offset_index or self.__max_objects
+                        or not self.__load_indexed(key)):
+                    self.__load(classname, obj_id)
+
+            obj: typing.Optional[BaseModel] = (
+                self.__fetch(key) if self.__has(key) else None)
+            self.__evict()
+            return obj
+
+    def related(self, cls: typing.Union[type, str], field: str,
+                value: str) -> typing.Dict[str, BaseModel]:
+        """Return the objects of a class whose foreign key equals value.
+
+        Args:
+            cls: class, or class name, of the objects to look up.
+            field: name of the foreign key attribute, e.g. "city_id".
+            value: id of the referenced object.
+        """
+        classname: str = cls if isinstance(cls, str) else cls.__name__
+        index: typing.Optional[AttributeIndex] = self.__catalog.relation(
+            classname, field)
+        if index is None:
+            return {key: obj for key, obj in self.all(classname).items()
+                    if getattr(obj, field, None) == value}
+
+        self.__refresh()
+        with self.__read_locked():
+            self.__load(classname)
+            return {key: self.__fetch(key) for key in index.keys(value)
+                    if self.__has(key)}
+
+    def query(self, cls: typing.Union[type, str, None] = None,
+              conditions: typing.Iterable[typing.Union[str, Condition]] = (),
+              order_by: typing.Optional[str] = None,
+              limit: typing.Optional[int] = None
+              ) -> typing.Iterator[BaseModel]:
+        """Yield the objects satisfying every condition, one at a time.
+
+        The candidates come from the most selective index, see explain,
+        and are reached like iterate reaches them.
+
+        Args:
+            cls: optional class, or class name, to restrict the result to.
+            conditions: conditions such as "price_by_night<100", see
+                models.engine.query.
+            order_by: optional attribute to order the objects by, prefixed
+                with "-" for descending order.
+            limit: optional maximum number of objects to yield.
+
+        Raises:
+            ValueError: if a condition is not valid.
+        """
+        filters: typing.List[Condition] = conditions_of(conditions)
+        self.__refresh()
+        with self.__read_locked():
+            plan, keys, sort = self.__plan(cls, filters, order_by, limit)
+
+        objects: typing.Iterator[BaseModel] = self.__reach(keys,
+                                                           plan.filters)
+        if sort and order_by:
+            return iter(ordered(objects, order_by, limit))
+
+        return itertools.islice(objects, limit)
+
+    def explain(self, cls: typing.Union[type, str, None] = None,
+                conditions: typing.Iterable[typing.Union[str, Condition]] = (),
+                order_by: typing.Optional[str] = None,
+                limit: typing.Optional[int] = None) -> Plan:
+        """Return how query would run without reaching any object.
+
+        Raises:
+            ValueError: if a condition is not valid.
+        """
+        self.__refresh()
+        with self.__read_locked():
+            return self.__plan(cls, conditions_of(conditions), order_by,
+                               limit)[0]
+
+    def nearby(self, latitude: float, longitude: float, radius: float,
+               limit: typing.Optional[int] = None
+               ) -> typing.List[typing.Tuple[BaseModel, float]]:
+        """Return the places at most radius kilometres away from a point.
+
+        Args:
+            latitude: latitude of the point in degrees.
+            longitude: longitude of the point in degrees.
+            radius: the maximum distance in kilometres.
+            limit: optional maximum number of places to return.
+
+        Returns:
+            the places and their distances in kilometres, nearest first.
+        """
+        self.__refresh()
+        with self.__read_locked():
+            for classname in LOCATION_FIELDS:
+                self.__load(classname)
+
+            found: typing.List[typing.Tuple[str, float]] = [
+                (key, kilometres) for key, kilometres
+                in self.__catalog.within(latitude, longitude, radius)
+                if self.__has(key)]
+            places: typing.List[typing.Tuple[BaseModel, float]] = [
+                (self.__fetch(key), kilometres)
+                for key, kilometres in found[:limit]]
+            self.__evict()
+            return places
+
+    def search(self, text: str, cls: typing.Union[type, str, None] = None,
+               limit: typing.Optional[int] = None) -> typing.List[BaseModel]:
+        """Return the objects whose texts hold every word of text.
+
+        The texts are the attributes listed in TEXT_FIELDS. The objects are
+        ranked by tf-idf, best first.
+
+        Args:
+            text: the words to look for, in any case.
+            cls: optional class, or class name, to restrict the result to.
+            limit: optional maximum number of objects to return.
+        """
+        classname: typing.Optional[str] = (
+            cls if cls is None or isinstance(cls, str) else cls.__name__)
+        with self.__write_locked():
+            self.__reindex()
+            keys: typing.List[str] = [
+                key for key, _ in self.__text_index().search(text, classname)
+                if self.__has(key)]
+            objects: typing.List[BaseModel] = [
+                self.__fetch(key) for key in keys[:limit]]
+            self.__evict()
+            return objects
 
     def new(self, obj) -> None:
         """Add a new object to __objects."""
         obj_key: str = ".".join([obj.__class__.__name__, obj.id])
-        self.__objects[obj_key] = obj
+        with self.__write_locked():
+            if self.__undo is not None:
+                if obj_key in self.__objects:
+                    self.__undo.changed(obj_key, self.__objects[obj_key])
+                else:
+                    self.__undo.created(obj_key)
+
+            self.__insert(obj_key, obj)
+            self.__dirty.add(obj_key)
+            self.__evict()
+
+    def touch(self, obj) -> None:
+        """Mark a stored object as changed since the last save."""
+        if self.__rwlock is None:
+            # Runs on every attribute assignment, so skip the lock context
+            self.__touch(obj)
+            return
+
+        with self.__rwlock.writing():
+            self.__touch(obj)
+
+    def delete(self, obj=None) -> None:
+        """Remove an object from __objects."""
+        if obj is None:
+            return
+
+        obj_key: str = ".".join([obj.__class__.__name__, obj.id])
+        with self.__write_locked():
+            if obj_key in self.__cold:
+                del self.__cold[obj_key]
+                self.__objects[obj_key] = obj
+
+            if obj_key in self.__objects:
+                if self.__undo is not None:
+                    self.__undo.changed(obj_key, self.__objects[obj_key])
+
+                self.__remove(obj_key)
+                self.__dirty.add(obj_key)
+                self.__fragments.pop(obj_key, None)
+
+    @contextmanager
+    def batch(self) -> typing.Iterator["FileStorage"]:
+        """Coalesce the saves of a block into one, undoing it on errors.
+
+        Nested batches leave saving to the outermost one but undo their
+        own changes on errors. In thread-safe mode the block holds the
+        write lock.
+
+        Yields:
+            the storage engine.
+        """
+        with self.__write_locked():
+            parent: typing.Optional[UndoLog] = self.__undo
+            undo: UndoLog = UndoLog(parent)
+            self.__undo = undo
+            try:
+                yield self
+            except BaseException:
+                self.__undo = parent
+                undo.undo(self.__restore, self.__discard)
+                raise
+
+            self.__undo = parent
+            if parent is not None:
+                parent.save_requested |= undo.save_requested
+                return
+
+            if undo.save_requested:
+                self.save()
+
+            self.__evict()
 
     def save(self) -> None:
-        """Serialise all objects in __objects to a json file."""
-        json_dict: typing.Dict[str, typing.Dict[str, str]] = {}
-        for key, obj in self.__objects.items():
-            json_dict[key] = obj.to_dict()
+        """Serialise all objects in __objects to a json file.
+
+        In thread-safe mode the changes are encoded as a reader and written
+        after releasing the lock, except in shared and bounded mode.
+        """
+        # Shared stores merge into the objects while saving and bounded
+        # ones evict them, which only writers may do
+        writes: bool = self.__lock is not None or bool(self.__max_objects)
+        deferred: bool = self.__rwlock is not None and not writes
+        self.__refresh()
+        with (self.__write_locked() if writes else self.__read_locked()):
+            if self.__undo is not None:
+                self.__undo.save_requested = True
+                return
+
+            with self.__save_lock, self.__writing():
+                mutations: int = self.__prepare()
+                if self.__journal:
+                    self.__queue_text()
+                else:
+                    # Left to compact and close, as encoding it again costs
+                    # more than saving a few objects
+                    self.__text_saved = False
+
+                if self.__flusher is None and not deferred:
+                    self.flush()
+
+        if self.__flusher is not None:
+            self.__flusher.notify(mutations)
+        elif deferred:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the changes prepared by previous saves to disk now."""
+        with self.__write_lock:
+            with self.__pending_lock:
+                snapshot: Snapshot = self.__pending_snapshot
+                records: typing.List[typing.Tuple[str, str]] = \
+                    self.__pending_records
+                text: typing.Optional[str] = self.__pending_text
+                self.__pending_snapshot = {}
+                self.__pending_records = []
+                self.__pending_text = None
+
+            if snapshot and self.__journal:
+                self.__swap_snapshot(snapshot)
+            else:
+                for path, (keys, fragments) in snapshot.items():
+                    with open(path, "w", encoding="utf-8") as file:
+                        dump(fragments, file)
+
+                    if self.__offset_index:
+                        offsets.write(path, keys, fragments)
+
+            if records:
+                self.__log.append(records)
 
-        with open(self.__file_path, "w", encoding="utf-8") as file:
-            json.dump(json_dict, file, indent="    ")
+            if text is not None:
+                text_file.write(self.text_path, text, self.__layout.paths(),
+                                self.__log)
+
+    def compact(self) -> None:
+        """Fold the journal log into a fresh json file."""
+        with self.__write_locked(), self.__writing():
+            self.__reindex()
+            self.__queue_snapshot()
+            self.__queue_text()
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the write-behind thread and write what is pending.
+
+        That includes the full-text index if saves left it out of date.
+        """
+        if self.__flusher is not None:
+            self.__flusher.stop()
+            self.__flusher = None
+
+        with self.__write_locked():
+            self.__reindex()
+            self.__queue_text()
+
+        self.flush()
+
+    def cache_stats(self) -> typing.Dict[str, int]:
+        """Return the counters of the bounded object cache.
+
+        Returns:
+            the number of lookups of instantiated objects ("hits"), of
+            objects read back from disk ("misses") and of evicted objects
+            ("evictions"), with the number of objects instantiated
+            ("cached") and the maximum ("capacity").
+        """
+        with self.__read_locked():
+            return dict(self.__stats, cached=len(self.__objects),
+                        capacity=self.__max_objects)
 
     def reload(self) -> None:
         """Deserialize contents of a json file into __objects."""
-        loaded_objs: typing.Dict[str, dict] = dict()
-        with suppress(FileNotFoundError):
-            if os.stat(self.__file_path).st_size > 0:
-                with open(self.__file_path, "r", encoding="utf-8") as file:
-                    loaded_objs = json.load(file)
-
-        for key, obj_dict in loaded_objs.items():
-            # Pulling the class from the global NameSpace dictionary
-            self.__objects[key] = globals()[obj_dict["__class__"]](**obj_dict)
+        self.flush()
+        with self.__write_locked():
+            self.__check_layout()
+            with self.__hold():
+                self.__fragments.clear()
+                self.__raw.clear()
+                self.__cold.clear()
+                self.__log.positions.clear()
+                self.__stale.clear()
+                self.__detached.clear()
+                self.__text = None
+                self.__text_pending.clear()
+                if self.__journal:
+                    self.__log.recover(self.__layout.paths())
+
+                self.__unloaded = dict.fromkeys(self.__layout.paths())
+                if self.__lock is not None:
+                    self.__generation = self.__lock.generation()
+
+                if not self.__lazy:
+                    self.__load()
+
+    def _offloadable(self) -> bool:
+        """Turn thread-safe mode on, unless inside a batch block."""
+        if self.__undo is not None:
+            return False
+
+        if self.__rwlock is None:
+            self.__rwlock = ReadWriteLock()
+
+        return True
+
+    def __load(self, cls: typing.Union[type, str, None] = None,
+               obj_id: typing.Optional[str] = None) -> None:
+        """Parse the files that may hold objects of cls not parsed yet.
+
+        Args:
+            cls: optional class, or class name, of the objects needed.
+                Everything is parsed without it.
+            obj_id: optional id of the single object needed.
+        """
+        if not self.__unloaded:
+            return
+
+        if cls is None or not self.__layout.shards:
+            self.__load_paths(list(self.__unloaded))
+            return
+
+        classname: str = cls if isinstance(cls, str) else cls.__name__
+        indexes: typing.Iterable[int] = range(self.__layout.shards)
+        if obj_id is not None:
+            indexes = [self.__layout.shard(f"{classname}.{obj_id}")[1]]
+
+        self.__load_paths([self.__layout.shard_path((classname, index))
+                           for index in indexes])
+
+    def __load_paths(self, paths: typing.List[str]) -> None:
+        """Parse the given files, or all of them in journal mode."""
+        if self.__journal:
+            paths = list(self.__unloaded)
+
+        to_parse: typing.List[str] = []
+        for path in paths:
+            if path not in self.__unloaded:
+                continue
+
+            del self.__unloaded[path]
+            to_parse.append(path)
+
+        with self.__hold():
+            if self.__max_objects:
+                self.__index_paths(to_parse)
+            elif self.__lazy:
+                for loaded_objs in parse_files(to_parse, self.__workers,
+                                               self.__min_chunk_bytes):
+                    for key, obj_dict in loaded_objs.items():
+                        self.__load_record(key, obj_dict)
+            else:
+                for preloaded in parse_files(
+                        to_parse, self.__workers, self.__min_chunk_bytes,
+                        self.__deserializers.preload):
+                    self.__insert_preloaded(preloaded)
+
+            if self.__journal and paths:
+                for record in self.__log_entries():
+                    if record["op"] == "set":
+                        self.__load_record(record["key"], record["obj"])
+                    else:
+                        self.__unload_record(record["key"])
+
+    def __index_paths(self, paths: typing.List[str]) -> None:
+        """Index the keys of json files a range at a time.
+
+        Files without a valid offset index get one.
+        """
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+
+            try:
+                offsets.Reader(path).close()
+            except (OSError, ValueError):
+                offsets.build(path)
+
+            for chunk in split(path, os.stat(path).st_size,
+                               self.__min_chunk_bytes):
+                for key, obj_dict in parse(chunk).items():
+                    self.__load_record(key, obj_dict)
+
+    def __load_indexed(self, key: str) -> bool:
+        """Read the object of key alone through the offset index.
+
+        Returns:
+            True if the object was read, or is known not to be stored,
+            False if the store has to be parsed to find out.
+        """
+        path: str = self.__layout.path(key)
+        if (key in self.__objects or key in self.__cold
+                or key in self.__detached or key in self.__dirty):
+            # A dirty key missing from __objects was deleted since the
+            # last save, whatever the files still hold
+            return True
+
+        if path not in self.__unloaded:
+            return False
+
+        try:
+            record: typing.Optional[bytes] = offsets.lookup(path, key)
+        except FileNotFoundError:
+            if os.path.exists(path):
+                return False
+
+            record = None
+        except (OSError, ValueError):
+            return False
+
+        obj_dict: typing.Optional[dict] = (
+            None if record is None else json.loads(record)[key])
+        if self.__journal:
+            obj_dict = self.__log.last(key, obj_dict)
+
+        self.__detached.add(key)
+        if obj_dict is not None:
+            self.__insert(key, self.__deserializers.build(obj_dict))
+
+        return True
+
+    def __prepare(self) -> int:
+        """Encode the changes since the last save for the next flush.
+
+        Returns:
+            the number of objects changed since the last save.
+        """
+        mutations: int = len(self.__dirty)
+        if self.__layout.shards:
+            self.__stale.update(self.__layout.shard(key)
+                                for key in self.__dirty)
+
+        if not self.__journal:
+            self.__queue_snapshot()
+            return mutations
+
+        records: typing.List[typing.Tuple[str, str]] = []
+        for key in self.__dirty:
+            obj: typing.Optional[BaseModel] = self.__objects.get(key)
+            records.append((key, self.__log.record(
+                key, None if obj is None else obj.to_dict())))
+            self.__fragments.pop(key, None)
+
+        if self.__log.records + len(records) > self.__compact_threshold:
+            self.__queue_snapshot()
+            return mutations
+
+        self.__dirty.clear()
+        self.__log.records += len(records)
+
+        with self.__pending_lock:
+            self.__pending_records.extend(records)
+
+        return mutations
+
+    def __queue_snapshot(self) -> None:
+        """Queue the json files to rewrite, superseding queued log records.
+
+        That is the single json file, or the shards holding objects changed
+        since they were last written.
+        """
+        self.__catch_up()
+        snapshot: Snapshot = {}
+        if not self.__layout.shards:
+            if self.__journal:
+                self.__load()
+
+            keys: typing.List[str] = (
+                self.__keys() if self.__max_objects
+                else [*self.__objects, *self.__raw])
+            snapshot[self.__file_path] = self.__splice(self.__file_path, keys)
+        else:
+            if self.__journal:
+                self.__load_paths([self.__layout.shard_path(shard)
+                                   for shard in self.__stale])
+
+            shard_keys: typing.Dict[Shard, typing.List[str]] = {
+                shard: [] for shard in self.__stale}
+            for classname in {stale for stale, _ in self.__stale}:
+                for key in self.__class_keys(classname):
+                    shard_keys.get(self.__layout.shard(key), []).append(key)
+
+            for shard, keys in sorted(shard_keys.items()):
+                path: str = self.__layout.shard_path(shard)
+                snapshot[path] = self.__splice(path, keys)
+
+        with self.__pending_lock:
+            self.__pending_snapshot.update(snapshot)
+            self.__pending_records = []
+
+        self.__log.records = 0
+        self.__dirty.clear()
+        self.__stale.clear()
+
+    def __text_index(self) -> TextIndex:
+        """Return the full-text index, up to date with the objects.
+
+        The first call reads the saved index, or builds it if it does not
+        match the json files.
+        """
+        if self.__text is None:
+            for classname in TEXT_FIELDS:
+                self.__load(classname)
+
+            saved: typing.Optional[typing.Tuple[TextIndex, typing.List[
+                str]]] = text_file.read(self.text_path,
+                                        self.__layout.paths(), self.__log)
+            self.__text_saved = saved is not None
+            if saved is None:
+                self.__text = TextIndex()
+                self.__text_pending.update(dict.fromkeys(
+                    key for classname in TEXT_FIELDS
+                    for key in self.__class_keys(classname)))
+            else:
+                self.__text = saved[0]
+                self.__text_pending.update(dict.fromkeys(
+                    key for key in [*saved[1], *self.__dirty]
+                    if key.partition(".")[0] in TEXT_FIELDS))
+
+        for key in self.__text_pending:
+            if not self.__has(key):
+                self.__text.discard(key)
+                continue
+
+            fields: typing.Tuple[str, ...] = TEXT_FIELDS[
+                key.partition(".")[0]]
+            if key in self.__raw:
+                self.__text.add(key, [str(self.__raw[key].get(field, ""))
+                                      for field in fields])
+            else:
+                obj: BaseModel = self.__fetch(key)
+                self.__text.add(key, [str(getattr(obj, field, ""))
+                                      for field in fields])
+
+        self.__text_pending.clear()
+        return self.__text
+
+    def __queue_text(self) -> None:
+        """Queue the full-text index for the next flush if out of date."""
+        if self.__text is None:
+            return
+
+        with self.__pending_lock:
+            if (self.__text_saved and not self.__pending_snapshot
+                    and self.__pending_text is None):
+                return
+
+        text: str = json.dumps(self.__text_index().to_dict(),
+                               separators=(",", ":"))
+        with self.__pending_lock:
+            self.__pending_text = text
+
+        self.__text_saved = True
+
+    def __read_locked(self) -> typing.ContextManager[None]:
+        """Hold the lock for reading the objects, in thread-safe mode.
+
+        Reads of lazy and bounded stores instantiate and evict objects, so
+        they hold the lock for writing instead.
+        """
+        if self.__rwlock is None:
+            return nullcontext()
+
+        if self.__lazy:
+            return self.__rwlock.writing()
+
+        return self.__rwlock.reading()
+
+    def __write_locked(self) -> typing.ContextManager[None]:
+        """Hold the lock for changing the objects, in thread-safe mode."""
+        if self.__rwlock is None:
+            return nullcontext()
+
+        return self.__rwlock.writing()
+
+    @contextmanager
+    def __hold(self) -> typing.Iterator[None]:
+        """Hold the store lock while reading the files, in shared mode."""
+        if self.__lock is None:
+            yield
+            return
+
+        with self.__lock.hold():
+            yield
+
+    @contextmanager
+    def __writing(self) -> typing.Iterator[None]:
+        """Hold the store lock exclusively while writing, in shared mode.
+
+        Rewriting json files catches up with other processes first, which
+        appending to the log does not need to.
+        """
+        if self.__lock is None:
+            yield
+            return
+
+        with self.__lock.hold(exclusive=True):
+            if not self.__journal:
+                self.__catch_up()
+
+            yield
+            current: bool = self.__generation == self.__lock.generation()
+            generation: int = self.__lock.advance()
+            if current:
+                self.__generation = generation
+
+    def __catch_up(self) -> None:
+        """Merge what other processes saved since the files were read."""
+        if self.__lock is None:
+            return
+
+        generation: int = self.__lock.generation()
+        if generation != self.__generation:
+            self.__merge()
+            self.__generation = generation
+
+    def __merge(self) -> None:
+        """Bring the objects read from disk up to date with the files.
+
+        Objects changed or deleted since the last save keep their unsaved
+        state, and instantiated objects are updated in place.
+        """
+        disk: typing.Dict[str, dict] = {}
+        for loaded_objs in parse_files(self.__layout.paths(), self.__workers,
+                                       self.__min_chunk_bytes):
+            disk.update(loaded_objs)
+
+        if self.__journal:
+            for record in self.__log_entries():
+                if record["op"] == "set":
+                    disk[record["key"]] = record["obj"]
+                else:
+                    disk.pop(record["key"], None)
+
+        for key in [*self.__objects, *self.__raw]:
+            if key in disk or key in self.__dirty:
+                continue
+
+            if key in self.__objects:
+                self.__remove(key)
+            else:
+                del self.__raw[key]
+                self.__unindex(key)
+
+            self.__fragments.pop(key, None)
+
+        for key, obj_dict in disk.items():
+            if key in self.__dirty:
+                continue
+
+            self.__fragments.pop(key, None)
+            obj: typing.Optional[BaseModel] = self.__objects.get(key)
+            if obj is not None:
+                restore(obj, attributes(self.__deserializers.build(obj_dict)))
+                self.__insert(key, obj)
+            elif self.__lazy:
+                self.__raw[key] = obj_dict
+                self.__index(key, self.__attributes_of(obj_dict),
+                             obj_dict.get)
+            else:
+                self.__insert(key, self.__deserializers.build(obj_dict))
+
+        self.__unloaded.clear()
+        self.__detached.clear()
+
+    def __splice(self, path: str, keys: typing.List[str]
+                 ) -> typing.Tuple[typing.List[str], typing.List[str]]:
+        """Return the keys and fragments to write to a json file.
+
+        Those are the objects stored under keys, preceded by the records
+        of the file if it was not parsed yet. Such records are cut out of
+        the file unparsed, unless memory replaces them.
+        """
+        fragments: typing.List[str] = self.__snapshot(keys)
+        if path not in self.__unloaded:
+            return keys, fragments
+
+        try:
+            with open(path, "rb") as file:
+                data: bytes = file.read()
+        except FileNotFoundError:
+            return keys, fragments
+
+        kept: typing.List[str] = []
+        records: typing.List[str] = []
+        try:
+            for key, offset, length in offsets.scan(data, path):
+                if not self.__replaced(key):
+                    kept.append(key)
+                    records.append(
+                        data[offset:offset + length].decode("utf-8"))
+        except ValueError:
+            # Not written by FileStorage, so records cannot be cut out
+            for key, obj_dict in json.loads(data).items():
+                if not self.__replaced(key):
+                    kept.append(key)
+                    records.append(encode(key, obj_dict))
+
+        return kept + keys, records + fragments
+
+    def __replaced(self, key: str) -> bool:
+        """Return True if memory supersedes the record of key on disk."""
+        return (key in self.__objects or key in self.__dirty
+                or key in self.__detached)
+
+    def __snapshot(self, keys: typing.List[str]) -> typing.List[str]:
+        """Return the json fragments of the objects stored under keys.
+
+        Only dirty objects are encoded again, the rest reuse their cached
+        fragment.
+        """
+        if len(self.__fragments) > len(self.__objects) + len(self.__raw):
+            self.__fragments = {key: fragment for key, fragment
+                                in self.__fragments.items()
+                                if self.__has(key)}
+
+        fragments: typing.List[str] = []
+        readers: typing.Dict[str, offsets.Reader] = {}
+        try:
+            for key in keys:
+                if key in self.__cold:
+                    fragments.append(self.__cold_fragment(key, readers))
+                    continue
+
+                fragment: typing.Optional[str] = self.__fragments.get(key)
+                if key in self.__objects:
+                    if fragment is None or key in self.__dirty:
+                        fragment = encode(key, self.__objects[key].to_dict())
+                elif fragment is None:
+                    fragment = encode(key, self.__raw[key])
+
+                self.__fragments[key] = fragment
+                fragments.append(fragment)
+        finally:
+            for reader in readers.values():
+                reader.close()
+
+        return fragments
+
+    def __cold_fragment(self, key: str,
+                        readers: typing.Dict[str, offsets.Reader]) -> str:
+        """Return the json fragment of an evicted object from disk.
+
+        Args:
+            key: key of the evicted object.
+            readers: open readers of the json files by path, added to
+                as needed and closed by the caller.
+        """
+        if key in self.__log.positions:
+            return encode(key, self.__log.read(key))
+
+        path: str = self.__layout.path(key)
+        if path not in readers:
+            readers[path] = offsets.Reader(path)
+
+        fragment: typing.Optional[bytes] = readers[path].fragment(key)
+        if fragment is None:
+            raise KeyError(f"{key} is missing from {path}")
+
+        return fragment.decode("utf-8")
+
+    def __swap_snapshot(self, snapshot: Snapshot) -> None:
+        """Replace json files and the journal log they supersede.
+
+        The log is retired once the files are written next to their paths
+        and before they are moved in place, so a crash in between is
+        finished by the next reload rather than replaying the log.
+        """
+        for path, (_, fragments) in snapshot.items():
+            with open(path + ".tmp", "w", encoding="utf-8") as file:
+                dump(fragments, file)
+
+        self.__log.retire()
+        for path, (keys, fragments) in snapshot.items():
+            os.replace(path + ".tmp", path)
+            if self.__offset_index:
+                offsets.write(path, keys, fragments)
+
+        os.remove(self.__log.retired_path)
+
+    def __check_layout(self) -> None:
+        """Move the objects to the files of the current number of shards."""
+        with (nullcontext() if self.__lock is None
+              else self.__lock.hold(exclusive=True)):
+            if (self.__layout.check(self.__saved_objects,
+                                    [self.log_path, self.retired_log_path],
+                                    self.__offset_index)
+                    and self.__lock is not None):
+                self.__lock.advance()
+
+    def __saved_objects(self, shards: int) -> typing.Dict[str, dict]:
+        """Return the objects stored in a number of shards, by key."""
+        source: FileStorage = FileStorage(self.__file_path,
+                                          journal=self.__journal,
+                                          shards=shards)
+        source.reload()
+        return {key: obj.to_dict() for key, obj in source.all().items()}
+
+    def __log_entries(self) -> typing.Iterator[dict]:
+        """Yield the records of the log, marking their shards stale."""
+        for record in self.__log.entries():
+            yield record
+            if self.__layout.shards:
+                self.__stale.add(self.__layout.shard(record["key"]))
+
+    def __load_record(self, key: str, obj_dict: dict) -> None:
+        """Store an object read from disk, as a dictionary if lazy.
+
+        Lazily loaded objects never replace the ones changed or deleted in
+        memory since the last save.
+        """
+        if key in self.__detached:
+            return
+
+        if not self.__lazy:
+            self.__insert(key, self.__deserializers.build(obj_dict))
+        elif key not in self.__objects and key not in self.__dirty:
+            if self.__max_objects:
+                self.__cold[key] = None
+            else:
+                self.__raw[key] = obj_dict
+
+            self.__index(key, self.__attributes_of(obj_dict),
+                         obj_dict.get)
+
+    def __unload_record(self, key: str) -> None:
+        """Drop an object deleted on disk."""
+        if key in self.__raw or key in self.__cold:
+            self.__raw.pop(key, None)
+            self.__cold.pop(key, None)
+            self.__unindex(key)
+        elif not self.__lazy and key in self.__objects:
+            self.__remove(key)
+
+    def __insert_preloaded(self, preloaded: Preloaded) -> None:
+        """Finish building and store the records of Deserializers.preload.
+
+        This is what reload leaves to this process with workers, so it
+        does the work of __insert for a whole range at once.
+        """
+        keys, classnames, attributes, called = preloaded
+        objects: typing.Dict[str, BaseModel] = {}
+        for key, classname, attrs in zip(keys, classnames, attributes,
+                                         strict=True):
+            if key in self.__detached:
+                continue
+
+            obj: BaseModel = (
+                self.__deserializers.build(called[key]) if attrs is None
+                else self.__deserializers[classname].instantiate(attrs))
+            object.__setattr__(obj, "_storage", self)
+            objects[key] = obj
+            self.__catalog.bucket(classname)[key] = None
+
+        self.__objects.update(objects)
+        self.__unindexed.update(dict.fromkeys(objects))
+
+    def __restore(self, key: str, obj: BaseModel) -> None:
+        """Store an object back after undoing a batch."""
+        self.__insert(key, obj)
+        self.__dirty.add(key)
+
+    def __discard(self, key: str) -> None:
+        """Drop an object created inside an undone batch."""
+        if key in self.__objects:
+            self.__remove(key)
+            self.__dirty.add(key)
+
+    def __has(self, key: str) -> bool:
+        """Return True if key is stored, instantiated or not."""
+        return (key in self.__objects or key in self.__raw
+                or key in self.__cold)
+
+    def __fetch(self, key: str) -> BaseModel:
+        """Return the stored object of key, instantiating it if needed."""
+        if key in self.__objects:
+            if self.__max_objects:
+                self.__stats["hits"] += 1
+                self.__objects[key] = self.__objects.pop(key)
+
+            return self.__objects[key]
+
+        if key in self.__cold:
+            return self.__fault(key)
+
+        return self.__materialize(key)
+
+    def __fault(self, key: str) -> BaseModel:
+        """Read an evicted object back from disk."""
+        obj_dict: dict
+        if key in self.__log.positions:
+            obj_dict = self.__log.read(key)
+        else:
+            path: str = self.__layout.path(key)
+            record: typing.Optional[bytes] = offsets.lookup(path, key)
+            if record is None:
+                raise KeyError(f"{key} is missing from {path}")
+
+            obj_dict = json.loads(record)[key]
+
+        obj: BaseModel = self.__deserializers.build(obj_dict)
+        object.__setattr__(obj, "_storage", self)
+        del self.__cold[key]
+        self.__objects[key] = obj
+        self.__stats["misses"] += 1
+        self.__evict()
+        return obj
+
+    def __evict(self) -> None:
+        """Evict the least recently used objects over max_objects.
+
+        Changed objects are written to the log first. Nothing is evicted
+        inside a batch block, whose changes may still be undone.
+        """
+        if not self.__max_objects or self.__undo is not None:
+            return
+
+        if len(self.__objects) > self.__max_objects:
+            self.__reindex()
+
+        while len(self.__objects) > self.__max_objects:
+            key: str = next(iter(self.__objects))
+            if key in self.__dirty:
+                self.__prepare()
+                self.flush()
+
+            del self.__objects[key]
+            self.__fragments.pop(key, None)
+            self.__cold[key] = None
+            self.__stats["evictions"] += 1
+
+    def __reach(self, keys: typing.Iterable[str],
+                filters: typing.List[Condition]
+                ) -> typing.Iterator[BaseModel]:
+        """Yield the objects of keys still stored that satisfy filters.
+
+        Keys are taken with the lock held, since range scans read them
+        from the index as they go.
+        """
+        iterator: typing.Iterator[str] = iter(keys)
+        while True:
+            with self.__read_locked():
+                key: typing.Optional[str] = next(iterator, None)
+                if key is None:
+                    return
+
+                obj: typing.Optional[BaseModel] = (
+                    self.__fetch(key) if self.__has(key) else None)
+
+            if obj is not None and matches_all(obj, filters):
+                yield obj
+
+    def __plan(self, cls: typing.Union[type, str, None],
+               conditions: typing.List[Condition],
+               order_by: typing.Optional[str] = None,
+               limit: typing.Optional[int] = None
+               ) -> typing.Tuple[Plan, typing.Iterable[str], bool]:
+        """Return the plan of a query, its keys and whether to sort them."""
+        self.__load(cls)
+        if cls is None:
+            keys: typing.List[str] = self.__candidates(None)
+            return Plan("scan", conditions, len(keys),
+                        f"{order_by} (sort)" if order_by else ""), keys, True
+
+        classname: str = cls if isinstance(cls, str) else cls.__name__
+        return self.__catalog.plan(classname, conditions, order_by, limit,
+                                   lambda: self.__candidates(classname))
+
+    def __candidates(self, cls: typing.Union[type, str, None]
+                     ) -> typing.List[str]:
+        """Return the keys iterate reaches for cls."""
+        if cls is not None:
+            return self.__class_keys(cls)
+
+        if self.__max_objects:
+            return self.__keys()
+
+        return [*self.__objects, *self.__raw]
+
+    def __keys(self) -> typing.List[str]:
+        """Return every stored key, grouped by class."""
+        return [key for classname in self.__catalog.classnames()
+                for key in self.__class_keys(classname)]
+
+    def __materialize(self, key: str) -> BaseModel:
+        """Turn the parsed dictionary of key into an instance."""
+        obj: BaseModel = self.__deserializers.build(self.__raw[key])
+        object.__setattr__(obj, "_storage", self)
+        self.__objects[key] = obj
+        del self.__raw[key]
+        return obj
+
+    def __touch(self, obj) -> None:
+        """Mark obj dirty and due to be indexed again."""
+        obj_key: str = f"{obj.__class__.__name__}.{getattr(obj, 'id', '')}"
+        if obj_key in self.__cold:
+            # An evicted instance is still in use, take it back
+            del self.__cold[obj_key]
+            self.__objects[obj_key] = obj
+
+        if obj_key in self.__objects:
+            if self.__undo is not None:
+                self.__undo.changed(obj_key, obj)
+
+            self.__dirty.add(obj_key)
+            self.__unindexed[obj_key] = None
+
+    def __insert(self, key: str, obj: BaseModel) -> None:
+        """Store obj under key, leaving its other indexes to __reindex."""
+        object.__setattr__(obj, "_storage", self)
+        self.__objects[key] = obj
+        self.__catalog.bucket(key.partition(".")[0])[key] = None
+        self.__unindexed[key] = None
+
+    def __refresh(self) -> None:
+        """Run __reindex with the lock held for writing if needed."""
+        if self.__unindexed:
+            with self.__write_locked():
+                self.__reindex()
+
+    def __reindex(self) -> None:
+        """Index the objects stored or changed since the last call again."""
+        unindexed: typing.Dict[str, None] = self.__unindexed
+        self.__unindexed = {}
+        for key in unindexed:
+            if key in self.__objects:
+                obj: BaseModel = self.__objects[key]
+                self.__index(key, lambda field, obj=obj: getattr(
+                    obj, field, None), lambda field, obj=obj: assigned(
+                        obj, field))
+
+    def __remove(self, key: str) -> None:
+        """Drop the object stored under key and its index entries."""
+        del self.__objects[key]
+        self.__unindex(key)
+
+    def __index(self, key: str,
+                value_of: typing.Callable[[str], typing.Any],
+                assigned_of: typing.Callable[[str], typing.Any]) -> None:
+        """Add key to the catalog and queue it for the full-text index."""
+        self.__catalog.add(key, value_of, assigned_of)
+        if self.__text is not None and key.partition(".")[0] in TEXT_FIELDS:
+            self.__text_pending[key] = None
+
+    def __unindex(self, key: str) -> None:
+        """Remove key from the catalog and the full-text index."""
+        self.__catalog.discard(key)
+        if self.__text is not None and key.partition(".")[0] in TEXT_FIELDS:
+            self.__text_pending[key] = None
+
+    def __attributes_of(self, obj_dict: dict) -> typing.Callable[[str],
+                                                                 typing.Any]:
+        """Return a getter of the attributes of a parsed dictionary.
+
+        Attributes still at their class default are left out of the
+        dictionary, so the getter falls back to the class attribute.
+        """
+        cls: typing.Any = self.__classes.get(obj_dict.get("__class__", ""))
+        return lambda field: obj_dict.get(field, getattr(cls, field, None))
+
+    def __class_keys(self, cls: typing.Union[type, str]) -> typing.List[str]:
+        """Return the keys of the stored objects of a class.
+
+        Keys removed from __objects behind the engine's back are pruned
+        from the index on the way.
+        """
+        classname: str = cls if isinstance(cls, str) else cls.__name__
+        bucket: typing.Dict[str, None] = self.__catalog.bucket(classname)
+        keys: typing.List[str] = [key for key in bucket if self.__has(key)]
+        if len(keys) < len(bucket):
+            self.__catalog.prune(classname, keys)
+
+        return keys
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+"""Module for flusher."""
+
+import threading
+import time
+import typing
+
+
+class WriteBehindFlusher:
+    """Background thread calling a flush function with a debounce.
+
+    After being notified of pending mutations the thread waits until
+    `interval` seconds have passed since its previous flush, or until
+    `max_pending` mutations are pending, and then flushes once for all of
+    them.
+    """
+
+    def __init__(self, flush: typing.Callable[[], None], interval: float,
+                 max_pending: int) -> None:
+        """Start the flusher thread.
+
+        Args:
+            flush: function writing the pending changes to disk.
+            interval: minimum number of seconds between two flushes.
+            max_pending: number of pending mutations that triggers a flush
+                without waiting for the interval.
+        """
+        self.__flush: typing.Callable[[], None] = flush
+        self.__interval: float = interval
+        self.__max_pending: int = max_pending
+        self.__pending: int = 0
+        self.__stopped: bool = False
+        self.__last_flush: float = time.monotonic()
+        self.__condition: threading.Condition = threading.Condition()
+        self.__thread: threading.Thread = threading.Thread(
+            target=self.__run, name="WriteBehindFlusher", daemon=True)
+        self.__thread.start()
+
+    def notify(self, mutations: int = 1) -> None:
+        """Let the thread know that mutations are waiting to be flushed."""
+        with self.__condition:
+            self.__pending += max(mutations, 1)
+            self.__condition.notify()
+
+    def stop(self) -> None:
+        """Stop the thread after a last flush of pending mutations."""
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify()
+
+        self.__thread.join()
+
+    def __run(self) -> None:
+        """Wait for mutations and flush them, at most once per interval."""
+        while True:
+            with self.__condition:
+                while not self.__pending and not self.__stopped:
+                    self.__condition.wait()
+
+                deadline: float = self.__last_flush + self.__interval
+                while (self.__pending < self.__max_pending
+                       and not self.__stopped
+                       and time.monotonic() < deadline):
+                    self.__condition.wait(deadline - time.monotonic())
+
+                stopped: bool = self.__stopped
+                self.__pending = 0
+
+            self.__flush()
+            self.__last_flush = time.monotonic()
+            if stopped:
+                return
@@ -0,0 +1,458 @@
+#!/usr/bin/python3
+"""Module for indexes."""
+
+import bisect
+import math
+import re
+import typing
+
+# Foreign key attributes of each model class that get a reverse index
+FOREIGN_KEYS: typing.Dict[str, typing.Tuple[str, ...]] = {
+    "City": ("state_id",),
+    "Place": ("city_id", "user_id"),
+    "Review": ("place_id", "user_id"),
+}
+
+# Text attributes of each model class indexed for full-text search
+TEXT_FIELDS: typing.Dict[str, typing.Tuple[str, ...]] = {
+    "Place": ("name", "description"),
+    "Review": ("text",),
+}
+
+# Latitude and longitude attributes of each model class indexed by place
+LOCATION_FIELDS: typing.Dict[str, typing.Tuple[str, str]] = {
+    "Place": ("latitude", "longitude"),
+}
+
+# Numeric attributes of each model class kept sorted for range queries.
+# Objects whose value is not a number are left out of range scans.
+RANGE_FIELDS: typing.Dict[str, typing.Tuple[str, ...]] = {
+    "Place": ("price_by_night", "max_guest", "number_rooms"),
+}
+
+# Mean radius of the Earth in kilometres
+EARTH_RADIUS: float = 6371.0088
+
+_TERM: typing.Pattern[str] = re.compile(r"\w+")
+
+
+def terms(text: str) -> typing.List[str]:
+    """Return the lowercased words of text, in order."""
+    return _TERM.findall(text.lower())
+
+
+def distance(latitude: float, longitude: float, other_latitude: float,
+             other_longitude: float) -> float:
+    """Return the great-circle distance in kilometres between two points."""
+    lat1: float = math.radians(latitude)
+    lat2: float = math.radians(other_latitude)
+    half_chord: float = (
+        math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2)
+        * math.sin(math.radians(other_longitude - longitude) / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(min(half_chord, 1.0)))
+
+
+class AttributeIndex:
+    """Reverse index from the value of an attribute to object keys.
+
+    Keys are kept in insertion order for every value so that lookups return
+    objects in the same order as FileStorage.all().
+    """
+
+    def __init__(self) -> None:
+        """Initialise an empty index."""
+        self.__keys: typing.Dict[typing.Any, typing.Dict[str, None]] = {}
+        self.__values: typing.Dict[str, typing.Any] = {}
+
+    def __len__(self) -> int:
+        """Return the number of indexed keys."""
+        return len(self.__values)
+
+    def add(self, key: str, value: typing.Any) -> None:
+        """Index key under value, moving it if it was indexed elsewhere."""
+        if key in self.__values:
+            if self.__values[key] == value:
+                return
+
+            self.discard(key)
+
+        self.__values[key] = value
+        self.__keys.setdefault(value, {})[key] = None
+
+    def discard(self, key: str) -> None:
+        """Remove key from the index if present."""
+        if key not in self.__values:
+            return
+
+        value: typing.Any = self.__values.pop(key)
+        bucket: typing.Dict[str, None] = self.__keys[value]
+        del bucket[key]
+        if not bucket:
+            del self.__keys[value]
+
+    def clear(self) -> None:
+        """Remove every key from the index."""
+        self.__keys.clear()
+        self.__values.clear()
+
+    def keys(self, value: typing.Any) -> typing.List[str]:
+        """Return the keys indexed under value."""
+        return list(self.__keys.get(value, ()))
+
+
+class TextIndex:
+    """Inverted index from words to the keys of the objects using them.
+
+    Every key is a document made of the words of its texts. Searches
+    return the keys holding every word searched for, ranked by tf-idf: the
+    more often a key uses the words, and the rarer they are elsewhere, the
+    higher it ranks, scaled down for long documents.
+    """
+
+    def __init__(self) -> None:
+        """Initialise an empty index."""
+        self.__postings: typing.Dict[str, typing.Dict[str, int]] = {}
+        self.__documents: typing.Dict[str, typing.Dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of indexed keys."""
+        return len(self.__documents)
+
+    def add(self, key: str, texts: typing.Iterable[str]) -> None:
+        """Index the words of texts under key, replacing its old words."""
+        counts: typing.Dict[str, int] = {}
+        for text in texts:
+            for term in terms(text):
+                counts[term] = counts.get(term, 0) + 1
+
+        if self.__documents.get(key) == counts:
+            return
+
+        self.discard(key)
+        if not counts:
+            return
+
+        self.__documents[key] = counts
+        for term, count in counts.items():
+            self.__postings.setdefault(term, {})[key] = count
+
+    def discard(self, key: str) -> None:
+        """Remove key from the index if present."""
+        for term in self.__documents.pop(key, ()):
+            postings: typing.Dict[str, int] = self.__postings[term]
+            del postings[key]
+            if not postings:
+                del self.__postings[term]
+
+    def search(self, text: str, classname: typing.Optional[str] = None
+               ) -> typing.List[typing.Tuple[str, float]]:
+        """Return the keys holding every word of text with their scores.
+
+        Args:
+            text: the words to look for.
+            classname: optional class name the keys are restricted to.
+
+        Returns:
+            the keys and scores, best first.
+        """
+        words: typing.List[str] = list(dict.fromkeys(terms(text)))
+        postings: typing.List[typing.Dict[str, int]] = [
+            self.__postings.get(word, {}) for word in words]
+        if not postings:
+            return []
+
+        prefix: str = "" if classname is None else classname + "."
+        scores: typing.Dict[str, float] = {}
+        for key in min(postings, key=len):
+            if key.startswith(prefix) and all(key in found
+                                              for found in postings):
+                length: int = sum(self.__documents[key].values())
+                scores[key] = sum(
+                    found[key] * math.log(1 + len(self) / len(found))
+                    for found in postings) / math.sqrt(length)
+
+        return sorted(scores.items(), key=lambda item: -item[1])
+
+    def to_dict(self) -> typing.Dict[str, typing.Dict[str, int]]:
+        """Return the word counts of every key, e.g. to save them."""
+        return self.__documents
+
+    @classmethod
+    def from_dict(cls, documents: typing.Dict[str, typing.Dict[str, int]]
+                  ) -> "TextIndex":
+        """Return an index of the word counts returned by to_dict."""
+        index: "TextIndex" = cls()
+        for key, counts in documents.items():
+            index.__documents[key] = counts
+            for term, count in counts.items():
+                index.__postings.setdefault(term, {})[key] = count
+
+        return index
+
+
+class GridIndex:
+    """Spatial index of points on a grid of latitude/longitude cells.
+
+    A search for the points within a radius only measures the distance to
+    the points of the cells overlapping the bounding box of the circle.
+    Keys whose coordinates are not numbers are not indexed.
+    """
+
+    def __init__(self, cell_degrees: float = 0.02) -> None:
+        """Initialise an empty index.
+
+        Args:
+            cell_degrees: width and height of the cells in degrees.
+        """
+        self.__cell_degrees: float = cell_degrees
+        self.__columns: int = math.ceil(360 / cell_degrees)
+        self.__cells: typing.Dict[typing.Tuple[int, int],
+                                  typing.Dict[str, None]] = {}
+        self.__points: typing.Dict[str, typing.Tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of indexed keys."""
+        return len(self.__points)
+
+    def add(self, key: str, latitude: typing.Any,
+            longitude: typing.Any) -> None:
+        """Index key at a point, moving it if it was indexed elsewhere."""
+        try:
+            point: typing.Tuple[float, float] = (float(latitude),
+                                                 float(longitude))
+        except (TypeError, ValueError):
+            self.discard(key)
+            return
+
+        if self.__points.get(key) == point:
+            return
+
+        self.discard(key)
+        if not (-90 <= point[0] <= 90 and math.isfinite(point[1])):
+            return
+
+        self.__points[key] = point
+        self.__cells.setdefault(self.__cell(*point), {})[key] = None
+
+    def discard(self, key: str) -> None:
+        """Remove key from the index if present."""
+        if key not in self.__points:
+            return
+
+        cell: typing.Tuple[int, int] = self.__cell(*self.__points.pop(key))
+        del self.__cells[cell][key]
+        if not self.__cells[cell]:
+            del self.__cells[cell]
+
+    def within(self, latitude: float, longitude: float, radius: float
+               ) -> typing.List[typing.Tuple[str, float]]:
+        """Return the keys at most radius kilometres away from a point.
+
+        Returns:
+            the keys and their distances in kilometres, nearest first.
+        """
+        if radius < 0:
+            return []
+
+        angle: float = radius / EARTH_RADIUS
+        rows: range = range(
+            self.__row(max(latitude - math.degrees(angle), -90)),
+            self.__row(min(latitude + math.degrees(angle), 90)) + 1)
+        columns: typing.Optional[typing.Set[int]] = None
+        # Beyond a pole or half way around the Earth every column is hit
+        if (angle < math.pi / 2
+                and abs(latitude) + math.degrees(angle) < 90):
+            span: float = math.degrees(math.asin(
+                math.sin(angle) / math.cos(math.radians(latitude))))
+            first: int = self.__cell(latitude, longitude - span)[1]
+            count: int = self.__cell(latitude, longitude + span)[1] - first
+            if count < 0:
+                count += self.__columns
+
+            if count + 1 < self.__columns:
+                columns = {(first + offset) % self.__columns
+                           for offset in range(count + 1)}
+
+        cells: typing.List[typing.Tuple[int, int]]
+        if columns is not None and (len(rows) * len(columns)
+                                    <= len(self.__cells)):
+            cells = [(row, column) for row in rows for column in columns
+                     if (row, column) in self.__cells]
+        else:
+            # Fewer cells are occupied than overlapped, visit those instead
+            cells = [cell for cell in self.__cells if cell[0] in rows and (
+                columns is None or cell[1] in columns)]
+
+        # Points are compared through the haversine of their distance,
+        # only turned into kilometres for the points found
+        latitude_radians: float = math.radians(latitude)
+        cosine: float = math.cos(latitude_radians)
+        limit: float = math.sin(min(angle, math.pi) / 2) ** 2
+        found: typing.List[typing.Tuple[str, float]] = []
+        for cell in cells:
+            for key in self.__cells[cell]:
+                point_latitude, point_longitude = self.__points[key]
+                point_radians: float = math.radians(point_latitude)
+                half_chord: float = (
+                    math.sin((point_radians - latitude_radians) / 2) ** 2
+                    + cosine * math.cos(point_radians) * math.sin(
+                        math.radians(point_longitude - longitude) / 2) ** 2)
+                if half_chord <= limit:
+                    found.append((key, 2 * EARTH_RADIUS * math.asin(
+                        math.sqrt(min(half_chord, 1.0)))))
+
+        return sorted(found, key=lambda item: item[1])
+
+    def __row(self, latitude: float) -> int:
+        """Return the row of the cells holding a latitude."""
+        return min(int((latitude + 90) // self.__cell_degrees),
+                   math.ceil(180 / self.__cell_degrees) - 1)
+
+    def __cell(self, latitude: float,
+               longitude: float) -> typing.Tuple[int, int]:
+        """Return the row and column of the cell holding a point."""
+        return (self.__row(latitude),
+                int((longitude + 180) % 360 // self.__cell_degrees)
+                % self.__columns)
+
+
+class SortedIndex:
+    """Index of keys sorted by a numeric value, for range scans.
+
+    Values are recorded as keys are added but only sorted on the first
+    scan, so that loading a store does not pay for keeping them in order.
+    From then on every change moves a single entry. Keys with equal values
+    are ordered by key.
+    """
+
+    def __init__(self) -> None:
+        """Initialise an empty index."""
+        self.__values: typing.Dict[str, float] = {}
+        self.__sorted_values: typing.Optional[typing.List[float]] = None
+        self.__sorted_keys: typing.List[str] = []
+
+    def __len__(self) -> int:
+        """Return the number of indexed keys."""
+        return len(self.__values)
+
+    def add(self, key: str, value: typing.Any) -> None:
+        """Index key under value, moving it if it was indexed elsewhere."""
+        if (not isinstance(value, (int, float)) or isinstance(value, bool)
+                or math.isnan(value)):
+            self.discard(key)
+            return
+
+        if self.__values.get(key) == value:
+            return
+
+        self.discard(key)
+        self.__values[key] = value
+        if self.__sorted_values is not None:
+            position: int = self.__position(value, key)
+            self.__sorted_values.insert(position, value)
+            self.__sorted_keys.insert(position, key)
+
+    def discard(self, key: str) -> None:
+        """Remove key from the index if present."""
+        if key not in self.__values:
+            return
+
+        value: float = self.__values.pop(key)
+        if self.__sorted_values is not None:
+            position: int = self.__position(value, key)
+            del self.__sorted_values[position]
+            del self.__sorted_keys[position]
+
+    def count(self, low: typing.Optional[float] = None,
+              high: typing.Optional[float] = None,
+              low_inclusive: bool = True, high_inclusive: bool = True) -> int:
+        """Return the number of keys with values between low and high."""
+        start, end = self.__bounds(low, high, low_inclusive, high_inclusive)
+        return max(end - start, 0)
+
+    def scan(self, low: typing.Optional[float] = None,
+             high: typing.Optional[float] = None,
+             low_inclusive: bool = True, high_inclusive: bool = True,
+             descending: bool = False) -> typing.Iterator[str]:
+        """Yield the keys with values between low and high in order.
+
+        The keys are read a slice at a time, resuming after the last key
+        read, so the index may change between two keys. Keys discarded or
+        moved since their slice was read are skipped, and a moved key is
+        yielded at its new place if that is still ahead.
+
+        Args:
+            low: optional lowest value, unbounded without it.
+            high: optional highest value, unbounded without it.
+            low_inclusive: if False, leave out keys valued low.
+            high_inclusive: if False, leave out keys valued high.
+            descending: if True, yield the highest values first.
+        """
+        last: typing.Optional[typing.Tuple[float, str]] = None
+        size: int = 16
+        while True:
+            start, end = self.__bounds(low, high, low_inclusive,
+                                       high_inclusive)
+            if descending:
+                if last is not None:
+                    end = min(end, self.__position(*last))
+
+                start = max(start, end - size)
+            else:
+                if last is not None:
+                    start = max(start, self.__position(*last, after=True))
+
+                end = min(end, start + size)
+
+            entries: typing.List[typing.Tuple[float, str]] = list(zip(
+                self.__sorted()[start:end], self.__sorted_keys[start:end],
+                strict=True))
+            if not entries:
+                return
+
+            if descending:
+                entries.reverse()
+
+            last = entries[-1]
+            for value, key in entries:
+                if self.__values.get(key) == value:
+                    yield key
+
+            size = min(size * 2, 4096)
+
+    def __bounds(self, low: typing.Optional[float],
+                 high: typing.Optional[float], low_inclusive: bool,
+                 high_inclusive: bool) -> typing.Tuple[int, int]:
+        """Return the positions of the first and after the last key."""
+        values: typing.List[float] = self.__sorted()
+        start: int = 0
+        if low is not None:
+            start = (bisect.bisect_left(values, low) if low_inclusive
+                     else bisect.bisect_right(values, low))
+
+        end: int = len(values)
+        if high is not None:
+            end = (bisect.bisect_right(values, high) if high_inclusive
+                   else bisect.bisect_left(values, high))
+
+        return start, end
+
+    def __position(self, value: float, key: str, after: bool = False) -> int:
+        """Return the position of key valued value in the sorted lists."""
+        values: typing.List[float] = self.__sorted()
+        start: int = bisect.bisect_left(values, value)
+        end: int = bisect.bisect_right(values, value, start)
+        if after:
+            return bisect.bisect_right(self.__sorted_keys, key, start, end)
+
+        return bisect.bisect_left(self.__sorted_keys, key, start, end)
+
+    def __sorted(self) -> typing.List[float]:
+        """Return the sorted values, sorting them on first use."""
+        if self.__sorted_values is None:
+            entries: typing.List[typing.Tuple[float, str]] = sorted(
+                (value, key) for key, value in self.__values.items())
+            self.__sorted_values = [value for value, _ in entries]
+            self.__sorted_keys = [key for _, key in entries]
+
+        return self.__sorted_values
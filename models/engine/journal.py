@@ -0,0 +1,177 @@
+#!/usr/bin/python3
+"""Module for journal.
+
+Append-only log of the objects saved since the json files of a FileStorage
+were last written. Every line is a record {"op": "set", "key": ..., "obj":
+...} or {"op": "del", "key": ...}, replayed in order on top of the json
+files.
+"""
+
+from contextlib import suppress
+import json
+import os
+import typing
+
+
+class Journal:
+    """The log file of a store.
+
+    Attributes:
+        records: number of records in the log, counted by entries and by
+            the caller as it queues records to append.
+        positions: offset and length of the last "set" record of each key,
+            if tracked, so that single objects can be read back.
+    """
+
+    def __init__(self, path: str, track: bool = False) -> None:
+        """Initialise the log at path.
+
+        Args:
+            path: path of the log file.
+            track: if True, record the positions of "set" records.
+        """
+        self.__path: str = path
+        self.__track: bool = track
+        self.records: int = 0
+        self.positions: typing.Dict[str, typing.Tuple[int, int]] = {}
+
+    @property
+    def path(self) -> str:
+        """Path of the log file."""
+        return self.__path
+
+    @property
+    def retired_path(self) -> str:
+        """Path of the log while json files replace it."""
+        return self.__path + ".old"
+
+    @staticmethod
+    def record(key: str, obj_dict: typing.Optional[dict]) -> str:
+        """Return the log line setting key to obj_dict, or deleting it."""
+        record: typing.Dict[str, typing.Any] = {"op": "del", "key": key}
+        if obj_dict is not None:
+            record = {"op": "set", "key": key, "obj": obj_dict}
+
+        return json.dumps(record, separators=(",", ":")) + "\n"
+
+    def append(self, lines: typing.List[typing.Tuple[str, str]]) -> None:
+        """Append the lines returned by record, given with their keys."""
+        with open(self.__path, "ab") as file:
+            position: int = file.seek(0, os.SEEK_END)
+            encoded: typing.List[bytes] = []
+            for key, line in lines:
+                encoded.append(line.encode("utf-8"))
+                if self.__track:
+                    self.positions[key] = (position, len(encoded[-1]))
+
+                position += len(encoded[-1])
+
+            file.write(b"".join(encoded))
+
+    def entries(self) -> typing.Iterator[dict]:
+        """Yield every record of the log, counting them in records.
+
+        A torn record left by an interrupted write is cut off the log so
+        that later appends start on a clean line.
+        """
+        self.records = 0
+        good_size: int = 0
+        with suppress(FileNotFoundError):
+            with open(self.__path, "rb") as file:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+
+                    try:
+                        record: dict = json.loads(line)
+                    except ValueError:
+                        break
+
+                    if self.__track and record["op"] == "set":
+                        self.positions[record["key"]] = (good_size, len(line))
+
+                    yield record
+                    good_size += len(line)
+                    self.records += 1
+
+            if good_size < os.stat(self.__path).st_size:
+                os.truncate(self.__path, good_size)
+
+    def read(self, key: str) -> dict:
+        """Return the object of the last tracked record of key."""
+        offset, length = self.positions[key]
+        with open(self.__path, "rb") as file:
+            file.seek(offset)
+            return json.loads(file.read(length))["obj"]
+
+    def last(self, key: str, default: typing.Optional[dict]
+             ) -> typing.Optional[dict]:
+        """Return the object the log leaves key with.
+
+        Args:
+            key: the key to look up.
+            default: the object of key in the json files, if any.
+
+        Returns:
+            the object of the last record of key, None if it deletes key,
+            or default if the log has no record of key.
+        """
+        with suppress(FileNotFoundError), open(self.__path, "rb") as file:
+            for line in file:
+                if key.encode("utf-8") not in line:
+                    continue
+
+                with suppress(ValueError):
+                    record: dict = json.loads(line)
+                    if record["key"] == key:
+                        default = record.get("obj")
+
+        return default
+
+    def keys_after(self, offset: int) -> typing.Iterator[str]:
+        """Yield the keys of the records after offset bytes of the log."""
+        with suppress(FileNotFoundError), open(self.__path, "rb") as file:
+            file.seek(offset)
+            for line in file:
+                with suppress(ValueError, KeyError):
+                    yield json.loads(line)["key"]
+
+    def size(self) -> int:
+        """Return the size of the log in bytes, 0 if there is none."""
+        with suppress(FileNotFoundError):
+            return os.stat(self.__path).st_size
+
+        return 0
+
+    def retire(self) -> None:
+        """Rename the log to retired_path, or create it empty there."""
+        try:
+            os.replace(self.__path, self.retired_path)
+        except FileNotFoundError:
+            with open(self.retired_path, "wb"):
+                pass
+
+        self.positions.clear()
+
+    def recover(self, paths: typing.List[str]) -> None:
+        """Finish or drop a swap of json files interrupted by a crash.
+
+        A retired log means that the files written next to the json files
+        at paths are complete, so they are moved in place. Without it they
+        may be torn and the json files and the log are still current.
+        """
+        retired: bool = os.path.exists(self.retired_path)
+        for path in paths:
+            if not os.path.exists(path + ".tmp"):
+                continue
+
+            # Another process reloading may have got there first
+            with suppress(FileNotFoundError):
+                if retired:
+                    os.replace(path + ".tmp", path)
+                else:
+                    os.remove(path + ".tmp")
+
+        if retired:
+            with suppress(FileNotFoundError):
+                os.remove(self.retired_path)
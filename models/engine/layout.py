@@ -0,0 +1,204 @@
+#!/usr/bin/python3
+"""Module for layout.
+
+Paths and format of the json files of a FileStorage. A store is a single
+json file, or one file per class, or `shards` files per class partitioned
+by a hash of the id. The number of shards is recorded in a layout file
+next to the json file, so that a store opened with another number can be
+migrated to it.
+"""
+
+from contextlib import suppress
+import json
+import os
+import typing
+import zlib
+
+from models.engine import offset_index as offsets
+
+Shard = typing.Tuple[str, int]
+
+
+def encode(key: str, obj_dict: dict) -> str:
+    """Return the indented json fragment of a single object."""
+    # json escapes newlines inside strings so indenting is a replace
+    body: str = json.dumps(obj_dict, indent="    ")
+    return f"    {json.dumps(key)}: " + body.replace("\n", "\n    ")
+
+
+def dump(fragments: typing.List[str], file: typing.TextIO) -> None:
+    """Write fragments returned by encode to file as a json object.
+
+    The file is identical to json.dump(..., indent="    ") of the objects.
+    """
+    if fragments:
+        file.write("{\n" + ",\n".join(fragments) + "\n}")
+    else:
+        file.write("{}")
+
+
+class Layout:
+    """Paths of the json files of a store with a given number of shards."""
+
+    def __init__(self, file_path: str, shards: int,
+                 classnames: typing.Iterable[str]) -> None:
+        """Initialise the layout.
+
+        Args:
+            file_path: path of the single json file, which the paths of the
+                shards are derived from.
+            shards: number of files per class, or 0 for the single file.
+            classnames: names of the model classes.
+        """
+        self.__file_path: str = file_path
+        self.__shards: int = max(shards, 0)
+        self.__classnames: typing.Tuple[str, ...] = tuple(classnames)
+
+    @property
+    def shards(self) -> int:
+        """Number of files per class, 0 for a single json file."""
+        return self.__shards
+
+    @property
+    def layout_path(self) -> str:
+        """Path of the file recording the number of shards."""
+        return self.__file_path + ".layout"
+
+    @property
+    def migration_path(self) -> str:
+        """Path of the copy of the objects while they change shards."""
+        return self.__file_path + ".migrating"
+
+    def paths(self) -> typing.List[str]:
+        """Return the paths of every json file of the store."""
+        if not self.__shards:
+            return [self.__file_path]
+
+        return [self.shard_path((classname, index))
+                for classname in self.__classnames
+                for index in range(self.__shards)]
+
+    def path(self, key: str) -> str:
+        """Return the path of the json file holding key."""
+        if not self.__shards:
+            return self.__file_path
+
+        return self.shard_path(self.shard(key))
+
+    def shard(self, key: str) -> Shard:
+        """Return the class name and partition of the shard holding key."""
+        classname, _, obj_id = key.partition(".")
+        if self.__shards < 2:
+            return classname, 0
+
+        return classname, zlib.crc32(obj_id.encode()) % self.__shards
+
+    def shard_path(self, shard: Shard) -> str:
+        """Return the path of the json file of a shard."""
+        root, ext = os.path.splitext(self.__file_path)
+        if self.__shards < 2:
+            return f"{root}.{shard[0]}{ext}"
+
+        return f"{root}.{shard[0]}.{shard[1]}{ext}"
+
+    def saved_shards(self) -> int:
+        """Return the number of shards the files on disk are stored in.
+
+        Stores without a layout file hold a single json file if it exists,
+        and are new otherwise.
+        """
+        saved: int = (0 if os.path.exists(self.__file_path)
+                      else self.__shards)
+        if os.path.exists(self.layout_path):
+            with open(self.layout_path, "r", encoding="utf-8") as file:
+                saved = int(json.load(file)["shards"])
+
+        return saved
+
+    def check(self, load: typing.Callable[[int], typing.Dict[str, dict]],
+              obsolete: typing.Iterable[str], offset_index: bool) -> bool:
+        """Migrate the files on disk to this layout if needed.
+
+        Args:
+            load: returns the objects stored in a number of shards, as
+                dictionaries by key.
+            obsolete: paths of files the migration makes out of date, e.g.
+                the journal log already replayed by load.
+            offset_index: if True, write the offset index of the files.
+
+        Returns:
+            True if the files were migrated.
+        """
+        saved: int = self.saved_shards()
+        if saved != self.__shards or os.path.exists(self.migration_path):
+            self.__migrate(saved, load, obsolete, offset_index)
+            return True
+
+        if self.__shards and not os.path.exists(self.layout_path):
+            self.write()
+
+        return False
+
+    def write(self) -> None:
+        """Record the number of shards in the layout file."""
+        with open(self.layout_path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump({"shards": self.__shards}, file)
+
+        os.replace(self.layout_path + ".tmp", self.layout_path)
+
+    def __migrate(self, saved: int,
+                  load: typing.Callable[[int], typing.Dict[str, dict]],
+                  obsolete: typing.Iterable[str], offset_index: bool) -> None:
+        """Rewrite the objects stored in saved shards in this layout.
+
+        The objects are first copied to migration_path, and the layout file
+        updated last, so that the next check finishes a migration cut short
+        by a crash from the copy.
+        """
+        records: typing.Dict[str, dict]
+        if os.path.exists(self.migration_path):
+            with open(self.migration_path, "r", encoding="utf-8") as file:
+                records = json.load(file)
+        else:
+            records = load(saved)
+            with open(self.migration_path + ".tmp", "w",
+                      encoding="utf-8") as file:
+                dump([encode(key, obj_dict)
+                      for key, obj_dict in records.items()], file)
+
+            os.replace(self.migration_path + ".tmp", self.migration_path)
+
+        for path in obsolete:
+            with suppress(FileNotFoundError):
+                os.remove(path)
+
+        files: typing.Dict[str, typing.List[str]] = {
+            path: [] for path in self.paths()}
+        for key in records:
+            files[self.path(key)].append(key)
+
+        for path, keys in files.items():
+            if keys:
+                fragments: typing.List[str] = [
+                    encode(key, records[key]) for key in keys]
+                with open(path + ".tmp", "w", encoding="utf-8") as file:
+                    dump(fragments, file)
+
+                os.replace(path + ".tmp", path)
+                if offset_index:
+                    offsets.write(path, keys, fragments)
+
+        old: Layout = Layout(self.__file_path, saved, self.__classnames)
+        for path in {*old.paths(), *files}:
+            if not files.get(path):
+                for stale in (path, offsets.index_path(path)):
+                    with suppress(FileNotFoundError):
+                        os.remove(stale)
+
+        if self.__shards:
+            self.write()
+        else:
+            with suppress(FileNotFoundError):
+                os.remove(self.layout_path)
+
+        os.remove(self.migration_path)
@@ -0,0 +1,222 @@
+#!/usr/bin/python3
+"""Module for offset_index.
+
+Binary index files mapping the keys of a json file written by FileStorage
+to the position of their record, so that a single object can be read
+without parsing the whole file. The index of data.json is data.json.idx:
+
+    header   magic, size and mtime of the json file, key width, count
+    entries  count fixed-width (key, offset, length) entries sorted by key
+
+Keys are padded with NUL bytes to the width of the longest key. Entries are
+looked up by binary search over a memory map of the index, and an index is
+ignored if the json file changed size or mtime since it was written.
+"""
+
+import json
+import mmap
+import os
+import struct
+import typing
+
+from models.engine.parallel import FILE_START, SEPARATOR
+
+_MAGIC: bytes = b"HBNBIDX1"
+_HEADER: struct.Struct = struct.Struct("<8sQQII")
+_POSITION: struct.Struct = struct.Struct("<QI")
+# Bytes of a record read to decode its key
+_MAX_KEY: int = 4096
+
+# Key, offset and length of a record
+Entry = typing.Tuple[bytes, int, int]
+
+
+def index_path(path: str) -> str:
+    """Return the path of the index of a json file."""
+    return path + ".idx"
+
+
+def write(path: str, keys: typing.List[str],
+          fragments: typing.List[str]) -> None:
+    r"""Index the json file just written at path from its fragments.
+
+    Args:
+        path: path of the json file, written as "{\n" + ",\n".join(
+            fragments) + "\n}".
+        keys: the key of every fragment.
+        fragments: the fragments the file was written from.
+    """
+    entries: typing.List[Entry] = []
+    offset: int = 2
+    for key, fragment in zip(keys, fragments, strict=True):
+        length: int = (len(fragment) if fragment.isascii()
+                       else len(fragment.encode("utf-8")))
+        entries.append((key.encode("utf-8"), offset, length))
+        offset += length + 2
+
+    _write_entries(path, entries)
+
+
+def scan(data: typing.Union[mmap.mmap, bytes], path: str
+         ) -> typing.List[typing.Tuple[str, int, int]]:
+    """Return the records of a json file written by FileStorage.
+
+    Only the keys are decoded, the rest of the records is skipped over.
+
+    Args:
+        data: the contents of the file.
+        path: path of the file, for error messages.
+
+    Returns:
+        the key, offset and length of every record, in file order.
+
+    Raises:
+        ValueError: if the file was not written by FileStorage.
+    """
+    decoder: json.JSONDecoder = json.JSONDecoder()
+    records: typing.List[typing.Tuple[str, int, int]] = []
+    size: int = len(data)
+    if data[:len(FILE_START)] != FILE_START:
+        if data[:].strip() not in (b"", b"{}"):
+            raise ValueError(f"{path} was not written by FileStorage")
+    elif data[-2:] != b"\n}":
+        raise ValueError(f"{path} is truncated")
+    else:
+        start: int = len(b"{\n")
+        while start < size - 2:
+            end: int = data.find(SEPARATOR, start)
+            if end < 0:
+                end = size - 2
+
+            key: str = decoder.raw_decode(
+                data[start + 4:start + 4 + _MAX_KEY].decode(
+                    "utf-8", "ignore"))[0]
+            records.append((key, start, end - start))
+            start = end + len(b",\n")
+
+    return records
+
+
+def build(path: str) -> None:
+    """Index a json file written by FileStorage by scanning it.
+
+    Raises:
+        ValueError: if the file was not written by FileStorage.
+    """
+    size: int = os.stat(path).st_size
+    with open(path, "rb") as file:
+        data: typing.Union[mmap.mmap, bytes] = (
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size
+            else b"")
+        try:
+            entries: typing.List[Entry] = [
+                (key.encode("utf-8"), offset, length)
+                for key, offset, length in scan(data, path)]
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    _write_entries(path, entries)
+
+
+def _write_entries(path: str, entries: typing.List[Entry]) -> None:
+    """Write the index of the json file at path."""
+    entries.sort()
+    width: int = max((len(key) for key, _, _ in entries), default=0)
+    stat: os.stat_result = os.stat(path)
+    tmp_path: str = index_path(path) + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(_HEADER.pack(_MAGIC, stat.st_size, stat.st_mtime_ns,
+                                width, len(entries)))
+        file.write(b"".join(key.ljust(width, b"\0")
+                            + _POSITION.pack(offset, length)
+                            for key, offset, length in entries))
+
+    os.replace(tmp_path, index_path(path))
+
+
+class Reader:
+    """Open json file and index for reading many records.
+
+    Raises:
+        OSError: if the file or its index cannot be read.
+        ValueError: if the index is not valid for the file.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Map the index of the json file at path."""
+        stat: os.stat_result = os.stat(path)
+        self.__data: typing.BinaryIO = open(path, "rb")  # noqa: SIM115
+        try:
+            with open(index_path(path), "rb") as file:
+                self.__index: mmap.mmap = mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self.__data.close()
+            raise
+
+        magic, size, mtime_ns, self.__width, self.__count = (
+            _HEADER.unpack_from(self.__index)
+            if len(self.__index) >= _HEADER.size else (b"", 0, 0, 0, 0))
+        self.__entry_size: int = self.__width + _POSITION.size
+        if (magic != _MAGIC or size != stat.st_size
+                or mtime_ns != stat.st_mtime_ns
+                or len(self.__index)
+                != _HEADER.size + self.__count * self.__entry_size):
+            self.close()
+            raise ValueError(f"{index_path(path)} is out of date")
+
+    def __enter__(self) -> "Reader":
+        """Return the reader."""
+        return self
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        """Close the files."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the files."""
+        self.__index.close()
+        self.__data.close()
+
+    def fragment(self, key: str) -> typing.Optional[bytes]:
+        """Return the record of key as written in the file, if any."""
+        wanted: bytes = key.encode("utf-8")
+        if len(wanted) > self.__width:
+            return None
+
+        wanted = wanted.ljust(self.__width, b"\0")
+        low: int = 0
+        high: int = self.__count
+        while low < high:
+            middle: int = (low + high) // 2
+            start: int = _HEADER.size + middle * self.__entry_size
+            found: bytes = self.__index[start:start + self.__width]
+            if found < wanted:
+                low = middle + 1
+            elif found > wanted:
+                high = middle
+            else:
+                offset, length = _POSITION.unpack_from(
+                    self.__index, start + self.__width)
+                self.__data.seek(offset)
+                return self.__data.read(length)
+
+        return None
+
+
+def lookup(path: str, key: str) -> typing.Optional[bytes]:
+    """Return the json of the record of key in the file at path.
+
+    Returns:
+        the record as a one-key json object, or None if the file holds no
+        record for key.
+
+    Raises:
+        OSError: if the file or its index cannot be read.
+        ValueError: if the index is not valid for the file.
+    """
+    with Reader(path) as reader:
+        fragment: typing.Optional[bytes] = reader.fragment(key)
+
+    return None if fragment is None else b"{" + fragment + b"}"
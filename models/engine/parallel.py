@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+r"""Module for parallel.
+
+Parsing of json files written by FileStorage in worker processes. The
+files are split into byte ranges at record boundaries: FileStorage writes
+one top-level key per line, indented by four spaces, and json escapes
+newlines inside strings, so every ',\n    "' in a file separates two
+records. Each range is parsed on its own and the parsed dictionaries are
+sent back in file order, or what a prepare function makes of them. The
+pool is forked, so the function is inherited by the workers rather than
+pickled.
+"""
+
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import typing
+
+# Bytes between two records of a file written by FileStorage
+SEPARATOR: bytes = b',\n    "'
+# Start of a file written by FileStorage holding at least one record
+FILE_START: bytes = b'{\n    "'
+# Bytes read at a time while looking for a record boundary
+_WINDOW: int = 1 << 16
+
+Chunk = typing.Tuple[str, int, int]
+Prepare = typing.Callable[[typing.Dict[str, dict]], typing.Any]
+
+# Prepare function of the worker processes, set by _set_prepare
+_prepare: typing.Optional[Prepare] = None
+
+
+def split(path: str, size: int, chunk_bytes: int) -> typing.List[Chunk]:
+    """Return the byte ranges of a file holding whole records.
+
+    Args:
+        path: path of the json file.
+        size: size of the file in bytes.
+        chunk_bytes: approximate size of every range.
+
+    Returns:
+        (path, start, end) tuples covering the file. A file that was not
+        written by FileStorage is returned as a single range.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(FILE_START)) != FILE_START:
+            return [(path, 0, size)]
+
+        chunks: typing.List[Chunk] = []
+        start: int = 0
+        while start + chunk_bytes < size:
+            boundary: int = _find_separator(file, start + chunk_bytes)
+            if boundary < 0:
+                break
+
+            chunks.append((path, start, boundary))
+            start = boundary + 1
+
+        chunks.append((path, start, size))
+        return chunks
+
+
+def _find_separator(file: typing.BinaryIO, offset: int) -> int:
+    """Return the position of the first record separator after offset."""
+    file.seek(offset)
+    tail: bytes = b""
+    while True:
+        window: bytes = file.read(_WINDOW)
+        if not window:
+            return -1
+
+        found: int = (tail + window).find(SEPARATOR)
+        if found >= 0:
+            return offset - len(tail) + found
+
+        offset += len(window)
+        tail = window[-len(SEPARATOR) + 1:]
+
+
+def parse(chunk: Chunk, prepare: typing.Optional[Prepare] = None
+          ) -> typing.Any:
+    """Parse the records of a byte range returned by split.
+
+    Args:
+        chunk: the byte range to parse.
+        prepare: if given, called on the parsed records, and its result
+            returned in their place.
+    """
+    path, start, end = chunk
+    with open(path, "rb") as file:
+        file.seek(start)
+        data: bytes = file.read(end - start)
+
+    size: int = os.stat(path).st_size
+    if start > 0:
+        data = b"{" + data
+
+    if end < size:
+        data += b"}"
+
+    records: typing.Dict[str, dict] = json.loads(data)
+    if prepare is None:
+        return records
+
+    return prepare(records)
+
+
+def _set_prepare(prepare: typing.Optional[Prepare]) -> None:
+    """Install the prepare function of a worker process."""
+    global _prepare
+    _prepare = prepare
+
+
+def _parse_prepared(chunk: Chunk) -> typing.Any:
+    """Parse a byte range in a worker process."""
+    return parse(chunk, _prepare)
+
+
+def parse_files(paths: typing.List[str], workers: int, min_chunk_bytes: int,
+                prepare: typing.Optional[Prepare] = None
+                ) -> typing.Iterator[typing.Any]:
+    """Parse json files written by FileStorage with a pool of processes.
+
+    Files are split into about one range per worker, but no smaller than
+    min_chunk_bytes. Stores too small to be split are parsed in this
+    process, as are all stores where processes cannot be forked: started
+    any other way, workers would import models and reload the store.
+
+    Args:
+        paths: paths of the files to parse. Missing files are skipped.
+        workers: maximum number of processes to use.
+        min_chunk_bytes: minimum size of the range given to a process.
+        prepare: if given, called on the records of every range, in the
+            worker processes if any, see parse.
+
+    Yields:
+        the records parsed from every range, in file order, as soon as
+        they are ready, so that the caller can use the first ranges while
+        the next ones are still being parsed.
+    """
+    sizes: typing.Dict[str, int] = {}
+    for path in paths:
+        try:
+            sizes[path] = os.stat(path).st_size
+        except FileNotFoundError:
+            continue
+
+    chunk_bytes: int = max(sum(sizes.values()) // max(workers, 1),
+                           min_chunk_bytes)
+    chunks: typing.List[Chunk] = [
+        chunk for path, size in sizes.items() if size > 0
+        for chunk in split(path, size, chunk_bytes)]
+    if (len(chunks) < 2 or workers < 2
+            or "fork" not in multiprocessing.get_all_start_methods()):
+        for chunk in chunks:
+            yield parse(chunk, prepare)
+
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)),
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_set_prepare, initargs=(prepare,)) as pool:
+        yield from pool.map(_parse_prepared, chunks)
@@ -0,0 +1,215 @@
+#!/usr/bin/python3
+"""Module for query.
+
+Conditions on the attributes of stored objects, written as
+<attribute><operator><value>, e.g. "price_by_night<100" or
+"city_id=0ad1a6d2-a47b-4728-8746-02854b9916d4", and the plans the storage
+engines choose to run them. The operators are =, !=, <, <=, > and >=.
+
+Values are compared with the attribute of every object as numbers when
+the attribute is a number, as dates when it is a datetime and as strings
+otherwise. Objects without the attribute never match.
+
+Results may be ordered by an attribute, written "price_by_night" for
+ascending and "-price_by_night" for descending order. In ascending order
+numbers come before other values and objects without the attribute come
+last.
+"""
+
+from datetime import datetime
+import heapq
+import operator
+import re
+import typing
+
+OPERATORS: typing.Dict[str, typing.Callable[[typing.Any, typing.Any],
+                                            bool]] = {
+    "=": operator.eq, "!=": operator.ne, "<": operator.lt,
+    "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+_CONDITION: typing.Pattern[str] = re.compile(
+    r"([A-Za-z_]\w*)(!=|<=|>=|=|<|>)(.*)", re.DOTALL)
+
+
+class Condition(typing.NamedTuple):
+    """Comparison of an attribute with a value."""
+
+    field: str
+    op: str
+    value: str
+
+    def __str__(self) -> str:
+        """Return the condition as written."""
+        return f"{self.field}{self.op}{self.value}"
+
+    def matches(self, obj: typing.Any) -> bool:
+        """Return True if the attribute of obj satisfies the condition."""
+        try:
+            actual: typing.Any = getattr(obj, self.field)
+            expected: typing.Any = self.value
+            if isinstance(actual, (int, float)) and not isinstance(actual,
+                                                                   bool):
+                expected = float(self.value)
+            elif isinstance(actual, datetime):
+                expected = datetime.fromisoformat(self.value)
+            elif not isinstance(actual, str):
+                actual = str(actual)
+
+            return OPERATORS[self.op](actual, expected)
+        except (AttributeError, TypeError, ValueError):
+            return False
+
+
+class Plan(typing.NamedTuple):
+    """Way a storage engine runs a query.
+
+    Attributes:
+        access: how the candidate objects are found, e.g. "class index
+            Place" or "scan".
+        filters: the conditions checked on every candidate.
+        candidates: the number of candidates the access path yields, or
+            at most yields for ordered scans stopping at a limit.
+        order: how the objects are ordered, if requested, e.g.
+            "price_by_night (index)" when the access path yields them in
+            order or "-price_by_night (sort)" when they are sorted.
+    """
+
+    access: str
+    filters: typing.List[Condition]
+    candidates: int
+    order: str = ""
+
+    def __str__(self) -> str:
+        """Return the plan as printed by the console's explain."""
+        lines: typing.List[str] = [f"access: {self.access}",
+                                   f"candidates: {self.candidates}"]
+        lines.extend(f"filter: {condition}" for condition in self.filters)
+        if self.order:
+            lines.append(f"order: {self.order}")
+
+        return "\n".join(lines)
+
+
+class Range(typing.NamedTuple):
+    """Interval of numbers, unbounded on the sides without a bound."""
+
+    low: typing.Optional[float] = None
+    high: typing.Optional[float] = None
+    low_inclusive: bool = True
+    high_inclusive: bool = True
+
+
+def parse(text: str) -> Condition:
+    """Return the condition written as <attribute><operator><value>.
+
+    Raises:
+        ValueError: if text is not a condition.
+    """
+    match: typing.Optional[typing.Match[str]] = _CONDITION.fullmatch(text)
+    if match is None:
+        raise ValueError(f"invalid condition {text!r}")
+
+    return Condition(*match.groups())
+
+
+def conditions_of(conditions: typing.Iterable[typing.Union[str, Condition]]
+                  ) -> typing.List[Condition]:
+    """Return conditions with the ones written as strings parsed.
+
+    Raises:
+        ValueError: if a string is not a condition.
+    """
+    return [condition if isinstance(condition, Condition)
+            else parse(condition) for condition in conditions]
+
+
+def matches_all(obj: typing.Any, conditions: typing.List[Condition]) -> bool:
+    """Return True if obj satisfies every condition."""
+    return all(condition.matches(obj) for condition in conditions)
+
+
+def range_of(conditions: typing.List[Condition], field: str
+             ) -> typing.Tuple[Range, typing.List[Condition]]:
+    """Return the numbers the conditions on field allow.
+
+    Only conditions comparing field with a number using =, <, <=, > or >=
+    narrow the range.
+
+    Returns:
+        the range and the conditions it stands for.
+    """
+    low: typing.Optional[float] = None
+    high: typing.Optional[float] = None
+    low_inclusive: bool = True
+    high_inclusive: bool = True
+    used: typing.List[Condition] = []
+    for condition in conditions:
+        if condition.field != field or condition.op == "!=":
+            continue
+
+        try:
+            value: float = float(condition.value)
+        except ValueError:
+            continue
+
+        used.append(condition)
+        if condition.op in ("=", ">", ">=") and (
+                low is None or value > low
+                or value == low and condition.op == ">"):
+            low, low_inclusive = value, condition.op != ">"
+
+        if condition.op in ("=", "<", "<=") and (
+                high is None or value < high
+                or value == high and condition.op == "<"):
+            high, high_inclusive = value, condition.op != "<"
+
+    return Range(low, high, low_inclusive, high_inclusive), used
+
+
+def order_key(value: typing.Any) -> typing.Tuple[int, typing.Any]:
+    """Return the sort key of the value of an attribute ordered by."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return 0, value
+
+    if value is None:
+        return 2, ""
+
+    return 1, str(value)
+
+
+def sort_key(order_by: str
+             ) -> typing.Callable[[typing.Any], typing.Tuple[typing.Any, ...]]:
+    """Return the sort key of objects ordered by an attribute.
+
+    Ties are broken by id, and the "-" of descending order is ignored.
+    """
+    field: str = order_by.lstrip("-")
+
+    def key(obj: typing.Any) -> typing.Tuple[typing.Any, ...]:
+        return order_key(getattr(obj, field, None)), getattr(obj, "id", "")
+
+    return key
+
+
+def ordered(objects: typing.Iterable[typing.Any], order_by: str,
+            limit: typing.Optional[int] = None) -> typing.List[typing.Any]:
+    """Return objects sorted by an attribute, ties broken by id.
+
+    Args:
+        objects: the objects to sort.
+        order_by: name of the attribute, prefixed with "-" for descending
+            order.
+        limit: optional number of first objects to keep.
+    """
+    key: typing.Callable[[typing.Any], typing.Tuple[typing.Any, ...]] = \
+        sort_key(order_by)
+    if not order_by.startswith("-"):
+        if limit is None:
+            return sorted(objects, key=key)
+
+        return heapq.nsmallest(limit, objects, key=key)
+
+    if limit is None:
+        return sorted(objects, key=key, reverse=True)
+
+    return heapq.nlargest(limit, objects, key=key)
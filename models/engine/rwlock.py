@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+"""Module for rwlock."""
+
+from contextlib import contextmanager
+import threading
+import typing
+
+
+class ReadWriteLock:
+    """Lock letting many threads read at once or a single thread write.
+
+    Waiting writers go before threads that are not reading yet, so that a
+    steady stream of readers cannot starve them. Both sides are reentrant
+    and the writing thread may also read, but a reading thread cannot
+    upgrade to writing: two readers waiting for each other to finish
+    would never wake up.
+    """
+
+    def __init__(self) -> None:
+        """Initialise an unlocked lock."""
+        self.__condition: threading.Condition = threading.Condition(
+            threading.Lock())
+        self.__readers: typing.Dict[int, int] = {}
+        self.__writer: typing.Optional[int] = None
+        self.__writer_depth: int = 0
+        self.__waiting_writers: int = 0
+
+    @contextmanager
+    def reading(self) -> typing.Iterator[None]:
+        """Hold the lock for reading for the duration of a block."""
+        me: int = threading.get_ident()
+        with self.__condition:
+            if self.__writer != me and me not in self.__readers:
+                while self.__writer is not None or self.__waiting_writers:
+                    self.__condition.wait()
+
+            self.__readers[me] = self.__readers.get(me, 0) + 1
+
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__readers[me] -= 1
+                if not self.__readers[me]:
+                    del self.__readers[me]
+                    if not self.__readers:
+                        self.__condition.notify_all()
+
+    @contextmanager
+    def writing(self) -> typing.Iterator[None]:
+        """Hold the lock for writing for the duration of a block.
+
+        Raises:
+            RuntimeError: if the calling thread holds the lock for reading
+                only.
+        """
+        me: int = threading.get_ident()
+        with self.__condition:
+            if self.__writer != me:
+                if me in self.__readers:
+                    raise RuntimeError("a read lock cannot be upgraded")
+
+                self.__waiting_writers += 1
+                try:
+                    while self.__writer is not None or self.__readers:
+                        self.__condition.wait()
+                finally:
+                    self.__waiting_writers -= 1
+
+                self.__writer = me
+
+            self.__writer_depth += 1
+
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__writer_depth -= 1
+                if not self.__writer_depth:
+                    self.__writer = None
+                    self.__condition.notify_all()
@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""Module for text_file.
+
+The full-text index of a FileStorage saved next to its json files. The
+file records the size and modification time of the json files and the
+size of the journal log it matches: it is out of date once the json files
+are rewritten, while log records appended later are replayed on reading.
+"""
+
+from contextlib import suppress
+import json
+import os
+import typing
+
+from models.engine.indexes import TextIndex
+from models.engine.journal import Journal
+
+Fingerprint = typing.Tuple[typing.Dict[str, typing.List[int]], int]
+
+
+def fingerprint(paths: typing.List[str], log: Journal) -> Fingerprint:
+    """Return the size and mtime of the json files and the log size."""
+    files: typing.Dict[str, typing.List[int]] = {}
+    for path in paths:
+        with suppress(FileNotFoundError):
+            stat: os.stat_result = os.stat(path)
+            files[os.path.basename(path)] = [stat.st_size, stat.st_mtime_ns]
+
+    return files, log.size()
+
+
+def write(path: str, documents: str, paths: typing.List[str],
+          log: Journal) -> None:
+    """Save an index for the json files at paths and their log.
+
+    Args:
+        path: path of the saved index.
+        documents: the json of TextIndex.to_dict() of the index.
+        paths: paths of the json files of the store.
+        log: the journal log of the store.
+    """
+    files, log_size = fingerprint(paths, log)
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        file.write(f'{{"files": {json.dumps(files)}, "log": {log_size}, '
+                   f'"documents": {documents}}}')
+
+    os.replace(path + ".tmp", path)
+
+
+def read(path: str, paths: typing.List[str], log: Journal
+         ) -> typing.Optional[typing.Tuple[TextIndex, typing.List[str]]]:
+    """Return the saved index if it matches the json files and their log.
+
+    Returns:
+        the index and the keys logged after it was saved, None if there is
+        no index matching the files.
+    """
+    try:
+        with open(path, encoding="utf-8") as file:
+            saved: dict = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    files, log_size = fingerprint(paths, log)
+    if saved.get("files") != files or saved.get("log", 0) > log_size:
+        return None
+
+    return (TextIndex.from_dict(saved["documents"]),
+            list(log.keys_after(saved.get("log", 0))))
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+"""Module for undo."""
+
+import typing
+
+from models.base_model import BaseModel
+from models.compact import attributes, restore
+
+
+class UndoLog:
+    """Record of the state stored objects had before a batch changed them.
+
+    Only the first change of every key is recorded, so undoing restores
+    the state from when the batch started. The log of a nested batch
+    records changes in the log of its enclosing batch as well.
+    """
+
+    def __init__(self, parent: typing.Optional["UndoLog"] = None) -> None:
+        """Initialise an empty log.
+
+        Args:
+            parent: optional log of the enclosing batch.
+        """
+        self.__entries: typing.Dict[
+            str, typing.Optional[typing.Tuple[BaseModel, dict]]] = {}
+        self.__parent: typing.Optional[UndoLog] = parent
+        self.save_requested: bool = False
+
+    def created(self, key: str) -> None:
+        """Record that key did not exist before the batch."""
+        self.__entries.setdefault(key, None)
+        if self.__parent is not None:
+            self.__parent.created(key)
+
+    def changed(self, key: str, obj: BaseModel) -> None:
+        """Record the state of obj before it is changed or deleted."""
+        if key not in self.__entries:
+            self.__entries[key] = (obj, attributes(obj))
+
+        if self.__parent is not None:
+            self.__parent.changed(key, obj)
+
+    def undo(self, insert: typing.Callable[[str, BaseModel], None],
+             remove: typing.Callable[[str], None]) -> None:
+        """Restore every recorded object.
+
+        Args:
+            insert: callback storing an object back under its key.
+            remove: callback dropping the object stored under a key, if any.
+        """
+        for key, entry in self.__entries.items():
+            if entry is None:
+                remove(key)
+                continue
+
+            obj, state = entry
+            restore(obj, state)
+            insert(key, obj)
+
+        self.__entries.clear()
@@ -1,8 +1,253 @@
 #!/usr/bin/python3
 """Module for test_console."""
 
+import io
+import json
+import os
+import tempfile
 import unittest
+from unittest import mock
+
+from console import HBNBCommand, main
+from models.engine.file_storage import FileStorage
+from models.engine.indexes import TextIndex
+from models.place import Place
 
 
 class TestConsole(unittest.TestCase):
     """Tests for Console."""
+
+    def setUp(self) -> None:
+        """Install a storage in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.storage: FileStorage = FileStorage(
+            file_path=os.path.join(self.tmp_dir.name, "objects.json"))
+        self.patcher = mock.patch("models.storage", new=self.storage)
+        self.patcher.start()
+
+    def tearDown(self) -> None:
+        """Uninstall the storage and delete its files."""
+        self.patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def run_command(self, line: str) -> str:
+        """Run a console command and return what it printed."""
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as output:
+            HBNBCommand().onecmd(line)
+
+        return output.getvalue()
+
+    def test_allClass(self) -> None:  # noqa: N802
+        """Test that all only lists instances of the given class."""
+        place_id: str = self.run_command("create Place").strip()
+        self.run_command("create User")
+        output: str = self.run_command("all Place")
+        self.assertIn(place_id, output)
+        self.assertNotIn("[User]", output)
+        self.assertEqual(self.run_command("all Foo"),
+                         "** class doesn't exist **\n")
+
+    def test_destroy(self) -> None:
+        """Test that destroy removes the instance."""
+        user_id: str = self.run_command("create User").strip()
+        self.assertEqual(self.run_command(f"destroy User {user_id}"), "")
+        self.assertEqual(self.run_command(f"show User {user_id}"),
+                         "** no instance found **\n")
+
+    def test_allPages(self) -> None:  # noqa: N802
+        """Test that all prints the same list as before, page by page."""
+        for _ in range(5):
+            self.run_command("create City")
+
+        cities: list = [str(obj) for obj in self.storage.all("City").values()]
+        self.assertEqual(self.run_command("all City"), f"{cities}\n")
+        self.assertEqual(self.run_command("all City limit=2 offset=1"),
+                         f"{cities[1:3]}\n")
+        self.assertEqual(self.run_command("all offset=4"), f"{cities[4:]}\n")
+        self.assertEqual(self.run_command("all City limit=0"), "[]\n")
+        self.assertEqual(self.run_command("all City limit=-1"),
+                         "** invalid argument limit=-1 **\n")
+
+    def test_nearby(self) -> None:
+        """Test that nearby prints the places in a circle, nearest first."""
+        ids: list = [self.run_command("create Place").strip()
+                     for _ in range(3)]
+        for place_id, (latitude, longitude) in zip(ids, (
+                ("40.72", "-74.0"), ("40.7128", "-74.006"), ("51.5", "0")),
+                strict=True):
+            self.run_command(f"update Place {place_id} latitude {latitude}")
+            self.run_command(f"update Place {place_id} longitude {longitude}")
+
+        places: list = [str(self.storage.get("Place", place_id))
+                        for place_id in ids]
+        self.assertEqual(self.run_command("nearby 40.7128 -74.006 5"),
+                         f"{[places[1], places[0]]}\n")
+        self.assertEqual(self.run_command("nearby 40.7128 -74.006 5 limit=1"),
+                         f"{places[1:2]}\n")
+        self.assertEqual(self.run_command("nearby 40.7128 -74.006"),
+                         "** radius missing **\n")
+        self.assertEqual(self.run_command("nearby"),
+                         "** latitude missing **\n")
+        self.assertEqual(self.run_command("nearby 40.7 north 5"),
+                         "** invalid argument north **\n")
+
+    def test_search(self) -> None:
+        """Test that search prints the matching instances, best first."""
+        ids: list = [self.run_command("create Review").strip()
+                     for _ in range(3)]
+        for review_id, text in zip(ids, ("dirty", "clean", "dirty"),
+                                   strict=True):
+            self.run_command(f"update Review {review_id} text {text}")
+
+        self.storage.get("Review", ids[2]).text = "very dirty"
+
+        reviews: list = [str(self.storage.get("Review", review_id))
+                         for review_id in ids]
+        self.assertEqual(self.run_command("search Review Dirty"),
+                         f"{[reviews[0], reviews[2]]}\n")
+        self.assertEqual(self.run_command("search dirty limit=1"),
+                         f"{reviews[:1]}\n")
+        self.assertEqual(self.run_command("search very dirty"),
+                         f"{reviews[2:]}\n")
+        self.assertEqual(self.run_command("search Place dirty"), "[]\n")
+        self.assertEqual(self.run_command("search Review"),
+                         "** search text missing **\n")
+        self.assertEqual(self.run_command("search dirty limit=x"),
+                         "** invalid argument limit=x **\n")
+
+    def test_allFilter(self) -> None:  # noqa: N802
+        """Test that all only prints the instances matching conditions."""
+        city_id: str = self.run_command("create City").strip()
+        for price in (50, 150, 70):
+            place_id: str = self.run_command("create Place").strip()
+            self.run_command(f"update Place {place_id} price_by_night {price}")
+            self.run_command(f"update Place {place_id} city_id {city_id}")
+
+        places: list = [str(obj) for obj in self.storage.all("Place").values()
+                        if obj.price_by_night < 100]
+        self.assertEqual(self.run_command(
+            f"all Place price_by_night<100 city_id={city_id} limit=5"),
+            f"{places}\n")
+        self.assertEqual(self.run_command("all price_by_night<60 offset=1"),
+                         "[]\n")
+        self.assertEqual(self.run_command(
+            f"all Place city_id={city_id} explain"),
+            "access: foreign key index Place.city_id\ncandidates: 3\n")
+        self.assertEqual(self.run_command(
+            "all Place order_by=-price_by_night limit=1 offset=1"),
+            f"{places[1:]}\n")
+        self.assertEqual(self.run_command(
+            "all Place order_by=price_by_night limit=2 explain"),
+            "access: range index Place.price_by_night\ncandidates: 2\n"
+            "order: price_by_night (index)\n")
+        self.assertEqual(self.run_command("all order_by=2x"),
+                         "** invalid argument order_by=2x **\n")
+        self.assertEqual(self.run_command("all Place price_by_night"),
+                         "** invalid argument price_by_night **\n")
+        self.assertEqual(self.run_command("all Place name='x"),
+                         "** invalid argument Place name='x **\n")
+
+    def test_exportImport(self) -> None:  # noqa: N802
+        """Test that import restores what export wrote, saving once."""
+        ids: list = [self.run_command(f"create {classname}").strip()
+                     for classname in ("Place", "Place", "User")]
+        self.run_command(f"update Place {ids[0]} name Loft")
+        path: str = os.path.join(self.tmp_dir.name, "places.ndjson")
+        self.assertEqual(self.run_command(f"export {path} Place"), "2\n")
+        with open(path, encoding="utf-8") as file:
+            self.assertEqual([json.loads(line)["id"] for line in file],
+                             ids[:2])
+
+        self.storage.delete(self.storage.get("Place", ids[0]))
+        self.storage.get("Place", ids[1]).name = "Room"
+        with mock.patch.object(self.storage, "flush", autospec=True,
+                               side_effect=self.storage.flush) as flush:
+            self.assertEqual(self.run_command(f"import {path}"), "2\n")
+
+        flush.assert_called_once_with()
+        self.assertEqual(self.storage.get("Place", ids[0]).name, "Loft")
+        self.assertEqual(self.storage.get("Place", ids[1]).name, "")
+        self.assertEqual(self.storage.count(), 3)
+
+    def test_importInvalid(self) -> None:  # noqa: N802
+        """Test that a file with an invalid record imports nothing."""
+        path: str = os.path.join(self.tmp_dir.name, "objects.ndjson")
+        self.run_command("create City")
+        self.run_command(f"export {path}")
+        with open(path, encoding="utf-8") as file:
+            city: str = file.read()
+
+        for record in ('{"__class__": "Foo", "id": "1"}', "{", "[]",
+                       '{"__class__": "City", "id": ""}'):
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(f"{city}\n{record}\n")
+
+            self.storage.all().clear()
+            self.assertEqual(self.run_command(f"import {path}"),
+                             "** invalid record at line 3 **\n")
+            self.assertEqual(self.storage.count(), 0)
+
+        self.assertEqual(self.run_command("import"),
+                         "** file name missing **\n")
+        self.assertEqual(self.run_command(f"import {path}.none"),
+                         f"** can't read file {path}.none **\n")
+        self.assertEqual(self.run_command(f"export {path} Foo"),
+                         "** class doesn't exist **\n")
+
+    def test_batch(self) -> None:
+        """Test that a batch script saves once per commit."""
+        script: list = ["create City", "# a comment", "", "create User",
+                        "commit", "create Place", "quit", "create State"]
+        with mock.patch.object(self.storage, "flush", autospec=True,
+                               side_effect=self.storage.flush) as flush, \
+                mock.patch("sys.stdout", new_callable=io.StringIO) as output:
+            HBNBCommand().run_batch(script)
+
+        self.assertEqual(flush.call_count, 2)
+        self.assertEqual(len(output.getvalue().split()), 3)
+        self.storage.all().clear()
+        self.storage.reload()
+        self.assertEqual(sorted(key.partition(".")[0]
+                                for key in self.storage.all()),
+                         ["City", "Place", "User"])
+
+    def test_batchMain(self) -> None:  # noqa: N802
+        """Test running a script file from the command line with timings."""
+        path: str = os.path.join(self.tmp_dir.name, "script.hbnb")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("create City\nall City\n")
+
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as output, \
+                mock.patch("sys.stderr", new_callable=io.StringIO) as errors:
+            main(["--batch", path, "--timings"])
+
+        city_id: str = output.getvalue().split()[0]
+        self.assertIn(f"({city_id})", output.getvalue())
+        self.assertEqual([line.split("ms")[1].strip()
+                          for line in errors.getvalue().splitlines()],
+                         ["create City", "all City", "commit"])
+        with mock.patch("sys.stderr", new_callable=io.StringIO), \
+                self.assertRaises(SystemExit):
+            main(["--batch", f"{path}.none"])
+
+    def test_mainClose(self) -> None:  # noqa: N802
+        """Test that the full-text index is saved when the console exits."""
+        place: Place = Place()
+        place.name = "Loft"  # type: ignore
+        place.save()
+        path: str = os.path.join(self.tmp_dir.name, "script.hbnb")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("search Place loft\n")
+
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as output:
+            main(["--batch", path])
+
+        self.assertIn(place.id, output.getvalue())
+        self.assertTrue(os.path.exists(self.storage.text_path))
+        storage: FileStorage = FileStorage(
+            os.path.join(self.tmp_dir.name, "objects.json"))
+        storage.reload()
+        with mock.patch.object(TextIndex, "add", autospec=True) as add:
+            self.assertEqual(storage.search("loft"), [storage.get(
+                Place, place.id)])
+            add.assert_not_called()
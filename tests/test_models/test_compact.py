@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+"""Module for test_compact."""
+
+import typing
+import unittest
+
+import models
+from models.compact import attributes, compact_class, restore
+from models.place import Place
+from models.user import User
+
+
+class TestCompact(unittest.TestCase):
+    """Tests for the compact model classes."""
+
+    def setUp(self) -> None:
+        """Create a place and its compact copy."""
+        self.place_dict: typing.Dict[str, typing.Any] = {
+            "id": "c4663bbb-0918-4c0a-9f28-1aba33ce53ff",
+            "created_at": "2024-04-20T22:55:15.088887",
+            "updated_at": "2024-04-21T12:46:27.944296",
+            "amenity_ids": ["60af1e59-4fde-4b8c-89e8-bd4bd4e4ee8e"],
+            "city_id": "0ad1a6d2-a47b-4728-8746-02854b9916d4",
+            "name": "Boshvle",
+            "price_by_night": 170,
+            "__class__": "Place"
+        }
+        self.place: Place = Place(**self.place_dict)
+        self.compact: Place = compact_class(Place)(**self.place_dict)
+
+    def tearDown(self) -> None:
+        """Delete created instances."""
+        models.storage._FileStorage__objects.clear()  # type: ignore
+
+    def test_class(self) -> None:
+        """Test that the compact class stands in for the model class."""
+        self.assertIsInstance(self.compact, Place)
+        self.assertEqual(type(self.compact).__name__, "Place")
+        self.assertIs(compact_class(Place), type(self.compact))
+        self.assertIn("price_by_night", type(self.compact).__slots__)
+        self.assertFalse(hasattr(self.compact, "__dict__"))
+
+    def test_sameBehaviour(self) -> None:  # noqa: N802
+        """Test that to_dict, __str__ and defaults match the model class."""
+        self.assertEqual(self.compact.to_dict(), self.place.to_dict())
+        self.assertEqual(self.compact.to_dict(), self.place_dict)
+        self.assertEqual(attributes(self.compact), self.place.__dict__)
+        self.assertTrue(str(self.compact).startswith(
+            f"[Place] ({self.place.id}) {{'id': "))
+        self.assertEqual(self.compact.max_guest, 0)
+        self.assertEqual(self.compact.latitude, 0.0)
+        with self.assertRaises(AttributeError):
+            print(self.compact.unknown)  # type: ignore
+
+    def test_setattr(self) -> None:
+        """Test declared and undeclared attributes."""
+        self.compact.max_guest = 4  # type: ignore
+        self.compact.rating = "great"  # type: ignore
+        self.assertEqual(self.compact.max_guest, 4)
+        self.assertEqual(self.compact.rating, "great")  # type: ignore
+        self.assertEqual(attributes(self.compact)["rating"], "great")
+        self.assertEqual(self.compact.to_dict()["max_guest"], 4)
+
+    def test_internedKeys(self) -> None:  # noqa: N802
+        """Test that foreign keys share one string."""
+        other: Place = compact_class(Place)(**self.place_dict)
+        self.assertIs(other.city_id, self.compact.city_id)
+
+    def test_restore(self) -> None:
+        """Test restoring a previous state of an instance."""
+        for obj in (self.compact, compact_class(User)(**self.place_dict),
+                    self.place):
+            with self.subTest(obj=type(obj)):
+                state: typing.Dict[str, typing.Any] = attributes(obj)
+                obj.name = "Nest"  # type: ignore
+                obj.rating = 5  # type: ignore
+                restore(obj, state)
+                self.assertEqual(attributes(obj), state)
+                self.assertFalse(hasattr(obj, "rating"))
+
+
+if __name__ == "__main__":
+    unittest.main()
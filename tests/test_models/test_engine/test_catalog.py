@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+"""Module for test_catalog."""
+
+import typing
+import unittest
+
+from models.engine.catalog import Catalog
+from models.engine.query import conditions_of
+
+
+class TestCatalog(unittest.TestCase):
+    """Tests for Catalog."""
+
+    def setUp(self) -> None:
+        """Index some places."""
+        self.catalog: Catalog = Catalog()
+        for index in range(10):
+            place: typing.Dict[str, typing.Any] = {
+                "city_id": "a" if index < 2 else "b",
+                "price_by_night": index * 10, "latitude": 0.0,
+                "longitude": index / 100}
+            self.catalog.add(f"Place.{index}", place.get, place.get)
+
+    def test_discard(self) -> None:
+        """Test that discarded keys leave every index."""
+        self.catalog.discard("Place.0")
+        self.assertEqual(list(self.catalog.bucket("Place"))[:1], ["Place.1"])
+        self.assertEqual(self.catalog.relation("Place", "city_id").keys("a"),
+                         ["Place.1"])
+        self.assertEqual([key for key, _ in self.catalog.within(0, 0, 20)],
+                         [f"Place.{index}" for index in range(1, 10)])
+        self.assertIsNone(self.catalog.relation("Place", "name"))
+
+    def test_plan(self) -> None:
+        """Test that the plan uses the most selective index."""
+        cases: typing.List[typing.Tuple[typing.List[str], str, int]] = [
+            ([], "class index Place", 10),
+            (["city_id=a"], "foreign key index Place.city_id", 2),
+            (["price_by_night<15"], "range index Place.price_by_night", 2),
+            (["name=x"], "class index Place", 10)]
+        for conditions, access, candidates in cases:
+            with self.subTest(conditions=conditions):
+                plan, keys, sort = self.catalog.plan(
+                    "Place", conditions_of(conditions), None, None,
+                    lambda: list(self.catalog.bucket("Place")))
+                self.assertEqual((plan.access, plan.candidates),
+                                 (access, candidates))
+                self.assertEqual(len(list(keys)), candidates)
+                self.assertFalse(sort)
+
+    def test_planOrdered(self) -> None:  # noqa: N802
+        """Test that ordering by a range field scans its index."""
+        plan, keys, sort = self.catalog.plan(
+            "Place", [], "-price_by_night", 3, list)
+        self.assertEqual(plan.order, "-price_by_night (index)")
+        self.assertEqual(list(keys)[:3], ["Place.9", "Place.8", "Place.7"])
+        self.assertFalse(sort)
@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""Module for test_deserializers."""
+
+import typing
+import unittest
+from unittest import mock
+
+from models.compact import attributes, compact_class
+from models.engine.deserializers import Deserializer
+from models.place import Place
+
+
+class TestDeserializer(unittest.TestCase):
+    """Tests for Deserializer."""
+
+    def setUp(self) -> None:
+        """Create the dictionary of a place."""
+        self.place_dict: typing.Dict[str, typing.Any] = {
+            "name": "Boshvle",
+            "id": "c4663bbb-0918-4c0a-9f28-1aba33ce53ff",
+            "created_at": "2024-04-20T22:55:15.088887",
+            "updated_at": "2024-04-21T12:46:27.944296",
+            "city_id": "0ad1a6d2-a47b-4728-8746-02854b9916d4",
+            "unknown": "dropped",
+            "__class__": "Place"
+        }
+
+    def test_sameInstance(self) -> None:  # noqa: N802
+        """Test that instances match the ones built by the class."""
+        with mock.patch("models.storage", autospec=True) as storage:
+            place: Place = Deserializer(Place)(self.place_dict)
+            storage.touch.assert_not_called()
+
+        expected: Place = Place(**self.place_dict)
+        self.assertIs(type(place), Place)
+        self.assertEqual(list(place.__dict__.items()),
+                         list(expected.__dict__.items()))
+        self.assertEqual(str(place), str(expected))
+
+    def test_special(self) -> None:
+        """Test that names that are not plain attributes use the class."""
+        deserializer: Deserializer = Deserializer(Place)
+        with mock.patch.object(Place, "__init__", new_callable=mock.Mock,
+                               return_value=None) as init:
+            deserializer(self.place_dict)
+            init.assert_not_called()
+            self.place_dict["__doc__"] = "shadowed"
+            deserializer(self.place_dict)
+            init.assert_called_once_with(**self.place_dict)
+
+    def test_compact(self) -> None:
+        """Test building instances of compact classes."""
+        cls: type = compact_class(Place)
+        place: Place = Deserializer(cls)(self.place_dict)
+        self.assertIs(type(place), cls)
+        self.assertEqual(attributes(place),
+                         attributes(cls(**self.place_dict)))
+
+    def test_missingTimestamp(self) -> None:  # noqa: N802
+        """Test that a dictionary without timestamps is rejected."""
+        del self.place_dict["created_at"]
+        with self.assertRaises(KeyError):
+            Deserializer(Place)(self.place_dict)
@@ -0,0 +1,56 @@
+#!/usr/bin/python3
+"""Module for test_file_lock."""
+
+import fcntl
+import os
+import tempfile
+import unittest
+
+from models.engine.file_lock import StoreLock
+
+
+class TestStoreLock(unittest.TestCase):
+    """Tests for StoreLock."""
+
+    def setUp(self) -> None:
+        """Create a lock in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.lock: StoreLock = StoreLock(
+            os.path.join(self.tmp_dir.name, "objects.json.lock"))
+
+    def tearDown(self) -> None:
+        """Delete the lock file."""
+        self.tmp_dir.cleanup()
+
+    def locked_out(self) -> bool:
+        """Return True if another open file cannot lock exclusively."""
+        with open(self.lock.path, "a+b") as file:
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+
+            return False
+
+    def test_generation(self) -> None:
+        """Test counting writes across holds of the lock."""
+        with self.lock.hold(exclusive=True):
+            self.assertEqual(self.lock.generation(), 0)
+            self.assertEqual(self.lock.advance(), 1)
+            self.assertEqual(self.lock.advance(), 2)
+
+        with self.lock.hold():
+            self.assertEqual(self.lock.generation(), 2)
+
+        with self.assertRaises(RuntimeError):
+            self.lock.generation()
+
+    def test_reentrant(self) -> None:
+        """Test that nested holds keep the outer lock until it exits."""
+        with self.lock.hold(exclusive=True):
+            with self.lock.hold():
+                self.assertTrue(self.locked_out())
+
+            self.assertTrue(self.locked_out())
+
+        self.assertFalse(self.locked_out())
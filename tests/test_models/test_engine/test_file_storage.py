@@ -1,7 +1,14 @@
 #!/usr/bin/python3
 """Module for test_file_storage."""
 
+import asyncio
+from contextlib import suppress
 import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
 import typing
 import unittest
 from unittest import mock
@@ -11,6 +18,8 @@ from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
 from models.engine.file_storage import FileStorage
+from models.engine.indexes import AttributeIndex, TextIndex
+from models.engine.layout import Layout
 from models.place import Place
 from models.review import Review
 from models.state import State
@@ -215,5 +224,1201 @@ class TestFileStorage(unittest.TestCase):
         }
 
 
+class StorageTestCase(unittest.TestCase):
+    """Base class of the tests of a storage in a temporary directory.
+
+    Subclasses set options to the keyword arguments of the storage the
+    tests install as models.storage, and engine and filename to run them
+    against another storage engine.
+    """
+
+    engine: typing.Callable[..., typing.Any] = FileStorage
+    filename: str = "objects.json"
+    options: typing.Dict[str, typing.Any] = {}
+
+    def setUp(self) -> None:
+        """Install a storage on a file in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path: str = os.path.join(self.tmp_dir.name, self.filename)
+        self.storage: FileStorage = self.reopened()
+        patcher = mock.patch("models.storage", new=self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def reopened(self, **kwargs) -> FileStorage:
+        """Return a storage reloaded from the same files.
+
+        Args:
+            kwargs: options overriding those of the class.
+        """
+        storage: FileStorage = self.engine(self.path,
+                                           **{**self.options, **kwargs})
+        storage.reload()
+        return storage
+
+
+class TestFileStorageJournal(StorageTestCase):
+    """Tests for FileStorage in journal mode."""
+
+    options: typing.Dict[str, typing.Any] = {
+        "journal": True, "compact_threshold": 5}
+
+    def test_saveAppends(self) -> None:  # noqa: N802
+        """Test that save appends one record per changed object."""
+        user: User = User()
+        user.save()
+        self.assertFalse(os.path.exists(self.path))
+        user.first_name = "Damian"  # type: ignore
+        user.save()
+        with open(self.storage.log_path, "r", encoding="utf-8") as file:
+            records: typing.List[dict] = [json.loads(x) for x in file]
+
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[1]["op"], "set")
+        self.assertEqual(records[1]["obj"]["first_name"], "Damian")
+
+    def test_reloadReplays(self) -> None:  # noqa: N802
+        """Test that reload replays creations, updates and deletions."""
+        user: User = User()
+        city: City = City()
+        user.save()
+        city.name = "Kaokao"  # type: ignore
+        city.save()
+        self.storage.delete(user)
+        self.storage.save()
+
+        storage: FileStorage = self.reopened()
+        self.assertNotIn("User." + user.id, storage.all())
+        self.assertEqual(storage.all()["City." + city.id].name, "Kaokao")
+
+    def test_compact(self) -> None:
+        """Test that the log is folded into the json file past threshold."""
+        places: typing.List[Place] = [Place() for _ in range(6)]
+        places[0].save()
+        self.assertTrue(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(self.storage.log_path))
+        storage: FileStorage = self.reopened()
+        self.assertEqual(len(storage.all()), 6)
+
+    def test_tornRecord(self) -> None:  # noqa: N802
+        """Test that a partially written record is dropped on reload."""
+        state: State = State()
+        state.save()
+        with open(self.storage.log_path, "a", encoding="utf-8") as file:
+            file.write('{"op": "set", "key": "State.x", "ob')
+
+        storage: FileStorage = self.reopened()
+        self.assertEqual(list(storage.all()), ["State." + state.id])
+        Amenity().save()
+        self.assertEqual(len(self.reopened().all()), 2)
+
+    def test_interruptedCompact(self) -> None:  # noqa: N802
+        """Test that a crash while compacting never replays an old log."""
+        retired: str = self.storage.retired_log_path
+        for name, crash_at, expected in (("os.replace", retired, "Old"),
+                                         ("os.replace", self.path, "New"),
+                                         ("os.remove", retired, "New")):
+            with self.subTest(name=name, crash_at=crash_at):
+                user: User = User()
+                user.first_name = "Old"  # type: ignore
+                user.save()
+                user.first_name = "New"  # type: ignore
+                real: typing.Callable[..., None] = getattr(
+                    os, name.partition(".")[2])
+
+                def crash(*paths: str, crash_at: str = crash_at,
+                          real: typing.Callable[..., None] = real) -> None:
+                    """Stop the process instead of touching crash_at."""
+                    if paths[-1] == crash_at:
+                        raise KeyboardInterrupt
+
+                    real(*paths)
+
+                with mock.patch(name, new=crash), \
+                        suppress(KeyboardInterrupt):
+                    self.storage.compact()
+
+                self.assertEqual(self.reopened().all()[
+                    "User." + user.id].first_name, expected)  # type: ignore
+                self.assertFalse(os.path.exists(self.path + ".tmp"))
+                self.assertFalse(os.path.exists(retired))
+                self.storage.reload()
+
+
+class TestFileStorageIncremental(StorageTestCase):
+    """Tests for the dirty tracking of FileStorage.save."""
+
+    def test_onlyDirtyEncoded(self) -> None:  # noqa: N802
+        """Test that save only serialises objects changed since last save."""
+        user: User = User()
+        place: Place = Place()
+        self.storage.save()
+        with mock.patch.object(User, "to_dict",
+                               autospec=True,
+                               side_effect=BaseModel.to_dict) as user_dict, \
+                mock.patch.object(Place, "to_dict",
+                                  autospec=True,
+                                  side_effect=BaseModel.to_dict) as place_dict:
+            place.name = "Boshvle"  # type: ignore
+            self.storage.save()
+            user_dict.assert_not_called()
+            place_dict.assert_called_once_with(place)
+
+        self.assertIs(user, self.storage.all()["User." + user.id])
+
+    def test_sameFormat(self) -> None:  # noqa: N802
+        """Test that the spliced output matches a plain json dump."""
+        place: Place = Place()
+        place.amenity_ids = ["pool", "balcony"]  # type: ignore
+        place.description = 'Line one\nline "two"'  # type: ignore
+        self.storage.save()
+        User().save()
+        place.max_guest = 4  # type: ignore
+        self.storage.save()
+        expected: str = json.dumps(
+            {key: obj.to_dict() for key, obj in self.storage.all().items()},
+            indent="    ")
+        with open(self.path, "r", encoding="utf-8") as file:
+            self.assertEqual(file.read(), expected)
+
+    def test_otherStorage(self) -> None:  # noqa: N802
+        """Test that changes are reported to the storage holding them."""
+        path: str = os.path.join(self.tmp_dir.name, "other.json")
+        other: FileStorage = FileStorage(path)
+        place: Place = Place()
+        other.new(place)
+        other.save()
+        place.name = "changed"  # type: ignore
+        other.save()
+        with open(path, "r", encoding="utf-8") as file:
+            self.assertEqual(json.load(file)["Place." + place.id]["name"],
+                             "changed")
+
+    def test_indexedOnLookup(self) -> None:  # noqa: N802
+        """Test that assignments leave the indexes to the next lookup."""
+        place: Place = Place()
+        with mock.patch.object(AttributeIndex, "add", autospec=True,
+                               side_effect=AttributeIndex.add) as add:
+            place.city_id = "somewhere"  # type: ignore
+            place.user_id = "someone"  # type: ignore
+            add.assert_not_called()
+            self.assertEqual(list(self.storage.related(Place, "city_id",
+                                                       "somewhere")),
+                             ["Place." + place.id])
+            self.assertEqual(add.call_count, 2)
+
+
+class TestFileStorageClassIndex(StorageTestCase):
+    """Tests for the per-class index of FileStorage."""
+
+    def test_allClass(self) -> None:  # noqa: N802
+        """Test listing the objects of a single class."""
+        place_x: type = type("PlaceX", (Place,), {})
+        places: typing.List[Place] = [Place(), Place()]
+        other: Place = place_x()
+        User()
+        self.assertEqual(list(self.storage.all(Place).values()), places)
+        self.assertEqual(list(self.storage.all("PlaceX").values()), [other])
+        self.assertEqual(self.storage.all("State"), {})
+        self.assertEqual(self.storage.count(Place), 2)
+        self.assertEqual(self.storage.count(), 4)
+
+    def test_deleteAndReload(self) -> None:  # noqa: N802
+        """Test that the index follows deletions and reloads."""
+        cities: typing.List[City] = [City(), City()]
+        self.storage.delete(cities[0])
+        self.assertEqual(list(self.storage.all(City)),
+                         ["City." + cities[1].id])
+        self.storage.save()
+        self.storage.all().clear()
+        self.assertEqual(self.storage.count("City"), 0)
+        self.storage.reload()
+        self.assertEqual(list(self.storage.all(City)),
+                         ["City." + cities[1].id])
+
+    def test_separateInstances(self) -> None:  # noqa: N802
+        """Test that storages on different files keep their own objects."""
+        City().save()
+        path: str = os.path.join(self.tmp_dir.name, "other.json")
+        other: FileStorage = FileStorage(path)
+        other.reload()
+        self.assertEqual(other.all(), {})
+        self.assertEqual(other.count(City), 0)
+        other.save()
+        with open(path, "r", encoding="utf-8") as file:
+            self.assertEqual(json.load(file), {})
+
+
+class TestFileStorageRelated(StorageTestCase):
+    """Tests for FileStorage.related."""
+
+    def test_related(self) -> None:
+        """Test the foreign key reverse indexes."""
+        city: City = City()
+        places: typing.List[Place] = [Place(), Place(), Place()]
+        for place in places[:2]:
+            place.city_id = city.id  # type: ignore
+
+        review: Review = Review()
+        review.place_id = places[0].id  # type: ignore
+        self.assertEqual(list(self.storage.related(Place, "city_id", city.id)
+                              .values()), places[:2])
+        self.assertEqual(list(self.storage.related(
+            "Review", "place_id", places[0].id).values()), [review])
+
+        places[0].city_id = "elsewhere"  # type: ignore
+        self.storage.delete(places[1])
+        self.assertEqual(self.storage.related(Place, "city_id", city.id), {})
+        self.storage.save()
+        self.storage.all().clear()
+        self.storage.reload()
+        self.assertEqual(list(self.storage.related(Place, "city_id",
+                                                   "elsewhere")),
+                         ["Place." + places[0].id])
+
+    def test_relatedUnindexed(self) -> None:  # noqa: N802
+        """Test that other attributes fall back to a scan of the class."""
+        state: State = State()
+        state.name = "Babon"  # type: ignore
+        self.assertEqual(list(self.storage.related(State, "name", "Babon")
+                              .values()), [state])
+
+
+class TestFileStorageQuery(StorageTestCase):
+    """Tests for FileStorage.query and FileStorage.explain."""
+
+    def test_query(self) -> None:
+        """Test that queries use the foreign key index when they can."""
+        city: City = City()
+        places: typing.List[Place] = [Place(), Place(), Place()]
+        for price, place in zip((50, 150, 70), places, strict=True):
+            place.price_by_night = price  # type: ignore
+            place.city_id = city.id  # type: ignore
+
+        Place().price_by_night = 10  # type: ignore
+        self.storage.save()
+        conditions: typing.List[str] = ["price_by_night<100",
+                                        f"city_id={city.id}"]
+        self.assertEqual(list(self.storage.query(Place, conditions)),
+                         [places[0], places[2]])
+        self.assertEqual(str(self.storage.explain(Place, conditions)),
+                         "access: foreign key index Place.city_id\n"
+                         "candidates: 3\nfilter: price_by_night<100")
+        self.assertEqual(len(list(self.storage.query(
+            Place, ["price_by_night<100"]))), 3)
+        self.assertEqual(self.storage.explain("Place", ["name=x"]).access,
+                         "class index Place")
+        self.assertEqual(self.storage.explain(None, conditions).candidates,
+                         5)
+        self.assertEqual(list(self.storage.query(None, conditions)),
+                         [places[0], places[2]])
+        with self.assertRaises(ValueError):
+            self.storage.query(Place, ["price_by_night"])
+
+
+class TestFileStorageNearby(StorageTestCase):
+    """Tests for FileStorage.nearby."""
+
+    def test_nearby(self) -> None:
+        """Test that the grid index follows the places and reloads."""
+        places: typing.List[Place] = [Place(), Place(), Place()]
+        for place, (latitude, longitude) in zip(places, (
+                (40.7128, -74.0060), (40.7306, -73.9352), (51.5, -0.13)),
+                strict=True):
+            place.latitude = latitude  # type: ignore
+            place.longitude = longitude  # type: ignore
+
+        found: list = self.storage.nearby(40.7128, -74.0060, 10)
+        self.assertEqual([place for place, _ in found], places[:2])
+        self.assertAlmostEqual(found[1][1], 6.3, delta=0.1)
+        self.assertEqual(len(self.storage.nearby(0, 0, 1)), 0)
+        User()
+        Place()
+        origin: Place = Place()
+        origin.latitude = origin.longitude = 0.0  # type: ignore
+        self.assertEqual(self.storage.nearby(0, 0, 1), [(origin, 0)])
+        places[1].longitude = -0.13  # type: ignore
+        places[1].latitude = 51.5  # type: ignore
+        self.storage.delete(places[2])
+        self.storage.save()
+        self.storage.all().clear()
+        self.storage.reload()
+        self.assertEqual([place.id for place, _ in self.storage.nearby(
+            51.5, -0.13, 10, limit=5)], [places[1].id])
+        self.assertEqual([place.id for place, _ in self.storage.nearby(
+            0, 0, 1)], [origin.id])
+
+
+class TestFileStorageRange(StorageTestCase):
+    """Tests for the sorted range indexes of FileStorage."""
+
+    def test_order(self) -> None:
+        """Test range conditions and ordered queries on sorted indexes."""
+        city: City = City()
+        places: typing.List[Place] = [Place() for _ in range(6)]
+        for price, place in zip((50, 150, 70, 20, 90, 60), places,
+                                strict=True):
+            place.price_by_night = price  # type: ignore
+            place.max_guest = price // 10  # type: ignore
+
+        places[0].city_id = city.id  # type: ignore
+        places[1].city_id = city.id  # type: ignore
+        self.storage.save()
+        self.assertEqual(list(self.storage.query(
+            Place, ["price_by_night>=60", "price_by_night<100",
+                    "max_guest!=7"])), [places[5], places[4]])
+        self.assertEqual(str(self.storage.explain(
+            "Place", ["price_by_night>=60", "price_by_night<100",
+                      "max_guest!=7"])),
+            "access: range index Place.price_by_night\ncandidates: 3\n"
+            "filter: max_guest!=7")
+        self.assertEqual(list(self.storage.query(
+            Place, order_by="-price_by_night", limit=2)),
+            [places[1], places[4]])
+        self.assertEqual(str(self.storage.explain(
+            Place, order_by="price_by_night", limit=2)),
+            "access: range index Place.price_by_night\ncandidates: 2\n"
+            "order: price_by_night (index)")
+        self.assertEqual(self.storage.explain(
+            Place, [f"city_id={city.id}"], "price_by_night", 1).order,
+            "price_by_night (sort)")
+        self.assertEqual(list(self.storage.query(
+            Place, [f"city_id={city.id}"], "-max_guest")),
+            [places[1], places[0]])
+        places[3].price_by_night = 200  # type: ignore
+        self.storage.delete(places[1])
+        self.storage.save()
+        self.storage.all().clear()
+        self.storage.reload()
+        self.assertEqual([place.id for place in self.storage.query(
+            Place, ["max_guest<=9"], "-price_by_night", 2)],
+            [places[3].id, places[4].id])
+
+
+class TestFileStorageSearch(StorageTestCase):
+    """Tests for the full-text index of FileStorage."""
+
+    options: typing.Dict[str, typing.Any] = {"journal": True}
+
+    def setUp(self) -> None:
+        """Create a journaling storage with a few reviews and a place."""
+        super().setUp()
+        self.reviews: typing.List[Review] = [Review() for _ in range(3)]
+        for review, text in zip(self.reviews, ("Dirty, dirty bathroom",
+                                               "Lovely view", "A bit dirty"),
+                                strict=True):
+            review.text = text  # type: ignore
+
+        self.place: Place = Place()
+        self.place.name = "Dirty shack"  # type: ignore
+
+    def test_search(self) -> None:
+        """Test ranked matches following changes to the objects."""
+        self.assertEqual(self.storage.search("DIRTY"),
+                         [self.reviews[0], self.place, self.reviews[2]])
+        self.assertEqual(self.storage.search("dirty", Review, limit=1),
+                         [self.reviews[0]])
+        self.assertEqual(self.storage.search("dirty view"), [])
+        self.reviews[1].text = "Dirty view"  # type: ignore
+        self.storage.delete(self.reviews[0])
+        self.place.description = "Really dirty"  # type: ignore
+        self.assertEqual(self.storage.search("dirty"),
+                         [self.place, self.reviews[1], self.reviews[2]])
+        self.assertEqual(self.storage.search("shack", "Review"), [])
+
+    def test_saved(self) -> None:
+        """Test that a reload reads the saved index instead of rebuilding."""
+        self.storage.search("dirty")
+        self.storage.save()
+        self.reviews[1].text = "Dirty view"  # type: ignore
+        self.storage.save()
+        storage: FileStorage = self.reopened()
+        with mock.patch("models.storage", new=storage), mock.patch.object(
+                TextIndex, "add", autospec=True,
+                side_effect=TextIndex.add) as add:
+            self.assertEqual([obj.id for obj in storage.search("dirty")],
+                             [self.reviews[0].id, self.place.id,
+                              self.reviews[1].id, self.reviews[2].id])
+
+        self.assertEqual(add.call_count, 1)
+
+    def test_savedOnClose(self) -> None:  # noqa: N802
+        """Test that saves without a journal leave the index to close."""
+        storage: FileStorage = FileStorage(file_path=self.path)
+        self.storage.compact()
+        storage.reload()
+        storage.search("dirty")
+        with mock.patch("models.storage", new=storage), \
+                mock.patch.object(TextIndex, "to_dict", autospec=True,
+                                  side_effect=TextIndex.to_dict) as to_dict:
+            User().save()
+            review: BaseModel = storage.all(Review)[
+                "Review." + self.reviews[1].id]
+            review.text = "Dirty view"  # type: ignore
+            storage.save()
+            to_dict.assert_not_called()
+            storage.close()
+            to_dict.assert_called_once()
+
+        with mock.patch.object(TextIndex, "add", autospec=True) as add:
+            self.assertEqual(len(self.reopened().search("dirty")), 4)
+            add.assert_not_called()
+
+    def test_stale(self) -> None:
+        """Test that an index not matching the json file is rebuilt."""
+        self.storage.search("dirty")
+        self.storage.compact()
+        self.assertTrue(os.path.exists(self.storage.text_path))
+        with open(self.path, "r", encoding="utf-8") as file:
+            saved: dict = json.load(file)
+
+        del saved["Review." + self.reviews[0].id]
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(saved, file)
+
+        self.assertEqual([obj.id for obj in self.reopened().search("dirty")],
+                         [self.place.id, self.reviews[2].id])
+
+
+class TestFileStorageLazy(StorageTestCase):
+    """Tests for FileStorage in lazy mode."""
+
+    options: typing.Dict[str, typing.Any] = {"lazy": True}
+
+    def setUp(self) -> None:
+        """Install a lazy storage and save a few objects with another."""
+        super().setUp()
+        with mock.patch("models.storage", new=FileStorage(self.path)):
+            self.city: City = City()
+            self.place: Place = Place()
+            self.place.city_id = self.city.id  # type: ignore
+            self.place.save()
+
+        self.storage.reload()
+
+    def test_reloadDefers(self) -> None:  # noqa: N802
+        """Test that nothing is parsed until a lookup."""
+        with mock.patch("models.engine.file_storage.open",
+                        new=mock.mock_open()) as fake_open:
+            self.storage.reload()
+            User()
+            fake_open.assert_not_called()
+
+        self.assertEqual(self.storage.count(), 3)
+
+    def test_iterateMaterializes(self) -> None:  # noqa: N802
+        """Test that iterate only instantiates the objects it reaches."""
+        objects: dict = self.storage._FileStorage__objects  # type: ignore
+        first: BaseModel = next(self.storage.iterate())
+        self.assertEqual(list(objects), [f"City.{first.id}"])
+        self.assertEqual([obj.id for obj in self.storage.iterate()],
+                         [obj.id for obj in self.storage.all().values()])
+
+    def test_lookupMaterializes(self) -> None:  # noqa: N802
+        """Test that only looked up objects are instantiated."""
+        objects: dict = self.storage._FileStorage__objects  # type: ignore
+        place: typing.Optional[BaseModel] = self.storage.get(
+            Place, self.place.id)
+        self.assertEqual(place.to_dict(), self.place.to_dict())  # type: ignore
+        self.assertEqual(list(objects), ["Place." + self.place.id])
+        self.assertIs(self.storage.related(Place, "city_id", self.city.id)
+                      ["Place." + self.place.id], place)
+        self.assertEqual(self.storage.count(City), 1)
+        self.assertEqual(len(objects), 1)
+        self.assertEqual(len(self.storage.all()), 2)
+
+    def test_compact(self) -> None:
+        """Test reloading objects as compact instances."""
+        storage: FileStorage = FileStorage(self.path, compact_models=True)
+        storage.reload()
+        place: BaseModel = storage.all()["Place." + self.place.id]
+        self.assertIsInstance(place, Place)
+        self.assertIn("city_id", type(place).__slots__)  # type: ignore
+        self.assertEqual(place.to_dict(), self.place.to_dict())
+
+    def test_saveKeepsUnloaded(self) -> None:  # noqa: N802
+        """Test that saving writes objects that were never instantiated."""
+        with open(self.path, "r", encoding="utf-8") as file:
+            before: dict = json.load(file)
+
+        amenity: Amenity = Amenity()
+        amenity.save()
+        with open(self.path, "r", encoding="utf-8") as file:
+            after: dict = json.load(file)
+
+        self.assertEqual(after, {**before,
+                                 "Amenity." + amenity.id: amenity.to_dict()})
+
+    def test_saveUnparsed(self) -> None:  # noqa: N802
+        """Test that saving splices the records of the unparsed file."""
+        with open(self.path, "r", encoding="utf-8") as file:
+            before: dict = json.load(file)
+
+        with mock.patch("models.engine.file_storage.parse_files",
+                        autospec=True) as parse_files:
+            user: User = User()
+            user.save()
+            amenity: Amenity = Amenity()
+            self.storage.delete(user)
+            self.storage.save()
+            parse_files.assert_not_called()
+
+        with open(self.path, "r", encoding="utf-8") as file:
+            self.assertEqual(json.load(file), {
+                **before, "Amenity." + amenity.id: amenity.to_dict()})
+
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(self.storage.get(City, self.city.id).to_dict(),
+                         self.city.to_dict())
+
+    def test_deleteThenCompact(self) -> None:  # noqa: N802
+        """Test that compacting does not bring back unsaved deletions."""
+        self.storage = FileStorage(self.path, journal=True, lazy=True,
+                                   compact_threshold=2)
+        self.storage.reload()
+        with mock.patch("models.storage", new=self.storage):
+            user: User = User()
+            user.save()
+            self.storage.delete(user)
+            Amenity().save()
+
+        self.assertNotIn("User." + user.id, self.storage.all())
+        with open(self.path, "r", encoding="utf-8") as file:
+            self.assertNotIn("User." + user.id, json.load(file))
+
+
+class TestFileStorageBatch(StorageTestCase):
+    """Tests for FileStorage.batch."""
+
+    def test_singleSave(self) -> None:  # noqa: N802
+        """Test that saves inside a batch are written once on exit."""
+        with mock.patch("models.engine.file_storage.open",
+                        new=mock.MagicMock(spec=open,
+                                           side_effect=open)) as fake_open:
+            with self.storage.batch():
+                for _ in range(10):
+                    User().save()
+
+                with self.storage.batch():
+                    Place().save()
+
+                fake_open.assert_not_called()
+
+            fake_open.assert_called_once()
+
+        self.storage.all().clear()
+        self.storage.reload()
+        self.assertEqual(self.storage.count(User), 10)
+        self.assertEqual(self.storage.count(Place), 1)
+
+    def test_rollback(self) -> None:
+        """Test that an error inside a batch undoes its changes."""
+        city: City = City()
+        place: Place = Place()
+        place.city_id = city.id  # type: ignore
+        place.name = "Boshvle"  # type: ignore
+        self.storage.save()
+        before: typing.Dict[str, BaseModel] = dict(self.storage.all())
+
+        def failing_batch() -> None:
+            with self.storage.batch():
+                place.name = "Nest"  # type: ignore
+                place.city_id = "elsewhere"  # type: ignore
+                place.save()
+                self.storage.delete(city)
+                User()
+                raise ValueError
+
+        self.assertRaises(ValueError, failing_batch)
+        self.assertEqual(self.storage.all(), before)
+        self.assertEqual(place.name, "Boshvle")  # type: ignore
+        self.assertEqual(list(self.storage.related(Place, "city_id",
+                                                   city.id).values()),
+                         [place])
+        self.assertEqual(self.reopened().count(), 2)
+
+    def test_nestedRollback(self) -> None:  # noqa: N802
+        """Test that an error inside a nested batch only undoes its own."""
+        place: Place = Place()
+
+        def failing_batch() -> None:
+            with self.storage.batch():
+                place.name = "Nest"  # type: ignore
+                User().save()
+                raise ValueError
+
+        with self.storage.batch():
+            place.name = "Loft"  # type: ignore
+            kept: User = User()
+            self.assertRaises(ValueError, failing_batch)
+            self.assertEqual(place.name, "Loft")  # type: ignore
+            self.assertEqual(list(self.storage.all(User).values()), [kept])
+            self.storage.save()
+
+        self.storage.all().clear()
+        self.storage.reload()
+        self.assertEqual(list(self.storage.all(User)), [f"User.{kept.id}"])
+        self.assertEqual(self.storage.get(Place, place.id).name, "Loft")
+
+
+class TestFileStorageWriteBehind(StorageTestCase):
+    """Tests for FileStorage with a write-behind thread."""
+
+    options: typing.Dict[str, typing.Any] = {
+        "write_behind_ms": 60000, "write_behind_mutations": 5}
+
+    def tearDown(self) -> None:
+        """Stop the write-behind thread."""
+        self.storage.close()
+
+    def saved_count(self) -> int:
+        """Return the number of objects in the json file."""
+        with suppress(FileNotFoundError), \
+                open(self.path, "r", encoding="utf-8") as file:
+            return len(json.load(file))
+
+        return 0
+
+    def test_flush(self) -> None:
+        """Test that save defers the write until flush."""
+        user: User = User()
+        user.save()
+        self.assertEqual(self.saved_count(), 0)
+        user.first_name = "Damian"  # type: ignore
+        user.save()
+        self.storage.flush()
+        self.assertEqual(self.saved_count(), 1)
+        with open(self.path, "r", encoding="utf-8") as file:
+            self.assertEqual(json.load(file)["User." + user.id]
+                             ["first_name"], "Damian")
+
+    def test_mutationLimit(self) -> None:  # noqa: N802
+        """Test that enough pending mutations trigger a write."""
+        for _ in range(5):
+            Review().save()
+
+        deadline: float = time.monotonic() + 5
+        while self.saved_count() < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(self.saved_count(), 5)
+
+    def test_close(self) -> None:
+        """Test that closing the storage writes pending changes."""
+        Amenity().save()
+        self.storage.close()
+        self.assertEqual(self.saved_count(), 1)
+
+
 if __name__ == "__main__":
     unittest.main()
+
+
+class TestFileStorageSharded(StorageTestCase):
+    """Tests for FileStorage with one file per class."""
+
+    options: typing.Dict[str, typing.Any] = {"shards": 1}
+
+    def shard_path(self, name: str) -> str:
+        """Return the path of the shard file with the given suffix."""
+        return os.path.join(self.tmp_dir.name, f"objects.{name}.json")
+
+    def test_save(self) -> None:
+        """Test that every class is saved to its own file."""
+        place: Place = Place()
+        amenity: Amenity = Amenity()
+        self.storage.save()
+        self.assertFalse(os.path.exists(self.path))
+        with open(self.shard_path("Place"), "r", encoding="utf-8") as file:
+            self.assertEqual(json.load(file),
+                             {"Place." + place.id: place.to_dict()})
+
+        with open(self.shard_path("Amenity"), "r", encoding="utf-8") as file:
+            self.assertEqual(json.load(file),
+                             {"Amenity." + amenity.id: amenity.to_dict()})
+
+    def test_saveSelective(self) -> None:  # noqa: N802
+        """Test that only the files of changed objects are rewritten."""
+        place: Place = Place()
+        Amenity()
+        self.storage.save()
+        os.remove(self.shard_path("Amenity"))
+        place.name = "Boshvle"  # type: ignore
+        place.save()
+        self.assertFalse(os.path.exists(self.shard_path("Amenity")))
+        self.storage.delete(place)
+        self.storage.save()
+        with open(self.shard_path("Place"), "r", encoding="utf-8") as file:
+            self.assertEqual(file.read(), "{}")
+
+    def test_partitions(self) -> None:
+        """Test hash partitioning the objects of a class over files."""
+        self.storage = self.reopened(shards=4)
+        with mock.patch("models.storage", new=self.storage):
+            users: typing.List[User] = [User() for _ in range(20)]
+            self.storage.save()
+
+        files: typing.Set[str] = set(os.listdir(self.tmp_dir.name))
+        files.remove("objects.json.layout")
+        self.assertGreater(len(files), 1)
+        self.assertLessEqual(files, {f"objects.User.{index}.json"
+                                     for index in range(4)})
+        ids: typing.Set[str] = {user.id for user in users}
+        other: FileStorage = self.reopened(shards=4)
+        self.assertEqual({obj.id for obj in other.all(User).values()}, ids)
+
+    def test_migrate(self) -> None:
+        """Test that reload moves the objects to a new number of shards."""
+        self.storage = self.reopened(shards=0)
+        with mock.patch("models.storage", new=self.storage):
+            users: typing.List[User] = [User() for _ in range(20)]
+            self.storage.save()
+
+        ids: typing.Set[str] = {user.id for user in users}
+        for shards in (4, 2, 1, 0):
+            with self.subTest(shards=shards):
+                other: FileStorage = self.reopened(shards=shards)
+                self.assertEqual({obj.id for obj in other.all(User).values()},
+                                 ids)
+                self.assertEqual(os.path.exists(self.path), not shards)
+                self.assertEqual(os.path.exists(other.layout_path),
+                                 bool(shards))
+                with mock.patch("models.storage", new=other):
+                    user: User = User()
+                    user.save()
+
+                ids.add(user.id)
+
+    def test_migrateDeleted(self) -> None:  # noqa: N802
+        """Test that files of an older layout do not bring objects back."""
+        self.storage = self.reopened(shards=4)
+        with mock.patch("models.storage", new=self.storage):
+            users: typing.List[User] = [User() for _ in range(20)]
+            self.storage.save()
+
+        other: FileStorage = self.reopened(shards=2)
+        for user in users[:10]:
+            other.delete(other.get(User, user.id))
+
+        other.save()
+        self.assertEqual({obj.id for obj in self.reopened(shards=4).all(
+            User).values()}, {user.id for user in users[10:]})
+
+    def test_interruptedMigration(self) -> None:  # noqa: N802
+        """Test that the next reload finishes a migration cut short."""
+        users: typing.List[User] = [User() for _ in range(20)]
+        self.storage.save()
+        with mock.patch.object(Layout, "write", autospec=True,
+                               side_effect=OSError):
+            self.assertRaises(OSError, self.reopened, shards=4)
+
+        self.assertTrue(os.path.exists(self.storage.migration_path))
+        other: FileStorage = self.reopened(shards=4)
+        self.assertEqual({obj.id for obj in other.all(User).values()},
+                         {user.id for user in users})
+        self.assertFalse(os.path.exists(other.migration_path))
+        self.assertFalse(os.path.exists(self.shard_path("User")))
+
+    def test_lazyClass(self) -> None:  # noqa: N802
+        """Test that lazy lookups only parse the files of their class."""
+        amenity: Amenity = Amenity()
+        Review()
+        self.storage.save()
+        with open(self.shard_path("Review"), "w", encoding="utf-8") as file:
+            file.write("not json")
+
+        other: FileStorage = self.reopened(shards=1, lazy=True)
+        self.assertEqual(list(other.all(Amenity)), ["Amenity." + amenity.id])
+        self.assertIsNotNone(other.get(Amenity, amenity.id))
+        with self.assertRaises(ValueError):
+            other.all(Review)
+
+    def test_journal(self) -> None:
+        """Test that compacting the log rewrites the changed shards."""
+        self.storage = self.reopened(shards=1, journal=True,
+                                     compact_threshold=2)
+        with mock.patch("models.storage", new=self.storage):
+            user: User = User()
+            self.storage.save()
+            self.assertTrue(os.path.exists(self.storage.log_path))
+            State().save()
+            State().save()
+
+        self.assertFalse(os.path.exists(self.storage.log_path))
+        self.assertFalse(os.path.exists(self.shard_path("Place")))
+        other: FileStorage = self.reopened(shards=1)
+        self.assertEqual(other.count(State), 2)
+        self.assertIsNotNone(other.get(User, user.id))
+
+
+class TestFileStorageBounded(StorageTestCase):
+    """Tests for FileStorage keeping a bounded number of objects."""
+
+    options: typing.Dict[str, typing.Any] = {"max_objects": 3}
+
+    def saved(self) -> typing.Dict[str, dict]:
+        """Return what an unbounded storage reads back from the files."""
+        with mock.patch("models.storage",
+                        new=self.reopened(max_objects=0, journal=True)):
+            return {key: obj.to_dict()
+                    for key, obj in models.storage.all().items()}
+
+    def test_evict(self) -> None:
+        """Test that only the most recently used objects are kept."""
+        users: typing.List[User] = [User() for _ in range(10)]
+        self.storage.save()
+        self.assertEqual(self.storage.cache_stats(),
+                         {"hits": 0, "misses": 0, "evictions": 7,
+                          "cached": 3, "capacity": 3})
+        self.assertEqual(self.storage.count(User), 10)
+        self.assertEqual(self.storage.get(User, users[0].id).to_dict(),
+                         users[0].to_dict())
+        self.assertIs(self.storage.get(User, users[0].id),
+                      self.storage.get(User, users[0].id))
+        self.assertEqual([obj.id for obj in self.storage.iterate()],
+                         [user.id for user in users])
+        stats: typing.Dict[str, int] = self.storage.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (3, 10))
+        self.assertEqual(stats["cached"], 3)
+
+    def test_dirtyEvicted(self) -> None:  # noqa: N802
+        """Test that changed objects are written before being evicted."""
+        users: typing.List[User] = [User() for _ in range(3)]
+        self.storage.save()
+        users[0].first_name = "Betty"  # type: ignore
+        State()
+        self.assertEqual(self.storage.cache_stats()["evictions"], 1)
+        self.assertEqual(
+            self.saved()["User." + users[0].id]["first_name"], "Betty")
+        self.assertEqual(
+            self.storage.get(User, users[0].id).first_name,  # type: ignore
+            "Betty")
+
+    def test_evictedInUse(self) -> None:  # noqa: N802
+        """Test that changes to an evicted instance are not lost."""
+        user: User = User()
+        self.storage.save()
+        for _ in range(3):
+            State()
+
+        user.first_name = "Betty"  # type: ignore
+        user.save()
+        self.assertIs(self.storage.get(User, user.id), user)
+        self.assertEqual(self.saved()["User." + user.id]["first_name"],
+                         "Betty")
+
+    def test_reload(self) -> None:
+        """Test that reloading indexes keys without instantiating them."""
+        with mock.patch("models.storage", new=FileStorage(self.path)):
+            users: typing.List[User] = [User() for _ in range(5)]
+            models.storage.save()
+
+        storage: FileStorage = self.reopened(max_objects=2)
+        self.assertEqual(storage.count(), 5)
+        self.assertEqual(storage.cache_stats()["cached"], 0)
+        self.assertEqual(storage.get(User, users[3].id).to_dict(),
+                         users[3].to_dict())
+
+    def test_compact(self) -> None:
+        """Test that folding the log keeps evicted objects."""
+        self.storage = self.reopened(max_objects=2, compact_threshold=4)
+        with mock.patch("models.storage", new=self.storage):
+            users: typing.List[User] = [User() for _ in range(6)]
+            for user in users:
+                user.save()
+
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(self.saved(), {"User." + user.id: user.to_dict()
+                                        for user in users})
+
+    def test_incompatible(self) -> None:
+        """Test that modes that cannot work together are refused."""
+        for kwargs in ({"max_objects": 2, "write_behind_ms": 50},
+                       {"max_objects": 2, "shared": True},
+                       {"shared": True, "write_behind_ms": 50}):
+            with self.subTest(**kwargs), self.assertRaises(ValueError):
+                FileStorage(self.path, **kwargs)
+
+    def test_batch(self) -> None:
+        """Test that nothing is evicted inside a batch."""
+        with self.storage.batch():
+            for _ in range(5):
+                User()
+
+            self.assertEqual(self.storage.cache_stats()["cached"], 5)
+
+        self.assertEqual(self.storage.cache_stats()["cached"], 3)
+        self.assertEqual(len(self.saved()), 5)
+
+
+def _shared_worker(path: str, worker: int, count: int,
+                   start: typing.Any, **kwargs) -> None:
+    """Create count users in a shared store, deleting every other one."""
+    storage: FileStorage = FileStorage(path, shared=True, **kwargs)
+    storage.reload()
+    with mock.patch("models.storage", new=storage):
+        start.wait()
+        for index in range(count):
+            user: User = User()
+            user.first_name = f"{worker}-{index}"  # type: ignore
+            user.save()
+            if index % 2:
+                storage.delete(user)
+                storage.save()
+
+
+@unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(),
+                     "needs fork")
+class TestFileStorageShared(StorageTestCase):
+    """Tests for FileStorage shared by several processes."""
+
+    options: typing.Dict[str, typing.Any] = {"shared": True}
+
+    def setUp(self) -> None:
+        """Install a shared storage and save a few objects."""
+        super().setUp()
+        self.city: City = City()
+        self.place: Place = Place()
+        self.storage.save()
+
+    def in_process(self, function: typing.Callable[[], None]) -> None:
+        """Run function with its own storage in another process."""
+        def target() -> None:
+            storage: FileStorage = self.reopened()
+            with mock.patch("models.storage", new=storage):
+                function()
+
+        process = multiprocessing.get_context("fork").Process(target=target)
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+
+    def saved(self) -> typing.Dict[str, dict]:
+        """Return the objects as saved in the json file."""
+        with open(self.path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def test_merge(self) -> None:
+        """Test that saving keeps what another process saved."""
+        user: User = User()
+
+        def other() -> None:
+            State()
+            models.storage.get(City, self.city.id).name = "Dakar"
+            models.storage.delete(models.storage.get(Place, self.place.id))
+            models.storage.save()
+
+        self.in_process(other)
+        user.save()
+        self.assertEqual(sorted(key.partition(".")[0] for key in self.saved()),
+                         ["City", "State", "User"])
+        self.assertIn("User." + user.id, self.saved())
+        self.assertEqual(self.city.name, "Dakar")  # type: ignore
+        self.assertIs(self.storage.get(City, self.city.id), self.city)
+        self.assertIsNone(self.storage.get(Place, self.place.id))
+
+    def test_unsavedWins(self) -> None:  # noqa: N802
+        """Test that unsaved changes are merged over the saved ones."""
+        self.city.name = "Lagos"  # type: ignore
+
+        def other() -> None:
+            city: City = models.storage.get(City, self.city.id)
+            city.name = "Dakar"  # type: ignore
+            models.storage.get(Place, self.place.id).name = "Boshvle"
+            models.storage.save()
+
+        self.in_process(other)
+        self.storage.save()
+        self.assertEqual(self.saved()["City." + self.city.id]["name"],
+                         "Lagos")
+        self.assertEqual(self.saved()["Place." + self.place.id]["name"],
+                         "Boshvle")
+
+    def test_concurrentSaves(self) -> None:  # noqa: N802
+        """Test many processes saving to the same store at once."""
+        workers: int = 8
+        count: int = 20
+        context = multiprocessing.get_context("fork")
+        for kwargs in ({}, {"journal": True, "compact_threshold": 10},
+                       {"shards": 2, "lazy": True}):
+            with self.subTest(**kwargs):
+                start = context.Barrier(workers)
+                processes: typing.List[typing.Any] = [
+                    context.Process(target=_shared_worker,
+                                    args=(self.path, worker, count, start),
+                                    kwargs=kwargs)
+                    for worker in range(workers)]
+                for process in processes:
+                    process.start()
+
+                for process in processes:
+                    process.join()
+                    self.assertEqual(process.exitcode, 0)
+
+                storage: FileStorage = self.reopened(**kwargs)
+                names: typing.List[str] = sorted(
+                    user.first_name  # type: ignore
+                    for user in storage.all(User).values())
+                self.assertEqual(names, sorted(
+                    f"{worker}-{index}" for worker in range(workers)
+                    for index in range(0, count, 2)))
+                for user in storage.all(User).values():
+                    storage.delete(user)
+
+                storage.save()
+
+
+class TestFileStorageThreadSafe(StorageTestCase):
+    """Tests for FileStorage used by several threads."""
+
+    options: typing.Dict[str, typing.Any] = {"threadsafe": True}
+
+    def test_allCopy(self) -> None:  # noqa: N802
+        """Test that all returns a dictionary the caller may iterate."""
+        objects: typing.Dict[str, BaseModel] = self.storage.all()
+        User()
+        self.assertEqual(objects, {})
+        self.assertEqual(len(self.storage.all()), 1)
+
+    def test_concurrent(self) -> None:
+        """Test threads creating, deleting, saving and listing at once."""
+        errors: typing.List[Exception] = []
+        kept: typing.List[str] = []
+        start: threading.Barrier = threading.Barrier(8)
+
+        def writer() -> None:
+            start.wait()
+            for index in range(100):
+                user: User = User()
+                user.save()
+                if index % 2:
+                    self.storage.delete(user)
+                    self.storage.save()
+                else:
+                    kept.append(user.id)
+
+        def reader() -> None:
+            start.wait()
+            for _ in range(200):
+                for obj in self.storage.all().values():
+                    self.assertIn(obj.id, str(obj))
+
+                list(self.storage.iterate(User))
+                self.storage.count(User)
+
+        def run(function: typing.Callable[[], None]) -> None:
+            try:
+                function()
+            except Exception as error:
+                errors.append(error)
+
+        threads: typing.List[threading.Thread] = [
+            threading.Thread(target=run, args=(function,))
+            for function in [writer] * 4 + [reader] * 4]
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        with open(self.path, "r", encoding="utf-8") as file:
+            self.assertEqual(sorted(json.load(file)),
+                             sorted("User." + user_id for user_id in kept))
+
+
+class TestFileStorageAsync(StorageTestCase):
+    """Tests for the coroutines of FileStorage."""
+
+    def saved(self) -> typing.Dict[str, dict]:
+        """Return the objects as saved in the json file."""
+        with open(self.path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def test_reloadGet(self) -> None:  # noqa: N802
+        """Test reloading and looking up objects from a coroutine."""
+        user: User = User()
+        asyncio.run(self.storage.asave())
+        models.storage._FileStorage__objects.clear()  # type: ignore
+
+        async def lookup() -> typing.Optional[BaseModel]:
+            await self.storage.areload()
+            self.assertEqual(len(await self.storage.aall(User)), 1)
+            return await self.storage.aget(User, user.id)
+
+        found: typing.Optional[BaseModel] = asyncio.run(lookup())
+        self.assertEqual(found.to_dict(), user.to_dict())  # type: ignore
+
+    def test_coalesce(self) -> None:
+        """Test that saves requested during a save share the next one."""
+        user: User = User()
+        flushing: threading.Event = threading.Event()
+        release: threading.Event = threading.Event()
+        flush: typing.Callable[[], None] = self.storage.flush
+
+        def slow_flush() -> None:
+            flushing.set()
+            release.wait(5)
+            flush()
+
+        async def concurrent() -> None:
+            first: asyncio.Future = asyncio.ensure_future(
+                self.storage.asave())
+            await asyncio.to_thread(flushing.wait, 5)
+            user.first_name = "Betty"  # type: ignore
+            others: asyncio.Future = asyncio.gather(
+                *[self.storage.asave() for _ in range(10)])
+            await asyncio.sleep(0.01)
+            release.set()
+            await asyncio.gather(first, others)
+
+        with mock.patch.object(self.storage, "flush", new=slow_flush), \
+                mock.patch.object(self.storage, "save", autospec=True,
+                                  side_effect=self.storage.save) as save:
+            asyncio.run(concurrent())
+
+        self.assertEqual(save.call_count, 2)
+        self.assertEqual(self.saved()["User." + user.id]["first_name"],
+                         "Betty")
+
+    def test_assignDuringSave(self) -> None:  # noqa: N802
+        """Test that assigning on the loop does not wait for the disk."""
+        user: User = User()
+        flushing: threading.Event = threading.Event()
+        release: threading.Event = threading.Event()
+        flush: typing.Callable[[], None] = self.storage.flush
+
+        def slow_flush() -> None:
+            flushing.set()
+            release.wait(5)
+            flush()
+
+        async def assign() -> float:
+            saving: asyncio.Future = asyncio.ensure_future(
+                self.storage.asave())
+            await asyncio.to_thread(flushing.wait, 5)
+            start: float = time.monotonic()
+            user.first_name = "Betty"  # type: ignore
+            elapsed: float = time.monotonic() - start
+            release.set()
+            await saving
+            await self.storage.asave()
+            return elapsed
+
+        with mock.patch.object(self.storage, "flush", new=slow_flush):
+            self.assertLess(asyncio.run(assign()), 1)
+
+        self.assertEqual(self.saved()["User." + user.id]["first_name"],
+                         "Betty")
+
+    def test_batch(self) -> None:
+        """Test that saving inside a batch waits for the block to exit."""
+        async def batch() -> None:
+            with self.storage.batch():
+                User()
+                await self.storage.asave()
+                self.assertFalse(os.path.exists(self.path))
+
+        asyncio.run(batch())
+        self.assertEqual(len(self.saved()), 1)
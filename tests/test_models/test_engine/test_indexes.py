@@ -0,0 +1,189 @@
+#!/usr/bin/python3
+"""Module for test_indexes."""
+
+import unittest
+
+from models.engine.indexes import AttributeIndex, distance, GridIndex
+from models.engine.indexes import SortedIndex, TextIndex, terms
+
+
+class TestAttributeIndex(unittest.TestCase):
+    """Tests for AttributeIndex."""
+
+    def setUp(self) -> None:
+        """Create an index with a few keys."""
+        self.index: AttributeIndex = AttributeIndex()
+        self.index.add("Place.1", "city-a")
+        self.index.add("Place.2", "city-b")
+        self.index.add("Place.3", "city-a")
+
+    def tearDown(self) -> None:
+        """Delete the index."""
+        del self.index
+
+    def test_keys(self) -> None:
+        """Test looking up keys by value."""
+        self.assertEqual(self.index.keys("city-a"), ["Place.1", "Place.3"])
+        self.assertEqual(self.index.keys("city-c"), [])
+        self.assertEqual(len(self.index), 3)
+
+    def test_move(self) -> None:
+        """Test that adding a key again moves it to the new value."""
+        self.index.add("Place.1", "city-b")
+        self.assertEqual(self.index.keys("city-a"), ["Place.3"])
+        self.assertEqual(self.index.keys("city-b"), ["Place.2", "Place.1"])
+
+    def test_discard(self) -> None:
+        """Test removing keys."""
+        self.index.discard("Place.2")
+        self.index.discard("Place.4")
+        self.assertEqual(self.index.keys("city-b"), [])
+        self.assertEqual(len(self.index), 2)
+
+
+class TestTextIndex(unittest.TestCase):
+    """Tests for TextIndex."""
+
+    def setUp(self) -> None:
+        """Create an index with a few documents."""
+        self.index: TextIndex = TextIndex()
+        self.index.add("Review.1", ["Dirty room, dirty bathroom"])
+        self.index.add("Review.2", ["Nice room with a view"])
+        self.index.add("Place.1", ["Dirty shack", "A room"])
+
+    def tearDown(self) -> None:
+        """Delete the index."""
+        del self.index
+
+    def test_terms(self) -> None:
+        """Test splitting text into lowercased words."""
+        self.assertEqual(terms("It's a Dirty-room!"),
+                         ["it", "s", "a", "dirty", "room"])
+
+    def test_search(self) -> None:
+        """Test that every word must match and rarer words rank higher."""
+        self.assertEqual([key for key, _ in self.index.search("room")],
+                         ["Review.1", "Place.1", "Review.2"])
+        self.assertEqual([key for key, _ in self.index.search("ROOM dirty")],
+                         ["Review.1", "Place.1"])
+        self.assertEqual(self.index.search("dirty view"), [])
+        self.assertEqual(self.index.search(""), [])
+        self.assertEqual([key for key, _ in self.index.search(
+            "dirty", "Place")], ["Place.1"])
+
+    def test_replace(self) -> None:
+        """Test that adding a key again replaces its words."""
+        self.index.add("Review.1", ["Clean"])
+        self.index.discard("Place.1")
+        self.index.add("Review.2", [""])
+        self.assertEqual(self.index.search("dirty"), [])
+        self.assertEqual(self.index.search("room"), [])
+        self.assertEqual(len(self.index), 1)
+
+    def test_dict(self) -> None:
+        """Test rebuilding an index from its word counts."""
+        copy: TextIndex = TextIndex.from_dict(self.index.to_dict())
+        self.assertEqual(copy.search("room"), self.index.search("room"))
+        self.assertEqual(len(copy), 3)
+
+
+class TestGridIndex(unittest.TestCase):
+    """Tests for GridIndex and distance."""
+
+    def setUp(self) -> None:
+        """Create an index with a few points."""
+        self.index: GridIndex = GridIndex()
+        self.index.add("Place.1", 40.7128, -74.0060)
+        self.index.add("Place.2", 40.7306, -73.9352)
+        self.index.add("Place.3", 51.5074, -0.1278)
+        self.index.add("Place.4", "40.7", "-74")
+
+    def tearDown(self) -> None:
+        """Delete the index."""
+        del self.index
+
+    def test_distance(self) -> None:
+        """Test great-circle distances in kilometres."""
+        self.assertAlmostEqual(distance(40.7128, -74.0060, 51.5074, -0.1278),
+                               5570, delta=5)
+        self.assertAlmostEqual(distance(0, 179.5, 0, -179.5), 111.2,
+                               delta=0.1)
+        self.assertEqual(distance(10, 20, 10, 20), 0)
+
+    def test_within(self) -> None:
+        """Test finding the points in a circle, nearest first."""
+        found: list = self.index.within(40.7128, -74.0060, 10)
+        self.assertEqual([key for key, _ in found],
+                         ["Place.1", "Place.4", "Place.2"])
+        self.assertAlmostEqual(found[2][1], 6.3, delta=0.1)
+        self.assertEqual([key for key, _ in self.index.within(
+            40.7128, -74.0060, 2)], ["Place.1", "Place.4"])
+        self.assertEqual(len(self.index.within(0, 0, 20000)), 4)
+        self.assertEqual(self.index.within(0, 0, 100), [])
+
+    def test_edges(self) -> None:
+        """Test circles crossing the antimeridian and the poles."""
+        self.index.add("Place.5", 0.1, 179.95)
+        self.index.add("Place.6", 89.9, 10)
+        self.assertEqual([key for key, _ in self.index.within(
+            0, -179.95, 20)], ["Place.5"])
+        self.assertEqual([key for key, _ in self.index.within(
+            89.9, -170, 30)], ["Place.6"])
+
+    def test_move(self) -> None:
+        """Test moving and discarding points."""
+        self.index.add("Place.1", 51.5, -0.13)
+        self.index.add("Place.2", "north", 0)
+        self.index.discard("Place.4")
+        self.assertEqual(self.index.within(40.7128, -74.0060, 10), [])
+        self.assertEqual([key for key, _ in self.index.within(
+            51.5, -0.13, 10)], ["Place.1", "Place.3"])
+        self.assertEqual(len(self.index), 2)
+
+
+class TestSortedIndex(unittest.TestCase):
+    """Tests for SortedIndex."""
+
+    def setUp(self) -> None:
+        """Create an index with a few values."""
+        self.index: SortedIndex = SortedIndex()
+        for key, value in (("Place.1", 80), ("Place.2", 20), ("Place.3", 50),
+                           ("Place.4", 50.0), ("Place.5", "cheap")):
+            self.index.add(key, value)
+
+    def tearDown(self) -> None:
+        """Delete the index."""
+        del self.index
+
+    def test_scan(self) -> None:
+        """Test scanning ranges in both orders."""
+        self.assertEqual(list(self.index.scan()),
+                         ["Place.2", "Place.3", "Place.4", "Place.1"])
+        self.assertEqual(list(self.index.scan(50, 80, high_inclusive=False)),
+                         ["Place.3", "Place.4"])
+        self.assertEqual(list(self.index.scan(20, low_inclusive=False,
+                                              descending=True)),
+                         ["Place.1", "Place.4", "Place.3"])
+        self.assertEqual(list(self.index.scan(81)), [])
+
+    def test_count(self) -> None:
+        """Test counting the keys in a range."""
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.index.count(), 4)
+        self.assertEqual(self.index.count(50, 50), 2)
+        self.assertEqual(self.index.count(high=50, high_inclusive=False), 1)
+
+    def test_move(self) -> None:
+        """Test moving and discarding keys, also in the middle of a scan."""
+        scan = self.index.scan()
+        self.assertEqual(next(scan), "Place.2")
+        self.index.add("Place.2", 90)
+        self.index.add("Place.1", True)
+        self.index.discard("Place.3")
+        self.assertEqual(list(scan), ["Place.4", "Place.2"])
+        self.assertEqual(list(self.index.scan(descending=True)),
+                         ["Place.2", "Place.4"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+"""Module for test_journal."""
+
+import os
+import tempfile
+import unittest
+
+from models.engine.journal import Journal
+
+
+class TestJournal(unittest.TestCase):
+    """Tests for Journal."""
+
+    def setUp(self) -> None:
+        """Create a log in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log: Journal = Journal(
+            os.path.join(self.tmp_dir.name, "objects.json.log"), track=True)
+
+    def tearDown(self) -> None:
+        """Delete the log."""
+        self.tmp_dir.cleanup()
+
+    def test_entries(self) -> None:
+        """Test replaying the records appended to the log."""
+        self.log.append([
+            ("User.1", Journal.record("User.1", {"id": "1"})),
+            ("User.2", Journal.record("User.2", {"id": "2"})),
+            ("User.1", Journal.record("User.1", None))])
+        records: list = list(Journal(self.log.path).entries())
+        self.assertEqual([(record["op"], record["key"]) for record in records],
+                         [("set", "User.1"), ("set", "User.2"),
+                          ("del", "User.1")])
+        self.assertEqual(self.log.read("User.2"), {"id": "2"})
+        self.assertEqual(self.log.last("User.1", {"id": "0"}), None)
+        self.assertEqual(self.log.last("User.3", {"id": "3"}), {"id": "3"})
+
+    def test_tornRecord(self) -> None:  # noqa: N802
+        """Test that a torn record is cut off the log."""
+        line: str = Journal.record("User.1", {"id": "1"})
+        with open(self.log.path, "w", encoding="utf-8") as file:
+            file.write(line + line[:10])
+
+        self.assertEqual(len(list(self.log.entries())), 1)
+        self.assertEqual(self.log.records, 1)
+        self.assertEqual(self.log.size(), len(line))
+        self.assertEqual(self.log.positions, {"User.1": (0, len(line))})
+
+    def test_recover(self) -> None:
+        """Test finishing or dropping an interrupted swap of files."""
+        path: str = os.path.join(self.tmp_dir.name, "objects.json")
+        for retired, expected in ((False, "old"), (True, "new")):
+            with self.subTest(retired=retired):
+                for name, text in ((path, "old"), (path + ".tmp", "new")):
+                    with open(name, "w", encoding="utf-8") as file:
+                        file.write(text)
+
+                if retired:
+                    self.log.retire()
+
+                self.log.recover([path])
+                with open(path, encoding="utf-8") as file:
+                    self.assertEqual(file.read(), expected)
+
+                self.assertFalse(os.path.exists(path + ".tmp"))
+                self.assertFalse(os.path.exists(self.log.retired_path))
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+"""Module for test_layout."""
+
+import io
+import json
+import os
+import tempfile
+import typing
+import unittest
+
+from models.engine.layout import dump, encode, Layout
+
+
+class TestLayout(unittest.TestCase):
+    """Tests for Layout."""
+
+    def setUp(self) -> None:
+        """Create a store path in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.tmp_dir.name, "objects.json")
+        self.records: typing.Dict[str, dict] = {
+            f"User.{index}": {"id": str(index), "__class__": "User"}
+            for index in range(10)}
+
+    def tearDown(self) -> None:
+        """Delete the store files."""
+        self.tmp_dir.cleanup()
+
+    def test_dump(self) -> None:
+        """Test that dump matches json.dump of the objects."""
+        for records in ({}, self.records):
+            with self.subTest(records=len(records)):
+                file: io.StringIO = io.StringIO()
+                dump([encode(key, obj_dict)
+                      for key, obj_dict in records.items()], file)
+                self.assertEqual(file.getvalue(),
+                                 json.dumps(records, indent="    "))
+
+    def test_paths(self) -> None:
+        """Test the paths of the files of every number of shards."""
+        self.assertEqual(Layout(self.path, 0, ["User"]).paths(), [self.path])
+        self.assertEqual(Layout(self.path, 1, ["User", "City"]).paths(), [
+            os.path.join(self.tmp_dir.name, f"objects.{name}.json")
+            for name in ("User", "City")])
+        layout: Layout = Layout(self.path, 4, ["User"])
+        self.assertEqual(len(layout.paths()), 4)
+        for key in self.records:
+            self.assertIn(layout.path(key), layout.paths())
+
+    def test_check(self) -> None:
+        """Test migrating a single json file to shards and back."""
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(self.records, file)
+
+        loaded: typing.List[int] = []
+
+        def load(shards: int) -> typing.Dict[str, dict]:
+            loaded.append(shards)
+            return self.records
+
+        layout: Layout = Layout(self.path, 2, ["User"])
+        self.assertTrue(layout.check(load, [], False))
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(layout.migration_path))
+        self.assertEqual(layout.saved_shards(), 2)
+        self.assertFalse(layout.check(load, [], False))
+
+        self.assertTrue(Layout(self.path, 0, ["User"]).check(load, [], False))
+        self.assertEqual(loaded, [0, 2])
+        with open(self.path, encoding="utf-8") as file:
+            self.assertEqual(json.load(file), self.records)
+
+        self.assertFalse(os.path.exists(layout.layout_path))
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["objects.json"])
@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+"""Module for test_offset_index."""
+
+import json
+import os
+import tempfile
+import typing
+import unittest
+from unittest import mock
+
+import models
+from models.engine.file_storage import FileStorage
+from models.engine import offset_index
+from models.place import Place
+from models.user import User
+
+
+class TestOffsetIndex(unittest.TestCase):
+    """Tests for the offset index files."""
+
+    def setUp(self) -> None:
+        """Write a json file the way FileStorage does and index it."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.tmp_dir.name, "objects.json")
+        self.objects: typing.Dict[str, dict] = {
+            "User.b": {"name": "Bétty"},
+            "User.a": {"name": "Damian", "tags": ["a", "b"]},
+            "Place.long-id": {"name": "Boshvle"},
+        }
+        keys: typing.List[str] = list(self.objects)
+        fragments: typing.List[str] = [
+            f"    {json.dumps(key)}: "
+            + json.dumps(obj, indent="    ").replace("\n", "\n    ")
+            for key, obj in self.objects.items()]
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write("{\n" + ",\n".join(fragments) + "\n}")
+
+        offset_index.write(self.path, keys, fragments)
+
+    def tearDown(self) -> None:
+        """Delete the files."""
+        self.tmp_dir.cleanup()
+
+    def test_lookup(self) -> None:
+        """Test reading single records."""
+        for key, obj in self.objects.items():
+            with self.subTest(key=key):
+                record: typing.Optional[bytes] = offset_index.lookup(
+                    self.path, key)
+                self.assertEqual(json.loads(record),  # type: ignore
+                                 {key: obj})
+
+        self.assertIsNone(offset_index.lookup(self.path, "User.c"))
+        self.assertIsNone(offset_index.lookup(self.path, "User." + "x" * 99))
+
+    def test_outOfDate(self) -> None:  # noqa: N802
+        """Test that an index is rejected once the file changed."""
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(" ")
+
+        with self.assertRaises(ValueError):
+            offset_index.lookup(self.path, "User.a")
+
+        os.remove(offset_index.index_path(self.path))
+        with self.assertRaises(FileNotFoundError):
+            offset_index.lookup(self.path, "User.a")
+
+
+class TestFileStorageOffsetIndex(unittest.TestCase):
+    """Tests for FileStorage reading single objects through the index."""
+
+    def setUp(self) -> None:
+        """Save a few objects and install a lazy indexed storage."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.tmp_dir.name, "objects.json")
+        with mock.patch("models.storage",
+                        new=FileStorage(self.path, offset_index=True)):
+            self.users: typing.List[User] = [User() for _ in range(3)]
+            self.place: Place = Place()
+            self.place.save()
+
+        self.storage: FileStorage = self.reopened()
+        self.patcher = mock.patch("models.storage", new=self.storage)
+        self.patcher.start()
+
+    def tearDown(self) -> None:
+        """Delete created instances and files."""
+        self.patcher.stop()
+        models.storage._FileStorage__objects.clear()  # type: ignore
+        self.tmp_dir.cleanup()
+
+    def reopened(self, **kwargs) -> FileStorage:
+        """Return a lazy indexed storage reloaded from the same file."""
+        storage: FileStorage = FileStorage(self.path, lazy=True,
+                                           offset_index=True, **kwargs)
+        storage.reload()
+        return storage
+
+    def test_get(self) -> None:
+        """Test that get reads one object without parsing the file."""
+        with mock.patch("models.engine.file_storage.parse_files",
+                        autospec=True) as parse:
+            user: typing.Optional[User] = self.storage.get(
+                User, self.users[1].id)
+            self.assertIsNone(self.storage.get(User, "missing"))
+            parse.assert_not_called()
+
+        self.assertEqual(user.to_dict(),  # type: ignore
+                         self.users[1].to_dict())
+        self.assertEqual(self.storage.count(), 4)
+
+    def test_deleteThenParse(self) -> None:  # noqa: N802
+        """Test that objects deleted after an indexed get stay deleted."""
+        place: typing.Optional[Place] = self.storage.get(Place, self.place.id)
+        self.storage.delete(place)
+        self.storage.save()
+        self.assertEqual(self.storage.count(), 3)
+        self.assertIsNone(self.reopened().get(Place, self.place.id))
+
+    def test_stale(self) -> None:
+        """Test that an out of date index falls back to parsing."""
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write("\n")
+
+        self.assertIsNotNone(self.storage.get(Place, self.place.id))
+        self.assertEqual(len(self.storage.all()), 4)
+
+    def test_journal(self) -> None:
+        """Test that newer journal records take precedence."""
+        self.storage = self.reopened(journal=True)
+        with mock.patch("models.storage", new=self.storage):
+            user: typing.Optional[User] = self.storage.get(
+                User, self.users[0].id)
+            user.first_name = "Betty"  # type: ignore
+            self.storage.delete(self.storage.get(Place, self.place.id))
+            self.storage.save()
+
+        other: FileStorage = self.reopened(journal=True)
+        self.assertEqual(other.get(User, self.users[0].id)
+                         .first_name, "Betty")  # type: ignore
+        self.assertIsNone(other.get(Place, self.place.id))
+
+    def test_unsavedDelete(self) -> None:  # noqa: N802
+        """Test that get does not bring back unsaved deletions."""
+        self.storage = self.reopened(journal=True)
+        with mock.patch("models.storage", new=self.storage):
+            user: User = User()
+            user.save()
+            self.storage.delete(user)
+            self.assertIsNone(self.storage.get(User, user.id))
+            self.storage.delete(self.storage.get(Place, self.place.id))
+            self.assertIsNone(self.storage.get(Place, self.place.id))
@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+"""Module for test_parallel."""
+
+import json
+import os
+import tempfile
+import typing
+import unittest
+from unittest import mock
+
+from models.engine.file_storage import FileStorage
+from models.engine.parallel import parse, parse_files, split
+from models.user import User
+
+
+class TestParallel(unittest.TestCase):
+    """Tests for parsing files in byte ranges."""
+
+    def setUp(self) -> None:
+        """Save a few objects in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.tmp_dir.name, "objects.json")
+        self.storage: FileStorage = FileStorage(self.path)
+        with mock.patch("models.storage", new=self.storage):
+            for i in range(10):
+                User().first_name = f'Betty\n,\n    "{i}'  # type: ignore
+
+            self.storage.save()
+
+        with open(self.path, "r", encoding="utf-8") as file:
+            self.expected: typing.Dict[str, dict] = json.load(file)
+
+    def tearDown(self) -> None:
+        """Delete the files."""
+        self.tmp_dir.cleanup()
+
+    def test_split(self) -> None:
+        """Test that ranges hold whole records in file order."""
+        chunks: list = split(self.path, os.stat(self.path).st_size, 100)
+        self.assertEqual(len(chunks), 10)
+        parsed: typing.Dict[str, dict] = {}
+        for chunk in chunks:
+            parsed.update(parse(chunk))
+
+        self.assertEqual(list(parsed.items()), list(self.expected.items()))
+
+    def test_splitOtherFormat(self) -> None:  # noqa: N802
+        """Test that files written differently are not split."""
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(self.expected, file)
+
+        size: int = os.stat(self.path).st_size
+        self.assertEqual(split(self.path, size, 100), [(self.path, 0, size)])
+
+    def test_parseFiles(self) -> None:  # noqa: N802
+        """Test parsing with worker processes."""
+        parsed: typing.Dict[str, dict] = {}
+        missing: str = os.path.join(self.tmp_dir.name, "missing.json")
+        for loaded_objs in parse_files([self.path, missing], 3, 100):
+            parsed.update(loaded_objs)
+
+        self.assertEqual(list(parsed.items()), list(self.expected.items()))
+
+    def test_parseFilesPrepare(self) -> None:  # noqa: N802
+        """Test that workers return what prepare makes of their records."""
+        keys: typing.List[str] = []
+        for prepared in parse_files([self.path], 3, 100, prepare=list):
+            keys.extend(prepared)
+
+        self.assertEqual(keys, list(self.expected))
+
+    def test_reload(self) -> None:
+        """Test reloading a storage with worker processes."""
+        storage: FileStorage = FileStorage(self.path, workers=2)
+        with mock.patch.object(FileStorage, "_FileStorage__min_chunk_bytes",
+                               new=100):
+            storage.reload()
+
+        self.assertEqual({key: obj.to_dict()
+                          for key, obj in storage.all().items()},
+                         self.expected)
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""Module for test_query."""
+
+from datetime import datetime
+import unittest
+
+from models.engine.query import Condition, ordered, Plan, parse, Range
+from models.engine.query import range_of
+from models.place import Place
+
+
+class TestCondition(unittest.TestCase):
+    """Tests for Condition and parse."""
+
+    def test_parse(self) -> None:
+        """Test splitting conditions at their operator."""
+        self.assertEqual(parse("price_by_night<=100"),
+                         Condition("price_by_night", "<=", "100"))
+        self.assertEqual(parse("name!=My house"),
+                         Condition("name", "!=", "My house"))
+        self.assertEqual(str(parse("city_id=a=b")), "city_id=a=b")
+        for text in ("price", "<100", "1price=2"):
+            with self.assertRaises(ValueError):
+                parse(text)
+
+    def test_matches(self) -> None:
+        """Test comparing numbers, dates and strings."""
+        place: Place = Place()
+        place.price_by_night = 80  # type: ignore
+        place.name = "Home"  # type: ignore
+        self.assertTrue(parse("price_by_night<100").matches(place))
+        self.assertTrue(parse("price_by_night=80.0").matches(place))
+        self.assertFalse(parse("price_by_night>=100").matches(place))
+        self.assertFalse(parse("price_by_night<cheap").matches(place))
+        self.assertTrue(parse("name>Ha").matches(place))
+        self.assertFalse(parse("name=home").matches(place))
+        self.assertFalse(parse("color=red").matches(place))
+        self.assertTrue(parse("created_at<" + datetime.max.isoformat())
+                        .matches(place))
+
+    def test_plan(self) -> None:
+        """Test the text of a plan."""
+        self.assertEqual(str(Plan("scan", [parse("name=a")], 3)),
+                         "access: scan\ncandidates: 3\nfilter: name=a")
+        self.assertEqual(str(Plan("scan", [], 3, "name (sort)")),
+                         "access: scan\ncandidates: 3\norder: name (sort)")
+
+    def test_range(self) -> None:
+        """Test narrowing the range of a field down."""
+        conditions: list = [parse(text) for text in (
+            "price_by_night>10", "price_by_night>=20", "price_by_night<=90",
+            "price_by_night<90", "price_by_night!=50", "price_by_night<x",
+            "max_guest=2")]
+        self.assertEqual(range_of(conditions, "price_by_night"),
+                         (Range(20, 90, True, False), conditions[:4]))
+        self.assertEqual(range_of(conditions, "max_guest"),
+                         (Range(2, 2), conditions[6:]))
+        self.assertEqual(range_of(conditions, "name"), (Range(), []))
+
+    def test_ordered(self) -> None:
+        """Test ordering numbers first and missing attributes last."""
+        places: list = [Place() for _ in range(4)]
+        for place, price in zip(places, (30, "cheap", 10, None),
+                                strict=True):
+            place.price_by_night = price  # type: ignore
+
+        self.assertEqual(ordered(places, "price_by_night"),
+                         [places[2], places[0], places[1], places[3]])
+        self.assertEqual(ordered(places, "-price_by_night", 2),
+                         [places[3], places[1]])
+        self.assertEqual(ordered(places, "price_by_night", 1), places[2:3])
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+"""Module for test_rwlock."""
+
+import threading
+import typing
+import unittest
+
+from models.engine.rwlock import ReadWriteLock
+
+
+class TestReadWriteLock(unittest.TestCase):
+    """Tests for ReadWriteLock."""
+
+    def setUp(self) -> None:
+        """Create a lock."""
+        self.lock: ReadWriteLock = ReadWriteLock()
+
+    def in_thread(self, function: typing.Callable[[], None]) -> bool:
+        """Return True if function finished in another thread in time."""
+        thread: threading.Thread = threading.Thread(target=function,
+                                                    daemon=True)
+        thread.start()
+        thread.join(0.2)
+        return not thread.is_alive()
+
+    def read(self) -> None:
+        """Take the lock for reading and release it."""
+        with self.lock.reading():
+            pass
+
+    def write(self) -> None:
+        """Take the lock for writing and release it."""
+        with self.lock.writing():
+            pass
+
+    def test_readers(self) -> None:
+        """Test that readers share the lock and keep writers out."""
+        with self.lock.reading():
+            self.assertTrue(self.in_thread(self.read))
+            self.assertFalse(self.in_thread(self.write))
+
+    def test_writer(self) -> None:
+        """Test that a writer keeps everyone else out."""
+        released: threading.Event = threading.Event()
+        with self.lock.writing():
+            with self.lock.reading(), self.lock.writing():
+                pass
+
+            thread: threading.Thread = threading.Thread(
+                target=lambda: (self.read(), released.set()))
+            thread.start()
+            self.assertFalse(released.wait(0.1))
+
+        self.assertTrue(released.wait(1))
+        thread.join()
+
+    def test_waitingWriter(self) -> None:  # noqa: N802
+        """Test that new readers wait behind a waiting writer."""
+        with self.lock.reading():
+            self.assertFalse(self.in_thread(self.write))
+            self.assertFalse(self.in_thread(self.read))
+            with self.lock.reading():
+                pass
+
+    def test_upgrade(self) -> None:
+        """Test that readers cannot upgrade to writing."""
+        with self.lock.reading():
+            self.assertRaises(RuntimeError, self.write)
+
+        self.assertTrue(self.in_thread(self.write))